@@ -104,6 +104,8 @@ class Career(db.Model):
 #就业趋势表
 class EmploymentRate(db.Model):
     __tablename__ = 'employment_rates'
+    # 导入脚本按 (career_id, year) 批量 upsert
+    __table_args__ = (db.UniqueConstraint('career_id', 'year', name='uq_employment_rates_career_year'),)
     
     id = db.Column(db.Integer, primary_key=True)
     career_id = db.Column(db.Integer, db.ForeignKey('careers.id'), nullable=False)
@@ -118,6 +120,7 @@ class EmploymentRate(db.Model):
 #薪资趋势表
 class SalaryTrend(db.Model):
     __tablename__ = 'salary_trends'
+    __table_args__ = (db.UniqueConstraint('career_id', 'year', name='uq_salary_trends_career_year'),)
     
     id = db.Column(db.Integer, primary_key=True)
     career_id = db.Column(db.Integer, db.ForeignKey('careers.id'), nullable=False)
@@ -133,6 +136,7 @@ class SalaryTrend(db.Model):
 #技能要求表
 class Skill(db.Model):
     __tablename__ = 'skills'
+    __table_args__ = (db.UniqueConstraint('career_id', 'skill_name', name='uq_skills_career_skill'),)
     
     id = db.Column(db.Integer, primary_key=True)
     career_id = db.Column(db.Integer, db.ForeignKey('careers.id'), nullable=False)
@@ -142,4 +146,36 @@ class Skill(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    career = db.relationship('Career', backref=db.backref('skills', lazy=True))
\ No newline at end of file
+    career = db.relationship('Career', backref=db.backref('skills', lazy=True))
+
+#导入清单表：每个岗位的内容哈希及其对职业聚合的贡献，增量导入据此只处理新增/变化的岗位
+class ImportedJob(db.Model):
+    __tablename__ = 'imported_jobs'
+    __table_args__ = (db.Index('ix_imported_jobs_career_company', 'career', 'company'),)
+    
+    job_id = db.Column(db.String(64), primary_key=True)
+    content_hash = db.Column(db.String(40), nullable=False)
+    career = db.Column(db.String(100))  # 非IT岗位为空，不计入聚合
+    job_name = db.Column(db.String(200))
+    company = db.Column(db.String(200))
+    annual_salary = db.Column(db.Float)
+    skills = db.Column(db.Text)  # JSON列表
+    first_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow)
+
+#职业聚合表：岗位数与年薪合计，增量导入时按差值累加
+class CareerAggregate(db.Model):
+    __tablename__ = 'career_aggregates'
+    
+    career = db.Column(db.String(100), primary_key=True)
+    job_count = db.Column(db.Integer, nullable=False, default=0)
+    salary_sum = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+#职业技能计数表：每个职业下提到该技能的岗位数
+class CareerSkillCount(db.Model):
+    __tablename__ = 'career_skill_counts'
+    
+    career = db.Column(db.String(100), primary_key=True)
+    skill_name = db.Column(db.String(100), primary_key=True)
+    job_count = db.Column(db.Integer, nullable=False, default=0)
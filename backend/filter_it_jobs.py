@@ -2,79 +2,67 @@
 import json
 import re
 import os
+import sys
+import textwrap
+from itertools import islice
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.crawler.feeds import iter_job_records, open_shard
+from job_rules import (FILTER_EXCLUDE_KEYWORDS, FILTER_IT_CATEGORIES, FILTER_IT_JOB, FILTER_IT_KEYWORDS,
+                       FILTER_TECH_KEYWORDS, IT_JOB_DEFAULT, IT_JOB_EMPTY, IT_JOB_FALLBACK_RULES, IT_JOB_RULES)
+
+SAMPLE_SIZE = 5  # 保留用于展示的IT职位样本条数
 
 def is_it_job(job_name, job_category):
-    """判断是否是IT/计算机相关职位"""
+    """判断是否是IT/计算机相关职位（逐条判断的参考实现，批量筛选用 job_rules.FILTER_IT_JOB）"""
     
     if not job_name:
         return False
     
     job_name_lower = job_name.lower()
-    
-    # 职位名称中的IT关键词（更严格）
-    it_keywords = [
-        '后端', '前端', '全栈', '开发', '工程师', '架构', '算法',
-        '数据', '分析', '运维', '测试', 'QA', 'DevOps', 'SRE',
-        '机器学习', '人工智能', 'AI', '大数据', '云计算', '区块链',
-        '安全', '网络安全', '信息安全', '软件', '硬件', '嵌入式',
-        'Java', 'Python', 'C++', 'C#', 'Go', 'PHP', 'JavaScript',
-        'Android', 'iOS', '移动开发', 'App开发', 'Web开发',
-        'DBA', '数据库', '系统', '网络', '通信', '物联网'
-    ]
-    
-    
-    # 排除明显非IT的职位（更严格）
-    exclude_keywords = [
-        '教师', '教育', '培训', '销售', '市场', '营销', '推广', '运营',
-        '行政', '文员', '助理', '秘书', '人事', '人力', 'hr', '财务', '会计',
-        '客服', '售后', '售前', '技术支持', '技术顾问',  # 这些可能属于IT，但先排除
-        '司机', '保安', '保洁', '厨师', '医生', '护士', '律师', '翻译',
-        '编辑', '记者', '文案', '策划', '设计',  # 泛设计可能包含UI，但这里排除
-        '管理', '主管', '经理', '总监', '代表', '专员'  # 泛管理职位
-    ]
-    
-    job_name_lower = job_name.lower() if job_name else ''
 
     # 检查排除关键词
-    for exclude in exclude_keywords:
+    for exclude in FILTER_EXCLUDE_KEYWORDS:
         if exclude.lower() in job_name_lower:
             return False
     
     # 检查IT关键词
-    for keyword in it_keywords:
+    for keyword in FILTER_IT_KEYWORDS:
         if keyword.lower() in job_name_lower:
             return True
     
     # 检查是否有编程语言或技术栈关键词
-    tech_keywords = [
-        'java', 'python', 'c++', 'c#', 'javascript', 'php', 'go', 'ruby',
-        'react', 'vue', 'angular', 'spring', 'django', 'flask',
-        'mysql', 'oracle', 'sql', 'mongodb', 'redis',
-        'linux', 'docker', 'kubernetes', 'aws', '云计算'
-    ]
-    
-    for tech in tech_keywords:
+    for tech in FILTER_TECH_KEYWORDS:
         if tech.lower() in job_name_lower:
             return True
     
-    # 排除非IT职位
-    for exclude in exclude_keywords:
-        if exclude.lower() in job_name_lower:
-            return False
-    
     # 检查职位类别
     if job_category:
-        it_categories = [
-            '计算机', '软件', '互联网', 'IT', '通信', '电子', '网络',
-            '游戏', '电子商务', '大数据', '人工智能', '云计算'
-        ]
-        
-        for cat in it_categories:
+        for cat in FILTER_IT_CATEGORIES:
             if cat in job_category:
                 return True
     
     return False
 
+def classify_it_job(job_name):
+    """根据职位名称智能分类IT职位（参考实现，批量分类用 job_rules.IT_JOB_CLASSIFIER）"""
+    if not job_name:
+        return IT_JOB_EMPTY
+    
+    job_name_lower = job_name.lower()
+    
+    for category, keywords in IT_JOB_RULES:
+        for keyword in keywords:
+            if keyword in job_name_lower:
+                return category
+    
+    # 如果没有匹配到，根据关键词返回
+    for category, keywords in IT_JOB_FALLBACK_RULES:
+        if any(word in job_name_lower for word in keywords):
+            return category
+    return IT_JOB_DEFAULT
+
 def extract_it_skills(description):
     """从职位描述中提取IT技能"""
     if not description:
@@ -116,8 +104,52 @@ def extract_it_skills(description):
     # 去重并返回
     return list(set(found_skills))[:20]  # 最多返回20个技能
 
+def _iter_lines_lenient(input_file):
+    """逐行解析，跳过无法解析的行（用于修复格式不正确的文件）"""
+    with open_shard(input_file) as f:
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line.strip())
+                except ValueError:
+                    continue
+
+def _write_it_jobs(records, part_file):
+    """筛选IT职位并写入临时文件（JSON数组），返回 (原始条数, IT条数, 样本, 分析报告)"""
+    total_count = 0
+    it_count = 0
+    sample_it_jobs = []
+    report = ItJobReport()
+    
+    with open(part_file, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for job in records:
+            if not isinstance(job, dict):
+                continue
+            total_count += 1
+            job_name = job.get('job_name', job.get('title', job.get('job_name', '')))
+            job_category = job.get('job_catory', job.get('job_category', job.get('job_catory', '')))
+            
+            # 编译后的规则：一次扫描，按职位名称缓存结果
+            if not FILTER_IT_JOB.is_it_job(job_name, job_category):
+                continue
+            # 添加标记
+            job['is_it_job'] = True
+            f.write(',\n' if it_count else '\n')
+            # 与 json.dump(列表, indent=2) 的输出格式一致
+            f.write(textwrap.indent(json.dumps(job, ensure_ascii=False, indent=2), '  '))
+            it_count += 1
+            report.add(job)
+            if len(sample_it_jobs) < SAMPLE_SIZE:
+                sample_it_jobs.append(job)
+        f.write('\n]' if it_count else ']')
+    return total_count, it_count, sample_it_jobs, report
+
 def filter_and_process_data():
-    """筛选并处理IT职位数据"""
+    """筛选并处理IT职位数据
+    
+    返回 (IT职位条数, 前 SAMPLE_SIZE 条IT职位样本)；完整结果在输出文件中，不再整体驻留内存
+    """
     
     # 输入文件路径 - 根据你的目录结构调整
     input_file = '../crawler/crawler/data/sampled_jobs.json'
@@ -131,187 +163,174 @@ def filter_and_process_data():
     if not os.path.exists(input_file):
         print(f"❌ 找不到输入文件: {input_file}")
         print("请确认sampled_jobs.json文件的位置")
-        return None
+        return 0, []
     
+    # 流式读取（JSON数组/JSONL/分片目录，可压缩），筛选结果边读边写、边统计，不把整个文件读进内存（分片目录需记住已读的 job_id）
+    # 先写临时文件，成功后再替换，中途出错不会留下半截的输出文件
     print("📖 正在读取数据...")
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON解析错误: {e}")
-        print("文件可能格式不正确，尝试修复...")
-        # 尝试逐行读取
-        with open(input_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        data = []
-        for line in lines:
-            if line.strip():
-                try:
-                    data.append(json.loads(line.strip()))
-                except:
-                    continue
-    
-    print(f"📊 原始数据量: {len(data)} 条")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    part_file = output_file + '.part'
     
-    # 筛选IT职位
-    it_jobs = []
-    non_it_jobs = []
-    
-    for job in data:
-        job_name = job.get('job_name', job.get('title', job.get('job_name', '')))
-        job_category = job.get('job_catory', job.get('job_category', job.get('job_catory', '')))
-        
-        if is_it_job(job_name, job_category):
-            # 添加标记
-            job['is_it_job'] = True
-            it_jobs.append(job)
-        else:
-            non_it_jobs.append(job)
-    
-    print(f"✅ 筛选出IT职位: {len(it_jobs)} 条")
-    print(f"❌ 非IT职位: {len(non_it_jobs)} 条")
-    
-    # 保存筛选后的数据
-    if it_jobs:
-        # 确保输出目录存在
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(it_jobs, f, ensure_ascii=False, indent=2)
+    try:
+        try:
+            total_count, it_count, sample_it_jobs, report = _write_it_jobs(iter_job_records(input_file), part_file)
+        except ValueError as e:
+            if os.path.isdir(input_file):
+                raise
+            print(f"❌ JSON解析错误: {e}")
+            print("文件可能格式不正确，尝试修复...")
+            # 尝试逐行读取，从头重写临时文件
+            total_count, it_count, sample_it_jobs, report = _write_it_jobs(_iter_lines_lenient(input_file), part_file)
         
-        print(f"💾 筛选后的数据已保存到: {output_file}")
+        print(f"📊 原始数据量: {total_count} 条")
+        print(f"✅ 筛选出IT职位: {it_count} 条")
+        print(f"❌ 非IT职位: {total_count - it_count} 条")
         
-        # 统计分析
-        analyze_it_jobs(it_jobs)
-    
-    return it_jobs
+        # 保存筛选后的数据（没有IT职位时保留原有的输出文件）
+        if it_count:
+            os.replace(part_file, output_file)
+            print(f"💾 筛选后的数据已保存到: {output_file}")
+            
+            # 统计分析
+            report.print_report()
+    finally:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+    
+    return it_count, sample_it_jobs
 
-def analyze_it_jobs(it_jobs):
-    """分析IT职位数据"""
-    print("\n📈 IT职位分析报告:")
-    print("=" * 50)
-    
-    if not it_jobs:
-        print("⚠️ 没有IT职位数据")
-        return
+def annual_salary(job):
+    """千元/月 → 元/年（取最低/最高月薪的平均值，只有一端时取该值）；无有效薪资返回 None"""
+    low = job.get('low_month_pay', 0)
+    high = job.get('high_month_pay', 0)
     
-    # 职位类别分布
-    category_count = {}
-    for job in it_jobs:
+    # 处理可能的字符串类型
+    try:
+        low = float(low) if low else 0
+        high = float(high) if high else 0
+    except (ValueError, TypeError):
+        low = 0
+        high = 0
+    
+    if low > 0 and high > 0:
+        # 假设薪资单位是"千元/月"，需要转换为"元/年"
+        # 乘以1000转为元，再乘以12转为年薪
+        return (low * 1000 * 12 + high * 1000 * 12) / 2
+    elif low > 0:
+        # 只有最低薪资
+        return low * 1000 * 12
+    elif high > 0:
+        # 只有最高薪资
+        return high * 1000 * 12
+    return None
+
+class ItJobReport:
+    """IT职位分析报告：逐条累加计数，单遍完成，不需要保留职位列表"""
+    
+    def __init__(self):
+        self.category_count = {}
+        self.salary_count = 0
+        self.salary_sum = 0.0
+        self.salary_max = None
+        self.salary_min = None
+        self.skill_count = {}
+        self.company_sizes = {}
+        self.area_counts = {}
+        self.degree_counts = {}
+    
+    def add(self, job):
+        # 职位类别分布
         category = job.get('job_catory', job.get('job_category', '未知类别'))
         if category is None:
             category = '未知类别'
-        category_count[category] = category_count.get(category, 0) + 1
-    
-    print("📋 职位类别分布:")
-    for category, count in sorted(category_count.items(), key=lambda x: x[1], reverse=True):
-        print(f"  {category}: {count} 条")
-    
-    # 薪资分析 - 修正薪资单位问题
-    salaries = []
-    for job in it_jobs:
-        low = job.get('low_month_pay', 0)
-        high = job.get('high_month_pay', 0)
+        self.category_count[category] = self.category_count.get(category, 0) + 1
         
-        # 处理可能的字符串类型
-        try:
-            low = float(low) if low else 0
-            high = float(high) if high else 0
-        except (ValueError, TypeError):
-            low = 0
-            high = 0
+        # 薪资分析 - 修正薪资单位问题
+        salary = annual_salary(job)
+        if salary is not None:
+            self.salary_count += 1
+            self.salary_sum += salary
+            self.salary_max = salary if self.salary_max is None else max(self.salary_max, salary)
+            self.salary_min = salary if self.salary_min is None else min(self.salary_min, salary)
         
-        if low > 0 and high > 0:
-            # 假设薪资单位是"千元/月"，需要转换为"元/年"
-            # 乘以1000转为元，再乘以12转为年薪
-            low_annual = low * 1000 * 12
-            high_annual = high * 1000 * 12
-            avg_annual = (low_annual + high_annual) / 2
-            salaries.append(avg_annual)
-        elif low > 0:
-            # 只有最低薪资
-            avg_annual = low * 1000 * 12
-            salaries.append(avg_annual)
-        elif high > 0:
-            # 只有最高薪资
-            avg_annual = high * 1000 * 12
-            salaries.append(avg_annual)
-    
-    if salaries:
-        print(f"\n💰 薪资分析:")
-        print(f"  平均年薪: {sum(salaries)/len(salaries):,.2f} 元")
-        print(f"  最高年薪: {max(salaries):,.2f} 元")
-        print(f"  最低年薪: {min(salaries):,.2f} 元")
-        print(f"  薪资范围: {min(salaries):,.0f} - {max(salaries):,.0f} 元")
-    else:
-        print(f"\n💰 薪资分析: 无有效薪资数据")
-    
-    # 热门技能分析
-    all_skills = []
-    for job in it_jobs:
-        description = job.get('description', '')
-        skills = extract_it_skills(description)
-        all_skills.extend(skills)
-    
-    if all_skills:
-        skill_count = {}
-        for skill in all_skills:
-            skill_count[skill] = skill_count.get(skill, 0) + 1
+        # 热门技能分析
+        for skill in extract_it_skills(job.get('description', '')):
+            self.skill_count[skill] = self.skill_count.get(skill, 0) + 1
         
-        print(f"\n🔧 热门技能TOP 10:")
-        sorted_skills = sorted(skill_count.items(), key=lambda x: x[1], reverse=True)[:10]
-        for skill, count in sorted_skills:
-            print(f"  {skill}: {count} 次")
-    else:
-        print(f"\n🔧 热门技能: 无技能数据")
-    
-    # 公司规模统计 - 修复None值问题
-    print(f"\n🏢 公司规模统计:")
-    company_sizes = {}
-    for job in it_jobs:
-        # 处理可能的字段名
+        # 公司规模统计 - 修复None值问题（处理可能的字段名，确保是字符串）
         size = job.get('company.scale', job.get('company_scale', None))
         if size is None or size == '':
             size = '未知'
-        
-        # 确保size是字符串
         size = str(size)
-        company_sizes[size] = company_sizes.get(size, 0) + 1
-    
-    # 排序前确保所有值都是字符串
-    try:
-        for size, count in sorted(company_sizes.items()):
-            print(f"  {size}: {count} 条")
-    except TypeError:
-        # 如果还有类型问题，直接打印不排序
-        for size, count in company_sizes.items():
-            print(f"  {size}: {count} 条")
-    
-    # 地区分布
-    print(f"\n📍 地区分布:")
-    area_counts = {}
-    for job in it_jobs:
+        self.company_sizes[size] = self.company_sizes.get(size, 0) + 1
+        
+        # 地区分布
         area = job.get('area_code_name', job.get('search_area_name', '未知地区'))
         if area is None:
             area = '未知地区'
-        area_counts[area] = area_counts.get(area, 0) + 1
-    
-    for area, count in sorted(area_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
-        print(f"  {area}: {count} 条")
-    
-    # 学历要求
-    print(f"\n🎓 学历要求分布:")
-    degree_counts = {}
-    for job in it_jobs:
+        self.area_counts[area] = self.area_counts.get(area, 0) + 1
+        
+        # 学历要求
         degree = job.get('degree_name', '学历不限')
         if degree is None:
             degree = '学历不限'
-        degree_counts[degree] = degree_counts.get(degree, 0) + 1
+        self.degree_counts[degree] = self.degree_counts.get(degree, 0) + 1
     
-    for degree, count in sorted(degree_counts.items(), key=lambda x: x[1], reverse=True):
-        print(f"  {degree}: {count} 条")
-    
-    print(f"\n📊 分析完成!")
+    def print_report(self):
+        print("\n📈 IT职位分析报告:")
+        print("=" * 50)
+        
+        if not self.category_count:
+            print("⚠️ 没有IT职位数据")
+            return
+        
+        print("📋 职位类别分布:")
+        for category, count in sorted(self.category_count.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {category}: {count} 条")
+        
+        if self.salary_count:
+            print(f"\n💰 薪资分析:")
+            print(f"  平均年薪: {self.salary_sum / self.salary_count:,.2f} 元")
+            print(f"  最高年薪: {self.salary_max:,.2f} 元")
+            print(f"  最低年薪: {self.salary_min:,.2f} 元")
+            print(f"  薪资范围: {self.salary_min:,.0f} - {self.salary_max:,.0f} 元")
+        else:
+            print(f"\n💰 薪资分析: 无有效薪资数据")
+        
+        if self.skill_count:
+            print(f"\n🔧 热门技能TOP 10:")
+            sorted_skills = sorted(self.skill_count.items(), key=lambda x: x[1], reverse=True)[:10]
+            for skill, count in sorted_skills:
+                print(f"  {skill}: {count} 次")
+        else:
+            print(f"\n🔧 热门技能: 无技能数据")
+        
+        print(f"\n🏢 公司规模统计:")
+        # 排序前确保所有值都是字符串
+        try:
+            for size, count in sorted(self.company_sizes.items()):
+                print(f"  {size}: {count} 条")
+        except TypeError:
+            # 如果还有类型问题，直接打印不排序
+            for size, count in self.company_sizes.items():
+                print(f"  {size}: {count} 条")
+        
+        print(f"\n📍 地区分布:")
+        for area, count in sorted(self.area_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
+            print(f"  {area}: {count} 条")
+        
+        print(f"\n🎓 学历要求分布:")
+        for degree, count in sorted(self.degree_counts.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {degree}: {count} 条")
+        
+        print(f"\n📊 分析完成!")
+
+def analyze_it_jobs(it_jobs):
+    """分析IT职位数据（任意可迭代对象，单遍处理）"""
+    report = ItJobReport()
+    for job in it_jobs:
+        report.add(job)
+    report.print_report()
 
 def show_sample_it_jobs(it_jobs, count=5):
     """显示IT职位样本"""
@@ -346,10 +365,10 @@ if __name__ == '__main__':
     print("🔍 IT职位筛选工具")
     print("=" * 50)
     
-    it_jobs = filter_and_process_data()
+    it_count, sample_it_jobs = filter_and_process_data()
     
-    if it_jobs:
-        show_sample_it_jobs(it_jobs, 5)
+    if it_count:
+        show_sample_it_jobs(sample_it_jobs, 5)
         
         # 询问是否查看非IT职位
         view_non_it = input("\n是否查看非IT职位样本? (y/N): ").lower()
@@ -360,16 +379,12 @@ if __name__ == '__main__':
                 if not os.path.exists(input_file):
                     input_file = '../crawler/data/sampled_jobs.json'
                 
-                with open(input_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                non_it_jobs = []
-                for job in data:
-                    job_name = job.get('job_name', job.get('title', job.get('job_name', '')))
-                    job_category = job.get('job_catory', job.get('job_category', job.get('job_catory', '')))
-                    
-                    if not is_it_job(job_name, job_category):
-                        non_it_jobs.append(job)
+                # 只取前5条非IT职位，读到即停
+                non_it_jobs = list(islice(
+                    (job for job in iter_job_records(input_file)
+                     if not FILTER_IT_JOB.is_it_job(job.get('job_name', job.get('title', job.get('job_name', ''))),
+                                                    job.get('job_catory', job.get('job_category', job.get('job_catory', ''))))),
+                    5))
                 
                 print(f"\n❌ 非IT职位样本（前5条）:")
                 for i, job in enumerate(non_it_jobs[:5]):
@@ -2,46 +2,55 @@ import json
 import re
 import sys
 import os
+import time
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app, db
-from app.models import Career, EmploymentRate, SalaryTrend, Skill
+from app.models import (Career, CareerAggregate, CareerSkillCount, EmploymentRate, ImportedJob, SalaryTrend,
+                        Skill)
+from crawler.crawler.feeds import iter_job_batches
+from job_rules import CAREER_DEFAULT, CAREER_RULES, IMPORT_EXCLUDE_KEYWORDS, IMPORT_IT_KEYWORDS
+from job_stats import IMPORT_COLUMNS, add_contribution, job_key, merge_career_deltas, summarize_batch
 
 # IT职位分类器
 def classify_it_job(job_name):
-    """智能分类IT职位"""
+    """智能分类IT职位（参考实现，批量分类用 job_rules.CAREER_CLASSIFIER）"""
     job_name_lower = job_name.lower()
-    
-    classification_rules = {
-        '后端开发工程师': ['后端开发', 'java开发', 'python开发', 'c++开发', 'go开发', 'php开发', '服务器开发'],
-        '前端开发工程师': ['前端开发', 'web前端', 'javascript开发', 'vue开发', 'react开发', 'angular开发'],
-        '移动开发工程师': ['android开发', 'ios开发', '移动开发', 'app开发', 'flutter', 'react native'],
-        '全栈开发工程师': ['全栈开发', '全栈工程师'],
-        '软件工程师': ['软件工程师', '软件开发'],
-        '算法工程师': ['算法工程师', '机器学习', '深度学习', '人工智能', 'ai工程师'],
-        '数据工程师': ['数据工程师', '数据分析师', '大数据工程师', 'etl工程师'],
-        '测试工程师': ['测试工程师', 'qa工程师', '测试开发', '软件测试'],
-        '运维工程师': ['运维工程师', 'devops', 'sre', '系统运维', '网络运维'],
-        '安全工程师': ['安全工程师', '网络安全', '信息安全', '渗透测试'],
-        '嵌入式工程师': ['嵌入式工程师', '嵌入式开发', '单片机', 'fpga'],
-        '硬件工程师': ['硬件工程师', 'pcb设计', '电路设计'],
-        '通信工程师': ['通信工程师', '网络工程师', '通信技术'],
-        'UI/UX设计师': ['ui设计', 'ux设计', '交互设计', '视觉设计', 'ui设计师'],
-        '产品经理': ['产品经理', '产品专员'],
-        '项目经理': ['项目经理', '项目专员'],
-        '数据库管理员': ['dba', '数据库管理员'],
-        '系统架构师': ['系统架构师', '架构师']
-    }
 
-    for category, keywords in classification_rules.items():
+    for category, keywords in CAREER_RULES:
         for keyword in keywords:
             if keyword in job_name_lower:
                 return category
     
-    return '其他职业'  # 默认分类
+    return CAREER_DEFAULT  # 默认分类
+
+
+def is_it_job_simple(job_name, job_category):
+    """判断是否是IT职位（参考实现，批量筛选用 job_rules.IMPORT_IT_JOB）"""
+    if not job_name:
+        return False
+    
+    job_lower = job_name.lower()
+    
+    # 检查排除关键词
+    for exclude in IMPORT_EXCLUDE_KEYWORDS:
+        if exclude in job_lower:
+            return False
+    
+    # 检查IT关键词
+    for keyword in IMPORT_IT_KEYWORDS:
+        if keyword in job_lower:
+            return True
+    
+    return False
 
 def generate_skills_for_career(career_name):
     """根据职业名称生成技能"""
@@ -109,12 +118,302 @@ def generate_skills_for_career(career_name):
     unique_skills = list(dict.fromkeys(matched_skills))
     return unique_skills[:5]
 
+# 批量写入：每条 INSERT ... ON DUPLICATE KEY UPDATE 语句携带的行数
+BULK_BATCH_SIZE = 1000
+# 增量导入：每批与导入清单比对的岗位数（也是进程池每个任务的大小）
+MANIFEST_BATCH_SIZE = 1000
+# 计算贡献的进程数（默认为本进程可用的CPU核数），设为1则在本进程内串行处理
+AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', AVAILABLE_CPUS))
+# 趋势数据的年份范围与基准年
+TREND_YEARS = range(2020, 2027)
+BASE_YEAR = 2024  # 假设数据是2024年的
+
+# ON DUPLICATE KEY UPDATE 依赖的唯一键（新库由 models 中的 UniqueConstraint 创建，旧库在导入前补建）
+UNIQUE_KEYS = {
+    'employment_rates': ('uq_employment_rates_career_year', ('career_id', 'year')),
+    'salary_trends': ('uq_salary_trends_career_year', ('career_id', 'year')),
+    'skills': ('uq_skills_career_skill', ('career_id', 'skill_name')),
+}
+
+def ensure_unique_keys():
+    """旧库缺少唯一键时先删除重复行（保留id最大的一条），再补建唯一键"""
+    for table, (key_name, columns) in UNIQUE_KEYS.items():
+        exists = db.session.execute(text(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :key_name"
+        ), {'table': table, 'key_name': key_name}).scalar()
+        if exists:
+            continue
+        join_on = ' AND '.join(f"a.{column} = b.{column}" for column in columns)
+        db.session.execute(text(f"DELETE a FROM {table} a JOIN {table} b ON {join_on} AND a.id < b.id"))
+        db.session.execute(text(f"ALTER TABLE {table} ADD UNIQUE KEY {key_name} ({', '.join(columns)})"))
+        print(f"🔧 已为 {table} 补建唯一键 {key_name}")
+    db.session.commit()
+
+def bulk_upsert(model, rows, update_columns, increment_columns=()):
+    """按批执行 INSERT ... ON DUPLICATE KEY UPDATE（不提交，由调用方统一提交）。
+    update_columns 用新值覆盖，increment_columns 在原值上累加新值
+    """
+    if not rows:
+        return 0
+    stmt = mysql_insert(model.__table__)
+    updates = {column: stmt.inserted[column] for column in update_columns}
+    updates.update({column: model.__table__.c[column] + stmt.inserted[column] for column in increment_columns})
+    stmt = stmt.on_duplicate_key_update(updates)
+    for start in range(0, len(rows), BULK_BATCH_SIZE):
+        db.session.execute(stmt, rows[start:start + BULK_BATCH_SIZE])
+    return len(rows)
+
+def query_manifest(keys):
+    """清单中这批岗位已有的记录（内容哈希与旧贡献）"""
+    return {row.job_id: row for row in db.session.query(
+        ImportedJob.job_id, ImportedJob.content_hash, ImportedJob.career,
+        ImportedJob.annual_salary, ImportedJob.skills).filter(ImportedJob.job_id.in_(list(keys)))}
+
+def apply_batch_result(result, existing, deltas, counters, now):
+    """父进程：合并子进程的部分聚合，扣除变化/删除岗位在清单中的旧贡献，并写入清单"""
+    merge_career_deltas(deltas, result['deltas'])
+    for message in result['failed']:
+        print(f"⚠️ 处理职位失败: {message}")
+    
+    # 变化/删除的岗位：扣除清单中记录的旧贡献
+    for key in [row['job_id'] for row in result['upserts']] + result['removed']:
+        old = existing.get(key)
+        if old is not None and old.career:
+            add_contribution(deltas, old.career, old.annual_salary, json.loads(old.skills or '[]'), sign=-1)
+    
+    upserts = [dict(row, first_seen=now, last_seen=now) for row in result['upserts']]
+    bulk_upsert(ImportedJob, upserts,
+                ['content_hash', 'career', 'job_name', 'company', 'annual_salary', 'skills', 'last_seen'])
+    if result['unchanged']:
+        db.session.query(ImportedJob).filter(ImportedJob.job_id.in_(result['unchanged'])).update(
+            {'last_seen': now}, synchronize_session=False)
+    if result['removed']:
+        db.session.query(ImportedJob).filter(ImportedJob.job_id.in_(result['removed'])).delete(
+            synchronize_session=False)
+    counters.update(result['counters'])
+    counters['unchanged'] += len(result['unchanged'])
+    counters['removed'] += len(result['removed'])
+    counters['failed'] += len(result['failed'])
+
+def import_jobs(data_file, deltas, counters, now, workers=IMPORT_WORKERS):
+    """分批读取岗位，哈希比对与贡献计算交给进程池，父进程只查清单、合并部分聚合并写库。
+    同时在途的批次数有上限（内存有界）；某批包含仍在途的 job_id 时先等在途批次写完，保证先后顺序
+    """
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pending = deque()  # (future, 清单旧记录, 这批的清单主键)
+    in_flight = set()
+    
+    def apply_oldest():
+        future, existing, keys = pending.popleft()
+        result = future.result() if executor else future
+        apply_batch_result(result, existing, deltas, counters, now)
+        in_flight.difference_update(keys)
+        print(f"  已比对 {counters['new'] + counters['changed'] + counters['unchanged'] + counters['removed']} 条"
+              f"（新增 {counters['new']}，变化 {counters['changed']}，未变 {counters['unchanged']}）")
+    
+    try:
+        for jobs in iter_job_batches(data_file, MANIFEST_BATCH_SIZE, columns=IMPORT_COLUMNS):
+            counters['total'] += len(jobs)
+            batch = {}
+            for job in jobs:
+                batch[job_key(job)] = job  # 同一批内重复的 job_id 以最后一条为准
+            while pending and (len(pending) >= max(2, workers * 2) or not in_flight.isdisjoint(batch)):
+                apply_oldest()
+            
+            existing = query_manifest(batch)
+            known_hashes = {key: row.content_hash for key, row in existing.items()}
+            if executor:
+                future = executor.submit(summarize_batch, list(batch.items()), known_hashes)
+            else:
+                future = summarize_batch(list(batch.items()), known_hashes)
+            pending.append((future, existing, set(batch)))
+            in_flight.update(batch)
+        while pending:
+            apply_oldest()
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+def apply_career_deltas(deltas, now):
+    """把增量累加到聚合表（INSERT ... ON DUPLICATE KEY UPDATE x = x + 增量），返回受影响的职业"""
+    aggregate_rows = [{'career': career, 'job_count': delta['count'], 'salary_sum': delta['salary_sum'],
+                       'updated_at': now}
+                      for career, delta in deltas.items() if delta['count'] or delta['salary_sum']]
+    skill_rows = [{'career': career, 'skill_name': skill, 'job_count': count}
+                  for career, delta in deltas.items() for skill, count in delta['skills'].items() if count]
+    bulk_upsert(CareerAggregate, aggregate_rows, ['updated_at'], increment_columns=['job_count', 'salary_sum'])
+    bulk_upsert(CareerSkillCount, skill_rows, [], increment_columns=['job_count'])
+    db.session.query(CareerSkillCount).filter(CareerSkillCount.job_count <= 0).delete(synchronize_session=False)
+    return sorted({row['career'] for row in aggregate_rows} | {row['career'] for row in skill_rows})
+
+def load_career_summaries(careers):
+    """从聚合表读取受影响职业的统计；公司数与示例职位来自清单表（按 career 索引，只查这些职业）"""
+    summaries = {}
+    for career, job_count, salary_sum in db.session.query(
+            CareerAggregate.career, CareerAggregate.job_count, CareerAggregate.salary_sum).filter(
+            CareerAggregate.career.in_(careers), CareerAggregate.job_count > 0):
+        summaries[career] = {'count': job_count, 'avg_salary': salary_sum / job_count,
+                             'skills': [], 'company_count': 0, 'job_names': []}
+    if not summaries:
+        return summaries
+    
+    # 技能按岗位数排序，取前5个
+    for career, skill_name, _ in db.session.query(
+            CareerSkillCount.career, CareerSkillCount.skill_name, CareerSkillCount.job_count).filter(
+            CareerSkillCount.career.in_(list(summaries))).order_by(
+            CareerSkillCount.career, CareerSkillCount.job_count.desc(), CareerSkillCount.skill_name):
+        if len(summaries[career]['skills']) < 5:
+            summaries[career]['skills'].append(skill_name)
+    
+    for career, company_count in db.session.query(
+            ImportedJob.career, func.count(func.distinct(ImportedJob.company))).filter(
+            ImportedJob.career.in_(list(summaries)), ImportedJob.company != '').group_by(ImportedJob.career):
+        summaries[career]['company_count'] = company_count
+    
+    for career, summary in summaries.items():
+        summary['job_names'] = [name for (name,) in db.session.query(ImportedJob.job_name).filter(
+            ImportedJob.career == career).order_by(ImportedJob.first_seen, ImportedJob.job_id).limit(3)]
+    return summaries
+
+def build_career_row(category, summary, now):
+    """由职业汇总计算一行职业数据"""
+    avg_salary = summary['avg_salary']
+    
+    # 生成职业描述
+    company_count = summary['company_count']
+    sample_jobs = summary['job_names'][:3]  # 取前3个职位名称作为示例
+    
+    description = f"{category}岗位，平均年薪{avg_salary:,.0f}元"
+    if company_count > 0:
+        description += f"，来自{company_count}家公司"
+    if sample_jobs:
+        description += f"，例如：{'、'.join(sample_jobs[:2])}"
+    
+    return {
+        'name': category,
+        'category': "开发",  # 统一分类
+        'avg_entry_salary': avg_salary,
+        'description': description,
+        'demand_level': min(5, 1 + summary['count'] // 10),  # 根据数量确定需求等级
+        'required_skills': ', '.join(summary['skills'][:5]),
+        'in_demand': summary['count'] >= 2,  # 有2个以上职位算需求高
+        'created_at': now,
+        'updated_at': now,
+    }
+
+def build_trend_rows(career_id, count, avg_salary, now):
+    """生成2020-2026年的就业率与薪资趋势行"""
+    employment_rows = []
+    salary_rows = []
+    for year in TREND_YEARS:
+        # 计算该年份的就业率（模拟）
+        if year == BASE_YEAR:
+            employment_rate = min(95, 70 + count * 2)
+        else:
+            # 其他年份模拟
+            diff = abs(year - BASE_YEAR)
+            employment_rate = 70 + count * 2 - diff * 5
+            employment_rate = max(60, min(95, employment_rate))
+        employment_rows.append({
+            'career_id': career_id, 'year': year, 'employment_rate': round(employment_rate, 1),
+            'created_at': now, 'updated_at': now,
+        })
+        
+        # 计算该年份的薪资：每年增长5%
+        year_salary = avg_salary * (1 + (year - BASE_YEAR) * 0.05)
+        salary_rows.append({
+            'career_id': career_id, 'year': year,
+            'avg_salary': round(year_salary, 2),
+            'min_salary': round(year_salary * 0.7, 2),
+            'max_salary': round(year_salary * 1.5, 2),
+            'created_at': now, 'updated_at': now,
+        })
+    return employment_rows, salary_rows
+
+def build_skill_rows(career_id, skills, now):
+    """取前5个技能，按顺序确定重要性（第一个最重要）"""
+    rows = []
+    for i, skill_name in enumerate(list(skills)[:5]):
+        importance = 5 - i
+        rows.append({
+            'career_id': career_id, 'skill_name': skill_name,
+            'importance_level': importance, 'is_required': importance >= 3,
+            'created_at': now, 'updated_at': now,
+        })
+    return rows
+
+
+def bulk_load_careers(summaries):
+    """集合式写入：先在内存中算好受影响职业的职业/趋势/技能行，再分批 upsert（不提交，由调用方统一提交）。
+    返回 (新建职业数, 更新职业数, 写入行数)
+    """
+    now = datetime.utcnow()
+    career_rows = [build_career_row(category, summary, now) for category, summary in summaries.items()]
+    names = [row['name'] for row in career_rows]
+    if not career_rows:
+        return 0, 0, 0
+    
+    existing = {name for (name,) in db.session.query(Career.name).filter(Career.name.in_(names))}
+    for row in career_rows:
+        action = "🔄 更新职业" if row['name'] in existing else "➕ 创建职业"
+        print(f"{action}: {row['name']} ({summaries[row['name']]['count']}条数据)")
+    
+    # 已有职业只更新统计类字段，保留原有的分类与技能描述
+    rows_written = bulk_upsert(Career, career_rows,
+                               ['avg_entry_salary', 'description', 'demand_level', 'in_demand', 'updated_at'])
+    career_ids = dict(db.session.query(Career.name, Career.id).filter(Career.name.in_(names)))
+    
+    employment_rows, salary_rows, skill_rows = [], [], []
+    for row in career_rows:
+        career_id = career_ids[row['name']]
+        summary = summaries[row['name']]
+        emp, sal = build_trend_rows(career_id, summary['count'], row['avg_entry_salary'], now)
+        employment_rows.extend(emp)
+        salary_rows.extend(sal)
+        skill_rows.extend(build_skill_rows(career_id, summary['skills'], now))
+    
+    rows_written += bulk_upsert(EmploymentRate, employment_rows, ['employment_rate', 'updated_at'])
+    rows_written += bulk_upsert(SalaryTrend, salary_rows,
+                                ['avg_salary', 'min_salary', 'max_salary', 'updated_at'])
+    rows_written += bulk_upsert(Skill, skill_rows, ['importance_level', 'is_required', 'updated_at'])
+    # 跌出前5的旧技能行删除，职业只保留本次的技能
+    for row in career_rows:
+        db.session.query(Skill).filter(
+            Skill.career_id == career_ids[row['name']],
+            Skill.skill_name.notin_(summaries[row['name']]['skills'][:5])).delete(synchronize_session=False)
+    
+    created_count = len(career_rows) - len(existing)
+    return created_count, len(existing), rows_written
+
+def retire_empty_careers(careers, summaries, now):
+    """受影响职业中已没有岗位的（最后的岗位变化到别的职业或被删除）：职业行保留（收藏等引用不受影响），
+    置为无需求状态，并删除按旧岗位生成的技能与趋势行（不提交，由调用方统一提交）。返回处理的职业数
+    """
+    emptied = [career for career in careers if career not in summaries]
+    if not emptied:
+        return 0
+    career_ids = [career_id for (career_id,) in db.session.query(Career.id).filter(Career.name.in_(emptied))]
+    if not career_ids:
+        return 0
+    db.session.query(Career).filter(Career.id.in_(career_ids)).update({
+        'avg_entry_salary': 0,
+        'description': func.concat(Career.name, '岗位，当前暂无在招岗位'),
+        'demand_level': 1,
+        'in_demand': False,
+        'updated_at': now,
+    }, synchronize_session=False)
+    for model in (Skill, EmploymentRate, SalaryTrend):
+        db.session.query(model).filter(model.career_id.in_(career_ids)).delete(synchronize_session=False)
+    return len(career_ids)
+
 def process_it_job_data():
-    """处理完整数据集并导入数据库"""
-    print("🚀 开始处理完整数据集...")
+    """增量导入数据集：只处理新增/变化的岗位，按差值更新职业聚合，只重算受影响的职业"""
+    print("🚀 开始处理数据集...")
     
-    # 数据文件路径 - 修改这里！
-    data_file = '../data/jobs.json'
+    # 数据文件路径 - 修改这里！（也可通过命令行参数指定文件、分片目录、Parquet 暂存库或 snapshot diff 文件）
+    data_file = sys.argv[1] if len(sys.argv) > 1 else '../data/jobs.json'
     
     if not os.path.exists(data_file):
         print(f"❌ 找不到数据文件: {data_file}")
@@ -127,7 +426,7 @@ def process_it_job_data():
     app = create_app()
     
     with app.app_context():
-        # 清空现有数据（可选）
+        # 清空现有数据（可选）：导入清单与聚合一并清空，本次按全量重建
         confirm = input("\n是否清空现有职业相关数据? (y/N): ").lower()
         if confirm == 'y':
             print("🧹 清空现有数据...")
@@ -135,378 +434,64 @@ def process_it_job_data():
             SalaryTrend.query.delete()
             Skill.query.delete()
             Career.query.delete()  # 也清除职业表，重新开始
+            ImportedJob.query.delete()
+            CareerAggregate.query.delete()
+            CareerSkillCount.query.delete()
             db.session.commit()
         
+        ensure_unique_keys()
+        manifest_size = ImportedJob.query.count()
+        print(f"📒 导入清单中已有 {manifest_size} 个岗位")
+        
+        # 流式读取（JSON数组/JSONL/分片目录，可压缩），按批与清单比对，不把整个文件载入内存
         print(f"📖 正在读取数据文件: {data_file}")
+        print("\n🔍 正在比对导入清单...")
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        deltas = {}
+        counters = Counter()
         
-        # 读取数据 - 添加这部分！
-        jobs = []
+        # 清单、聚合与职业数据在同一个事务中写入，失败整体回滚，下次重跑仍能得到同样的增量
         try:
-            # 尝试读取JSON文件（可能是数组或每行一个JSON对象）
-            with open(data_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                
-                # 检查是否为JSON数组
-                if content.startswith('['):
-                    jobs = json.loads(content)
-                else:
-                    # 可能是每行一个JSON对象
-                    lines = content.split('\n')
-                    for line in lines:
-                        if line.strip():
-                            try:
-                                jobs.append(json.loads(line.strip()))
-                            except json.JSONDecodeError:
-                                continue
-            
-            print(f"✅ 成功读取 {len(jobs)} 条职位数据")
-            
-        except Exception as e:
-            print(f"❌ 读取数据失败: {e}")
-            return
-        
-        # 定义IT职位判断函数 - 添加这个！
-        def is_it_job_simple(job_name, job_category):
-            """判断是否是IT职位"""
-            if not job_name:
-                return False
+            print(f"⚙️ 使用 {IMPORT_WORKERS} 个进程计算岗位贡献")
+            import_jobs(data_file, deltas, counters, now)
             
-            job_lower = job_name.lower()
-            job_cat_lower = str(job_category).lower() if job_category else ''
+            careers = apply_career_deltas(deltas, now)
+            summaries = load_career_summaries(careers)
             
-            # IT职位关键词
-            it_keywords = [
-                '开发', '工程', '测试', '运维', '数据', '算法', '网络', '安全',
-                '软件', '硬件', '前端', '后端', '全栈', '架构', '移动', 'app',
-                'java', 'python', 'c++', 'javascript', 'php', 'go', 'ruby',
-                '数据库', '系统', '嵌入式', '通信', '物联网', '云计算', '大数据',
-                '人工智能', '机器学习', '深度学习', '区块链', 'devops', 'sre',
-                'dba', 'ui设计', 'ux设计', '产品经理', '项目经理', '技术支持'
-            ]
-            
-            # 排除明显非IT职位
-            exclude_keywords = [
-                '教师', '教育', '培训', '销售', '市场', '行政', '财务', '会计',
-                '人力', '人事', '运营', '客服', '文员', '助理', '秘书', '司机',
-                '保安', '保洁', '厨师', '医生', '护士', '律师', '翻译', '编辑',
-                '记者', '文案', '策划', '设计', '管理', '主管', '经理', '总监',
-                '代表', '专员', '顾问', '分析', '投资', '金融', '保险', '银行'
-            ]
-            
-            # 检查排除关键词
-            for exclude in exclude_keywords:
-                if exclude in job_lower:
-                    return False
-            
-            # 检查IT关键词
-            for keyword in it_keywords:
-                if keyword in job_lower:
-                    return True
-            
-            return False
-        
-        # 筛选IT职位 - 添加这部分！
-        print("\n🔍 正在筛选IT职位...")
-        it_jobs = []
-        non_it_jobs = []
-        
-        for job in jobs:
-            job_name = job.get('job_name', job.get('title', ''))
-            job_category = job.get('job_catory', job.get('job_category', job.get('job_catory', '')))
+            print(f"\n📋 受影响的职业（本次增量）:")
+            for career in careers:
+                delta = deltas[career]
+                summary = summaries.get(career)
+                total = f"，现共 {summary['count']} 条，平均年薪 {summary['avg_salary']:,.0f} 元" if summary else "，已无岗位"
+                print(f"  {career}: {delta['count']:+d} 条{total}")
             
-            if is_it_job_simple(job_name, job_category):
-                it_jobs.append(job)
-            else:
-                non_it_jobs.append(job)
-        
-        print(f"✅ 筛选出 {len(it_jobs)} 个IT职位")
-        print(f"❌ 排除 {len(non_it_jobs)} 个非IT职位")
-        
-        if not it_jobs:
-            print("❌ 没有IT职位数据，无法导入")
+            # 批量写入受影响职业的职业、趋势与技能
+            print(f"\n💾 批量写入数据库...")
+            created_count, updated_count, rows_written = bulk_load_careers(summaries)
+            retired_count = retire_empty_careers(careers, summaries, now)
+            db.session.commit()
+        except (OSError, ValueError) as e:
+            db.session.rollback()
+            print(f"❌ 读取数据失败，已回滚: {e}")
             return
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ 增量导入失败，已回滚: {e}")
+            return
+        elapsed = time.perf_counter() - started
         
-        print(f"\n📊 开始处理 {len(it_jobs)} 个IT职位...")
-        
-        # 按职业分类统计
-        career_stats = defaultdict(lambda: {
-            'count': 0,
-            'salaries': [],
-            'skills': set(),
-            'companies': set(),
-            'job_names': []
-        })
-        
-        # 第一遍：统计信息
-        processed_count = 0
-        for job in it_jobs:
-            try:
-                job_name = job.get('job_name', '').strip()
-                if not job_name:
-                    continue
-                
-                # 分类 - 使用更智能的分类
-                category = classify_it_job(job_name)
-                
-                # 解析薪资（千元/月 → 元/年）
-                try:
-                    low_month = float(job.get('low_month_pay', 0))
-                    high_month = float(job.get('high_month_pay', 0))
-                except (ValueError, TypeError):
-                    low_month = 0
-                    high_month = 0
-                
-                # 计算年薪 - 改进的薪资处理
-                if low_month > 0 and high_month > 0:
-                    # 月薪(千元) → 年薪(元)
-                    low_annual = low_month * 1000 * 12
-                    high_annual = high_month * 1000 * 12
-                    avg_annual = (low_annual + high_annual) / 2
-                elif low_month > 0:
-                    avg_annual = low_month * 1000 * 12
-                elif high_month > 0:
-                    avg_annual = high_month * 1000 * 12
-                else:
-                    # 根据职位分类设定默认年薪
-                    if '算法' in category or 'AI' in category:
-                        avg_annual = 250000
-                    elif '后端' in category or '架构' in category:
-                        avg_annual = 200000
-                    elif '前端' in category or '数据' in category:
-                        avg_annual = 180000
-                    elif '测试' in category or '运维' in category:
-                        avg_annual = 150000
-                    else:
-                        avg_annual = 150000  # 默认15万元
-                
-                # 公司
-                company = job.get('company_name', '')
-                
-                # 提取技能 - 改进的技能提取
-                description = job.get('description', '')
-                skills = []
-                
-                job_name_lower = job_name.lower()
-                tech_keywords = [
-                    # 编程语言
-                    'Java', 'Python', 'C++', 'C#', 'JavaScript', 'PHP', 'Go', 'Rust',
-                    'Ruby', 'Swift', 'Kotlin', 'TypeScript', 'Scala', 'Perl',
-                    
-                    # 前端技术
-                    'React', 'Vue', 'Angular', 'jQuery', 'Bootstrap', 'Webpack',
-                    'Vite', 'Next.js', 'Nuxt.js', 'Sass', 'Less',
-                    
-                    # 后端技术
-                    'Spring', 'Spring Boot', 'Django', 'Flask', 'FastAPI', 'Express',
-                    'NestJS', '.NET', 'ASP.NET', 'Node.js', 'Laravel', 'Symfony',
-                    
-                    # 数据库
-                    'MySQL', 'PostgreSQL', 'MongoDB', 'Redis', 'Oracle', 'SQL Server',
-                    'SQLite', 'Elasticsearch', 'ClickHouse', 'TiDB', 'Cassandra',
-                    
-                    # 云计算与运维
-                    'Docker', 'Kubernetes', 'Linux', 'Shell', 'Nginx', 'Apache',
-                    'AWS', '阿里云', '腾讯云', '华为云', 'Azure', 'GCP',
-                    'Jenkins', 'GitLab CI', 'GitHub Actions', 'Ansible', 'Terraform',
-                    
-                    # 大数据与AI
-                    'Hadoop', 'Spark', 'Flink', 'Hive', 'Kafka', 'Storm',
-                    'TensorFlow', 'PyTorch', 'Scikit-learn', 'Pandas', 'NumPy',
-                    
-                    # 工具和框架
-                    'Git', 'SVN', 'Jira', 'Confluence', 'Postman', 'Swagger',
-                    'Maven', 'Gradle', 'WebSocket', 'RESTful', '微服务', '分布式'
-                ]
-                
-                # 从职位名称提取技能
-                for skill in tech_keywords:
-                    if skill.lower() in job_name_lower:
-                        skills.append(skill)
-                
-                # 从描述提取技能
-                if description:
-                    for skill in tech_keywords:
-                        if skill.lower() in description.lower():
-                            skills.append(skill)
-                
-                # 根据职位类别添加默认技能
-                if not skills:
-                    if '后端' in category:
-                        skills = ['Java', 'Spring', 'MySQL', 'Linux']
-                    elif '前端' in category:
-                        skills = ['JavaScript', 'React', 'Vue', 'HTML/CSS']
-                    elif '数据' in category:
-                        skills = ['Python', 'SQL', 'Hadoop', 'Spark']
-                    elif '算法' in category:
-                        skills = ['Python', 'TensorFlow', 'PyTorch', '机器学习']
-                    elif '测试' in category:
-                        skills = ['Python', 'Selenium', '自动化测试', 'Linux']
-                    elif '运维' in category:
-                        skills = ['Linux', 'Docker', 'Kubernetes', 'Shell']
-                    else:
-                        skills = ['Python', 'Java', 'SQL', 'Git']
-                
-                # 更新统计
-                stats = career_stats[category]
-                stats['count'] += 1
-                stats['salaries'].append(avg_annual)
-                if company:
-                    stats['companies'].add(company)
-                stats['skills'].update(skills)
-                stats['job_names'].append(job_name)
-                
-                processed_count += 1
-                if processed_count % 100 == 0:
-                    print(f"  已处理 {processed_count}/{len(it_jobs)} 条记录")
-                
-            except Exception as e:
-                print(f"⚠️ 处理职位失败: {job.get('job_name', '未知')} - {e}")
-                continue
-        
-        print(f"\n📋 职位分类统计:")
-        for category, stats in sorted(career_stats.items(), key=lambda x: x[1]['count'], reverse=True):
-            if stats['salaries']:
-                avg_salary = sum(stats['salaries']) / len(stats['salaries'])
-                print(f"  {category}: {stats['count']} 条, 平均年薪: {avg_salary:,.0f} 元")
-        
-        # 第二遍：创建或更新职业
-        created_count = 0
-        updated_count = 0
-        
-        for category, stats in career_stats.items():
-            if stats['count'] == 0:
-                continue
-            
-            # 计算平均薪资
-            avg_salary = sum(stats['salaries']) / len(stats['salaries']) if stats['salaries'] else 150000
-            
-            # 生成职业描述
-            company_count = len(stats['companies'])
-            sample_jobs = stats['job_names'][:3]  # 取前3个职位名称作为示例
-            
-            description = f"{category}岗位，平均年薪{avg_salary:,.0f}元"
-            if company_count > 0:
-                description += f"，来自{company_count}家公司"
-            if sample_jobs:
-                description += f"，例如：{'、'.join(sample_jobs[:2])}"
-            
-            # 查找或创建职业
-            career = Career.query.filter_by(name=category).first()
-            if not career:
-                career = Career(
-                    name=category,
-                    category="开发",  # 统一分类
-                    avg_entry_salary=avg_salary,
-                    description=description,
-                    demand_level=min(5, 1 + stats['count'] // 10),  # 根据数量确定需求等级
-                    required_skills=', '.join(list(stats['skills'])[:5]),
-                    in_demand=stats['count'] >= 2  # 有2个以上职位算需求高
-                )
-                db.session.add(career)
-                created_count += 1
-                print(f"➕ 创建职业: {category} ({stats['count']}条数据)")
-            else:
-                # 更新现有职业
-                career.avg_entry_salary = avg_salary
-                career.description = description
-                career.demand_level = min(5, 1 + stats['count'] // 10)
-                career.in_demand = stats['count'] >= 2
-                updated_count += 1
-                print(f"🔄 更新职业: {category} ({stats['count']}条数据)")
-            
-            # 需要先提交以获取career.id
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"❌ 提交职业失败: {e}")
-                continue
-            
-            # 生成2020-2026年的趋势数据
-            base_year = 2024  # 假设数据是2024年的
-            for year in range(2020, 2027):
-                try:
-                    # 计算该年份的就业率（模拟）
-                    if year == base_year:
-                        employment_rate = min(95, 70 + stats['count'] * 2)
-                    else:
-                        # 其他年份模拟
-                        diff = abs(year - base_year)
-                        employment_rate = 70 + stats['count'] * 2 - diff * 5
-                        employment_rate = max(60, min(95, employment_rate))
-                    
-                    # 创建就业率记录
-                    emp_record = EmploymentRate.query.filter_by(
-                        career_id=career.id, year=year
-                    ).first()
-                    
-                    if not emp_record:
-                        emp_record = EmploymentRate(
-                            career_id=career.id,
-                            year=year,
-                            employment_rate=round(employment_rate, 1)
-                        )
-                        db.session.add(emp_record)
-                    
-                    # 计算该年份的薪资
-                    year_diff = year - base_year
-                    year_salary = avg_salary * (1 + year_diff * 0.05)  # 每年增长5%
-                    
-                    # 创建薪资趋势记录
-                    salary_record = SalaryTrend.query.filter_by(
-                        career_id=career.id, year=year
-                    ).first()
-                    
-                    if not salary_record:
-                        salary_record = SalaryTrend(
-                            career_id=career.id,
-                            year=year,
-                            avg_salary=round(year_salary, 2),
-                            min_salary=round(year_salary * 0.7, 2),
-                            max_salary=round(year_salary * 1.5, 2)
-                        )
-                        db.session.add(salary_record)
-                    
-                except Exception as e:
-                    print(f"⚠️ 创建{year}年趋势数据失败: {e}")
-            
-            # 创建技能记录
-            if stats['skills']:
-                # 取前5个技能
-                top_skills = list(stats['skills'])[:5]
-                
-                for i, skill_name in enumerate(top_skills):
-                    try:
-                        # 根据顺序确定重要性
-                        importance = 5 - i  # 第一个最重要
-                        
-                        skill_record = Skill.query.filter_by(
-                            career_id=career.id,
-                            skill_name=skill_name
-                        ).first()
-                        
-                        if not skill_record:
-                            skill_record = Skill(
-                                career_id=career.id,
-                                skill_name=skill_name,
-                                importance_level=importance,
-                                is_required=importance >= 3
-                            )
-                            db.session.add(skill_record)
-                    except Exception as e:
-                        print(f"⚠️ 创建技能失败: {skill_name} - {e}")
-            
-            # 提交当前职业的所有数据
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"❌ 提交{category}数据失败: {e}")
+        print(f"✅ 共读取 {counters['total']} 条职位数据（{counters['total'] / max(elapsed, 1e-6):,.0f} 条/秒）")
+        print(f"   新增 {counters['new']}，变化 {counters['changed']}，未变 {counters['unchanged']}，"
+              f"删除 {counters['removed']}，其中非IT {counters['non_it']}，处理失败 {counters['failed']}")
+        print(f"⚡ 写入 {rows_written} 行，耗时 {elapsed:.2f} 秒")
         
         # 最终统计
         print(f"\n✅ 数据导入完成！")
         print(f"   创建: {created_count} 个新职业")
         print(f"   更新: {updated_count} 个现有职业")
+        if retired_count:
+            print(f"   停用: {retired_count} 个已无岗位的职业（技能与趋势数据已清除）")
         
         try:
             # 显示导入结果
@@ -520,6 +505,7 @@ def process_it_job_data():
             print(f"  就业率记录: {total_employment}")
             print(f"  薪资趋势记录: {total_salary}")
             print(f"  技能记录: {total_skills}")
+            print(f"  导入清单岗位数: {ImportedJob.query.count()}")
             
             # 显示所有职业
             print(f"\n📋 当前所有职业:")
@@ -535,51 +521,3 @@ def process_it_job_data():
 
 if __name__ == '__main__':
     process_it_job_data()
-
-def classify_it_job(job_name):
-    """根据职位名称智能分类IT职位"""
-    if not job_name:
-        return '其他IT职位'
-    
-    job_name_lower = job_name.lower()
-    
-    classification_rules = {
-        '后端开发工程师': ['后端开发', 'java开发', 'python开发', 'c++开发', 'go开发', 'php开发', '服务器开发'],
-        '前端开发工程师': ['前端开发', 'web前端', 'javascript开发', 'vue开发', 'react开发', 'angular开发'],
-        '移动开发工程师': ['android开发', 'ios开发', '移动开发', 'app开发', 'flutter', 'react native'],
-        '软件工程师': ['软件工程师', '软件开发'],
-        '算法工程师': ['算法工程师', '机器学习', '深度学习', '人工智能', 'ai工程师'],
-        '数据工程师': ['数据工程师', '数据分析师', '大数据工程师', 'etl工程师'],
-        '测试工程师': ['测试工程师', 'qa工程师', '测试开发', '软件测试'],
-        '运维工程师': ['运维工程师', 'devops', 'sre', '系统运维', '网络运维'],
-        '安全工程师': ['安全工程师', '网络安全', '信息安全', '渗透测试'],
-        '嵌入式工程师': ['嵌入式工程师', '嵌入式开发', '单片机', 'fpga'],
-        '硬件工程师': ['硬件工程师', 'pcb设计', '电路设计'],
-        '网络工程师': ['网络工程师', '通信工程师'],
-        'UI设计师': ['ui设计', 'ui', '视觉设计'],
-        'UX设计师': ['ux设计', 'ux', '交互设计'],
-        '产品经理': ['产品经理', '产品'],
-        '项目经理': ['项目经理', '项目'],
-        '架构师': ['架构师', '系统架构师'],
-        '数据库管理员': ['dba', '数据库管理员'],
-        '技术支持工程师': ['技术支持', '技术顾问']
-    }
-    
-    for category, keywords in classification_rules.items():
-        for keyword in keywords:
-            if keyword in job_name_lower:
-                return category
-    
-    # 如果没有匹配到，根据关键词返回
-    if any(word in job_name_lower for word in ['开发', '工程']):
-        return '开发工程师'
-    elif any(word in job_name_lower for word in ['数据', '分析']):
-        return '数据分析师'
-    elif any(word in job_name_lower for word in ['测试', 'qa']):
-        return '测试工程师'
-    elif any(word in job_name_lower for word in ['运维', 'devops']):
-        return '运维工程师'
-    elif any(word in job_name_lower for word in ['产品', 'pm']):
-        return '产品经理'
-    else:
-        return 'IT工程师'
\ No newline at end of file
@@ -0,0 +1,239 @@
+#职位规则引擎：IT职位筛选与职业分类的关键词规则，编译一次后批量匹配
+from collections import deque
+
+# ---------- 规则数据（筛选/分类函数与编译后的规则共用同一份） ----------
+
+# filter_it_jobs.is_it_job：职位名称中的IT关键词（更严格）
+FILTER_IT_KEYWORDS = [
+    '后端', '前端', '全栈', '开发', '工程师', '架构', '算法',
+    '数据', '分析', '运维', '测试', 'QA', 'DevOps', 'SRE',
+    '机器学习', '人工智能', 'AI', '大数据', '云计算', '区块链',
+    '安全', '网络安全', '信息安全', '软件', '硬件', '嵌入式',
+    'Java', 'Python', 'C++', 'C#', 'Go', 'PHP', 'JavaScript',
+    'Android', 'iOS', '移动开发', 'App开发', 'Web开发',
+    'DBA', '数据库', '系统', '网络', '通信', '物联网'
+]
+# 排除明显非IT的职位（更严格）
+FILTER_EXCLUDE_KEYWORDS = [
+    '教师', '教育', '培训', '销售', '市场', '营销', '推广', '运营',
+    '行政', '文员', '助理', '秘书', '人事', '人力', 'hr', '财务', '会计',
+    '客服', '售后', '售前', '技术支持', '技术顾问',  # 这些可能属于IT，但先排除
+    '司机', '保安', '保洁', '厨师', '医生', '护士', '律师', '翻译',
+    '编辑', '记者', '文案', '策划', '设计',  # 泛设计可能包含UI，但这里排除
+    '管理', '主管', '经理', '总监', '代表', '专员'  # 泛管理职位
+]
+# 编程语言或技术栈关键词
+FILTER_TECH_KEYWORDS = [
+    'java', 'python', 'c++', 'c#', 'javascript', 'php', 'go', 'ruby',
+    'react', 'vue', 'angular', 'spring', 'django', 'flask',
+    'mysql', 'oracle', 'sql', 'mongodb', 'redis',
+    'linux', 'docker', 'kubernetes', 'aws', '云计算'
+]
+# 职位类别中的IT关键词（区分大小写）
+FILTER_IT_CATEGORIES = [
+    '计算机', '软件', '互联网', 'IT', '通信', '电子', '网络',
+    '游戏', '电子商务', '大数据', '人工智能', '云计算'
+]
+
+# import_crawler_data_v2.is_it_job_simple：IT职位关键词
+IMPORT_IT_KEYWORDS = [
+    '开发', '工程', '测试', '运维', '数据', '算法', '网络', '安全',
+    '软件', '硬件', '前端', '后端', '全栈', '架构', '移动', 'app',
+    'java', 'python', 'c++', 'javascript', 'php', 'go', 'ruby',
+    '数据库', '系统', '嵌入式', '通信', '物联网', '云计算', '大数据',
+    '人工智能', '机器学习', '深度学习', '区块链', 'devops', 'sre',
+    'dba', 'ui设计', 'ux设计', '产品经理', '项目经理', '技术支持'
+]
+# 排除明显非IT职位
+IMPORT_EXCLUDE_KEYWORDS = [
+    '教师', '教育', '培训', '销售', '市场', '行政', '财务', '会计',
+    '人力', '人事', '运营', '客服', '文员', '助理', '秘书', '司机',
+    '保安', '保洁', '厨师', '医生', '护士', '律师', '翻译', '编辑',
+    '记者', '文案', '策划', '设计', '管理', '主管', '经理', '总监',
+    '代表', '专员', '顾问', '分析', '投资', '金融', '保险', '银行'
+]
+
+# import_crawler_data_v2.classify_it_job：职业分类规则（按顺序取第一个命中的分类）
+CAREER_RULES = [
+    ('后端开发工程师', ['后端开发', 'java开发', 'python开发', 'c++开发', 'go开发', 'php开发', '服务器开发']),
+    ('前端开发工程师', ['前端开发', 'web前端', 'javascript开发', 'vue开发', 'react开发', 'angular开发']),
+    ('移动开发工程师', ['android开发', 'ios开发', '移动开发', 'app开发', 'flutter', 'react native']),
+    ('全栈开发工程师', ['全栈开发', '全栈工程师']),
+    ('软件工程师', ['软件工程师', '软件开发']),
+    ('算法工程师', ['算法工程师', '机器学习', '深度学习', '人工智能', 'ai工程师']),
+    ('数据工程师', ['数据工程师', '数据分析师', '大数据工程师', 'etl工程师']),
+    ('测试工程师', ['测试工程师', 'qa工程师', '测试开发', '软件测试']),
+    ('运维工程师', ['运维工程师', 'devops', 'sre', '系统运维', '网络运维']),
+    ('安全工程师', ['安全工程师', '网络安全', '信息安全', '渗透测试']),
+    ('嵌入式工程师', ['嵌入式工程师', '嵌入式开发', '单片机', 'fpga']),
+    ('硬件工程师', ['硬件工程师', 'pcb设计', '电路设计']),
+    ('通信工程师', ['通信工程师', '网络工程师', '通信技术']),
+    ('UI/UX设计师', ['ui设计', 'ux设计', '交互设计', '视觉设计', 'ui设计师']),
+    ('产品经理', ['产品经理', '产品专员']),
+    ('项目经理', ['项目经理', '项目专员']),
+    ('数据库管理员', ['dba', '数据库管理员']),
+    ('系统架构师', ['系统架构师', '架构师']),
+]
+CAREER_DEFAULT = '其他职业'
+
+# filter_it_jobs.classify_it_job：更细的IT职位分类，未命中时再按通用关键词兜底
+IT_JOB_RULES = [
+    ('后端开发工程师', ['后端开发', 'java开发', 'python开发', 'c++开发', 'go开发', 'php开发', '服务器开发']),
+    ('前端开发工程师', ['前端开发', 'web前端', 'javascript开发', 'vue开发', 'react开发', 'angular开发']),
+    ('移动开发工程师', ['android开发', 'ios开发', '移动开发', 'app开发', 'flutter', 'react native']),
+    ('软件工程师', ['软件工程师', '软件开发']),
+    ('算法工程师', ['算法工程师', '机器学习', '深度学习', '人工智能', 'ai工程师']),
+    ('数据工程师', ['数据工程师', '数据分析师', '大数据工程师', 'etl工程师']),
+    ('测试工程师', ['测试工程师', 'qa工程师', '测试开发', '软件测试']),
+    ('运维工程师', ['运维工程师', 'devops', 'sre', '系统运维', '网络运维']),
+    ('安全工程师', ['安全工程师', '网络安全', '信息安全', '渗透测试']),
+    ('嵌入式工程师', ['嵌入式工程师', '嵌入式开发', '单片机', 'fpga']),
+    ('硬件工程师', ['硬件工程师', 'pcb设计', '电路设计']),
+    ('网络工程师', ['网络工程师', '通信工程师']),
+    ('UI设计师', ['ui设计', 'ui', '视觉设计']),
+    ('UX设计师', ['ux设计', 'ux', '交互设计']),
+    ('产品经理', ['产品经理', '产品']),
+    ('项目经理', ['项目经理', '项目']),
+    ('架构师', ['架构师', '系统架构师']),
+    ('数据库管理员', ['dba', '数据库管理员']),
+    ('技术支持工程师', ['技术支持', '技术顾问']),
+]
+IT_JOB_FALLBACK_RULES = [
+    ('开发工程师', ['开发', '工程']),
+    ('数据分析师', ['数据', '分析']),
+    ('测试工程师', ['测试', 'qa']),
+    ('运维工程师', ['运维', 'devops']),
+    ('产品经理', ['产品', 'pm']),
+]
+IT_JOB_DEFAULT = 'IT工程师'
+IT_JOB_EMPTY = '其他IT职位'
+
+
+# ---------- 编译后的规则 ----------
+
+_MISSING = object()  # 缓存未命中（匹配结果本身可能是 None）
+
+class KeywordRules:
+    """有序的 (标签, 关键词列表) 规则：文本中命中的关键词里取规则顺序最靠前的标签，
+    与“按顺序逐个 in 判断、返回第一个命中”的结果一致。
+
+    全部关键词编译成一个 Aho-Corasick 自动机（状态转移表已补全失配跳转），逐字符走一遍文本就能找出
+    所有命中（含互相重叠的关键词），每个状态记录其命中关键词中的最高优先级。结果按原文缓存（职位名称重复度很高）。
+    """
+    CACHE_LIMIT = 200_000
+
+    def __init__(self, rules, default=None, lowercase=True, empty=None):
+        self.default = default
+        self.empty = default if empty is None else empty
+        self.lowercase = lowercase
+        self.priority = {}  # 关键词 -> 优先级（同一关键词出现多次时取最靠前的一次）
+        self.labels = []
+        for label, keywords in rules:
+            for keyword in keywords:
+                keyword = keyword.lower() if lowercase else keyword
+                if keyword and keyword not in self.priority:
+                    self.priority[keyword] = len(self.labels)
+                    self.labels.append(label)
+        # 优先级低于 stop 的关键词都属于第一个标签，命中后结果不会再变，可以提前结束扫描
+        self.stop = next((i for i, label in enumerate(self.labels) if label != self.labels[0]), len(self.labels))
+        self._build(self.priority)
+        self.cache = {}
+
+    def _build(self, priority):
+        # 字典树：transitions[状态][字符] -> 下一状态，best[状态] 为以该状态结尾的关键词的最高优先级
+        transitions = [{}]
+        best = [None]
+        for keyword, rank in priority.items():
+            state = 0
+            for char in keyword:
+                next_state = transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(transitions)
+                    transitions[state][char] = next_state
+                    transitions.append({})
+                    best.append(None)
+                state = next_state
+            best[state] = rank
+        # 按广度优先计算失配指针，并把失配状态的转移与命中并入当前状态，匹配时无需回溯
+        fail = [0] * len(transitions)
+        queue = deque(transitions[0].values())
+        goto = [dict(edges) for edges in transitions]
+        while queue:
+            state = queue.popleft()
+            fallback = fail[state]
+            if best[fallback] is not None and (best[state] is None or best[fallback] < best[state]):
+                best[state] = best[fallback]
+            for char, next_state in transitions[fallback].items():
+                transitions[state].setdefault(char, next_state)
+            for char, next_state in goto[state].items():
+                if state:
+                    fail[next_state] = transitions[fallback].get(char, 0)
+                queue.append(next_state)
+        self.transitions = transitions
+        self.best = best
+
+    def _scan(self, text):
+        transitions = self.transitions
+        best_by_state = self.best
+        stop = self.stop
+        state = 0
+        best = None
+        for char in text:
+            state = transitions[state].get(char, 0)
+            rank = best_by_state[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best < stop:
+                    break
+        return best
+
+    def match(self, text):
+        if not text or not isinstance(text, str):
+            return self.empty
+        result = self.cache.get(text, _MISSING)
+        if result is not _MISSING:
+            return result
+        best = self._scan(text.lower() if self.lowercase else text)
+        result = self.default if best is None else self.labels[best]
+        if len(self.cache) >= self.CACHE_LIMIT:
+            self.cache.clear()
+        self.cache[text] = result
+        return result
+
+    def match_many(self, texts):
+        """批量匹配：相同文本只计算一次"""
+        results = {text: self.match(text) for text in dict.fromkeys(texts)}
+        return [results[text] for text in texts]
+
+    def match_series(self, series):
+        """pandas Series：只对去重后的取值匹配，再映射回整列"""
+        return series.map({value: self.match(value) for value in series.unique()})
+
+
+class ItJobFilter:
+    """IT职位判断：名称先查排除词（命中即否），再查IT/技术关键词（命中即是），都未命中时看职位类别"""
+
+    def __init__(self, exclude, include, categories=()):
+        self.name_rules = KeywordRules([(False, exclude), (True, include)])
+        # 没有类别关键词时不看职位类别
+        self.category_rules = KeywordRules([(True, categories)], default=False, lowercase=False) if categories else None
+
+    def is_it_job(self, job_name, job_category=None):
+        if not job_name:
+            return False
+        verdict = self.name_rules.match(job_name)
+        if verdict is None and self.category_rules is not None:
+            verdict = bool(job_category) and self.category_rules.match(str(job_category))
+        return bool(verdict)
+
+    def is_it_job_many(self, job_names, job_categories=None):
+        if job_categories is None:
+            job_categories = [None] * len(job_names)
+        # 名称与类别的匹配结果各自按原文缓存，重复的职位不会重复扫描
+        return [self.is_it_job(job_name, job_category) for job_name, job_category in zip(job_names, job_categories)]
+
+
+FILTER_IT_JOB = ItJobFilter(FILTER_EXCLUDE_KEYWORDS, FILTER_IT_KEYWORDS + FILTER_TECH_KEYWORDS, FILTER_IT_CATEGORIES)
+IMPORT_IT_JOB = ItJobFilter(IMPORT_EXCLUDE_KEYWORDS, IMPORT_IT_KEYWORDS)
+CAREER_CLASSIFIER = KeywordRules(CAREER_RULES, default=CAREER_DEFAULT)
+IT_JOB_CLASSIFIER = KeywordRules(IT_JOB_RULES + IT_JOB_FALLBACK_RULES, default=IT_JOB_DEFAULT, empty=IT_JOB_EMPTY)
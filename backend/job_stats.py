@@ -0,0 +1,184 @@
+#职位统计：单个岗位对职业聚合的贡献与可合并的部分聚合（不依赖数据库，可在子进程中运行）
+import json
+import os
+import sys
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.crawler.dedup import record_content_hash
+from job_rules import CAREER_CLASSIFIER, IMPORT_IT_JOB
+
+# 技能关键词（从职位名称与描述中提取）
+TECH_KEYWORDS = [
+    # 编程语言
+    'Java', 'Python', 'C++', 'C#', 'JavaScript', 'PHP', 'Go', 'Rust',
+    'Ruby', 'Swift', 'Kotlin', 'TypeScript', 'Scala', 'Perl',
+    
+    # 前端技术
+    'React', 'Vue', 'Angular', 'jQuery', 'Bootstrap', 'Webpack',
+    'Vite', 'Next.js', 'Nuxt.js', 'Sass', 'Less',
+    
+    # 后端技术
+    'Spring', 'Spring Boot', 'Django', 'Flask', 'FastAPI', 'Express',
+    'NestJS', '.NET', 'ASP.NET', 'Node.js', 'Laravel', 'Symfony',
+    
+    # 数据库
+    'MySQL', 'PostgreSQL', 'MongoDB', 'Redis', 'Oracle', 'SQL Server',
+    'SQLite', 'Elasticsearch', 'ClickHouse', 'TiDB', 'Cassandra',
+    
+    # 云计算与运维
+    'Docker', 'Kubernetes', 'Linux', 'Shell', 'Nginx', 'Apache',
+    'AWS', '阿里云', '腾讯云', '华为云', 'Azure', 'GCP',
+    'Jenkins', 'GitLab CI', 'GitHub Actions', 'Ansible', 'Terraform',
+    
+    # 大数据与AI
+    'Hadoop', 'Spark', 'Flink', 'Hive', 'Kafka', 'Storm',
+    'TensorFlow', 'PyTorch', 'Scikit-learn', 'Pandas', 'NumPy',
+    
+    # 工具和框架
+    'Git', 'SVN', 'Jira', 'Confluence', 'Postman', 'Swagger',
+    'Maven', 'Gradle', 'WebSocket', 'RESTful', '微服务', '分布式'
+]
+
+def summarize_job(job):
+    """单个岗位对职业聚合的贡献：非IT岗位返回 None，否则返回职业分类、年薪、公司与技能"""
+    job_name = job.get('job_name', job.get('title', ''))
+    job_category = job.get('job_catory', job.get('job_category', job.get('job_catory', '')))
+    if not IMPORT_IT_JOB.is_it_job(job_name, job_category):
+        return None
+    
+    job_name = (job.get('job_name') or '').strip()
+    if not job_name:
+        return None
+    
+    # 分类 - 使用更智能的分类
+    category = CAREER_CLASSIFIER.match(job_name)
+    
+    # 解析薪资（千元/月 → 元/年）
+    try:
+        low_month = float(job.get('low_month_pay', 0))
+        high_month = float(job.get('high_month_pay', 0))
+    except (ValueError, TypeError):
+        low_month = 0
+        high_month = 0
+    
+    # 计算年薪 - 改进的薪资处理
+    if low_month > 0 and high_month > 0:
+        # 月薪(千元) → 年薪(元)
+        low_annual = low_month * 1000 * 12
+        high_annual = high_month * 1000 * 12
+        avg_annual = (low_annual + high_annual) / 2
+    elif low_month > 0:
+        avg_annual = low_month * 1000 * 12
+    elif high_month > 0:
+        avg_annual = high_month * 1000 * 12
+    else:
+        # 根据职位分类设定默认年薪
+        if '算法' in category or 'AI' in category:
+            avg_annual = 250000
+        elif '后端' in category or '架构' in category:
+            avg_annual = 200000
+        elif '前端' in category or '数据' in category:
+            avg_annual = 180000
+        elif '测试' in category or '运维' in category:
+            avg_annual = 150000
+        else:
+            avg_annual = 150000  # 默认15万元
+    
+    # 提取技能：从职位名称和描述中匹配
+    text_lower = job_name.lower() + '\n' + (job.get('description') or '').lower()
+    skills = [skill for skill in TECH_KEYWORDS if skill.lower() in text_lower]
+    
+    # 根据职位类别添加默认技能
+    if not skills:
+        if '后端' in category:
+            skills = ['Java', 'Spring', 'MySQL', 'Linux']
+        elif '前端' in category:
+            skills = ['JavaScript', 'React', 'Vue', 'HTML/CSS']
+        elif '数据' in category:
+            skills = ['Python', 'SQL', 'Hadoop', 'Spark']
+        elif '算法' in category:
+            skills = ['Python', 'TensorFlow', 'PyTorch', '机器学习']
+        elif '测试' in category:
+            skills = ['Python', 'Selenium', '自动化测试', 'Linux']
+        elif '运维' in category:
+            skills = ['Linux', 'Docker', 'Kubernetes', 'Shell']
+        else:
+            skills = ['Python', 'Java', 'SQL', 'Git']
+    
+    return {
+        'career': category,
+        'job_name': job_name[:200],
+        'company': (job.get('company_name') or '')[:200],
+        'annual_salary': avg_annual,
+        'skills': skills,
+    }
+
+# 计算贡献用到的字段：从 Parquet 暂存库读取时只读这些列（content_hash 为原始记录的哈希）
+IMPORT_COLUMNS = [
+    'job_id', 'job_name', 'title', 'job_catory', 'job_category', 'low_month_pay', 'high_month_pay',
+    'company_name', 'description', 'change_type', 'content_hash',
+]
+
+def job_key(job):
+    """清单表主键：job_id，缺失时退回内容哈希"""
+    job_id = job.get('job_id')
+    return str(job_id) if job_id else 'hash:' + record_content_hash(job)
+
+def add_contribution(deltas, career, annual_salary, skills, sign=1):
+    """deltas：职业 -> 岗位数、年薪合计、技能计数的增量（减少时为负）"""
+    delta = deltas.setdefault(career, {'count': 0, 'salary_sum': 0.0, 'skills': Counter()})
+    delta['count'] += sign
+    delta['salary_sum'] += sign * (annual_salary or 0)
+    for skill in skills:
+        delta['skills'][skill] += sign
+
+def merge_career_deltas(target, partial):
+    """把部分聚合合并进 target（逐项相加，满足结合律，合并顺序不影响结果）"""
+    for career, delta in partial.items():
+        merged = target.setdefault(career, {'count': 0, 'salary_sum': 0.0, 'skills': Counter()})
+        merged['count'] += delta['count']
+        merged['salary_sum'] += delta['salary_sum']
+        merged['skills'].update(delta['skills'])
+    return target
+
+def summarize_batch(batch, known_hashes):
+    """进程池任务：对一批 (清单主键, 岗位) 计算内容哈希，跳过与清单一致的岗位，
+    新增/变化的岗位计算贡献并汇总成部分聚合。known_hashes 为这批岗位在清单中已有的哈希。
+    旧贡献的扣除与数据库写入由父进程完成。
+    """
+    result = {'deltas': {}, 'upserts': [], 'unchanged': [], 'removed': [], 'failed': [],
+              'counters': Counter()}
+    for key, job in batch:
+        old_hash = known_hashes.get(key)
+        if job.get('change_type') == 'removed':
+            if old_hash is not None:
+                result['removed'].append(key)
+            continue
+        digest = record_content_hash(job)
+        if digest == old_hash:
+            result['unchanged'].append(key)
+            continue
+        
+        try:
+            contribution = summarize_job(job)
+        except Exception as e:
+            # 不写入清单，下次导入时重新处理
+            result['failed'].append(f"{job.get('job_name', '未知')} - {e}")
+            continue
+        result['counters']['changed' if old_hash is not None else 'new'] += 1
+        if contribution is None:
+            result['counters']['non_it'] += 1
+        else:
+            add_contribution(result['deltas'], contribution['career'], contribution['annual_salary'],
+                             contribution['skills'])
+        result['upserts'].append({
+            'job_id': key, 'content_hash': digest,
+            'career': contribution and contribution['career'],
+            'job_name': contribution and contribution['job_name'],
+            'company': contribution and contribution['company'],
+            'annual_salary': contribution and contribution['annual_salary'],
+            'skills': contribution and json.dumps(contribution['skills'], ensure_ascii=False),
+        })
+    return result
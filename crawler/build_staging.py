@@ -0,0 +1,63 @@
+# crawler/build_staging.py
+# 把爬取输出转成按发布月份/省份分区的 Parquet 暂存库，供看板、模型训练与导入脚本按列读取
+#
+# 用法（在 crawler/ 目录下）：
+#   python build_staging.py                                  # 默认读取 data/jobs_shards（无清单时读 data/jobs.json）
+#   python build_staging.py data/jobs.json --output-dir data/jobs_parquet --compression zstd
+#
+# 每次运行整体重建暂存库（先写 <output-dir>.part，完成后替换），需要安装 pyarrow
+import argparse
+import os
+import sys
+
+CRAWLER_ROOT = os.path.dirname(os.path.abspath(__file__))
+if CRAWLER_ROOT not in sys.path:
+    sys.path.insert(0, CRAWLER_ROOT)
+
+from crawler.feeds import DATA_DIR, DEFAULT_SHARDS_DIR, MANIFEST_NAME
+from crawler.staging import (DEFAULT_BATCH_RECORDS, DEFAULT_ROW_GROUP_ROWS, DEFAULT_ROWS_PER_FILE,
+                             DEFAULT_STAGING_DIR, build_staging_from)
+
+
+def default_source():
+    if os.path.exists(os.path.join(DEFAULT_SHARDS_DIR, MANIFEST_NAME)):
+        return DEFAULT_SHARDS_DIR
+    return os.path.join(DATA_DIR, 'jobs.json')
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬取输出 → 分区 Parquet 暂存库")
+    parser.add_argument('source', nargs='?', default=None,
+                        help="爬取输出：分片目录或 JSON数组/JSONL 文件（可压缩），默认 data/jobs_shards 或 data/jobs.json")
+    parser.add_argument('--output-dir', default=DEFAULT_STAGING_DIR, help="暂存库目录（默认 data/jobs_parquet）")
+    parser.add_argument('--compression', default='zstd', choices=['zstd', 'snappy', 'gzip', ''],
+                        help="Parquet 压缩格式（留空不压缩）")
+    parser.add_argument('--batch-records', type=int, default=DEFAULT_BATCH_RECORDS, help="每次转换的记录数")
+    parser.add_argument('--rows-per-file', type=int, default=DEFAULT_ROWS_PER_FILE, help="单个 Parquet 文件的最大行数")
+    parser.add_argument('--row-group-rows', type=int, default=DEFAULT_ROW_GROUP_ROWS, help="每个分区的行组大小")
+    args = parser.parse_args()
+
+    source = args.source or default_source()
+    if not os.path.exists(source):
+        print(f"找不到爬取输出：{source}")
+        return 1
+
+    info = build_staging_from(source, args.output_dir, compression=args.compression,
+                              batch_records=args.batch_records, rows_per_file=args.rows_per_file,
+                              row_group_rows=args.row_group_rows)
+    source_size = directory_size(source) if os.path.isdir(source) else os.path.getsize(source)
+    staged_size = directory_size(args.output_dir)
+    print(f"转换完成（{info['seconds']} 秒）：{info['records']} 条记录，{len(info['partitions'])} 个分区")
+    if info['coerce_failures']:
+        print(f"类型转换失败（原值保存在 extra 列）：{', '.join(f'{k}={v}' for k, v in info['coerce_failures'].items())}")
+    print(f"体积：{source_size / 1024 / 1024:.1f} MB → {staged_size / 1024 / 1024:.1f} MB")
+    print(f"暂存库已写入 {args.output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
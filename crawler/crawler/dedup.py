@@ -0,0 +1,225 @@
+# crawler/crawler/dedup.py
+# 跨运行的岗位去重：布隆过滤器（内存有界）+ SQLite 精确索引（job_id -> 内容哈希）
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import struct
+import time
+
+from filelock import FileLock
+
+DEFAULT_DEDUP_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'dedup.sqlite')
+
+# 由查询组合决定、而非岗位本身内容的字段：同一岗位在不同组合下这些字段不同，不参与内容哈希
+PROVENANCE_FIELDS = frozenset({
+    'job_catory', 'job_industry', 'prinvce_code_nme',
+    'search_area_code', 'search_area_name', 'search_keyword',
+    'search_category_code', 'search_industry_code', 'source_url',
+    'change_type', 'changed_fields', 'content_hash',
+})
+
+NEW, UPDATED, DUPLICATE = 'new', 'updated', 'duplicate'
+
+
+def content_hash(record):
+    """岗位内容哈希（忽略溯源字段），用于判断同一 job_id 的内容是否变化"""
+    content = {k: v for k, v in record.items() if k not in PROVENANCE_FIELDS}
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def record_content_hash(record):
+    """优先使用记录自带的内容哈希（Parquet 暂存库保存了转换前原始记录的哈希），否则现算"""
+    return record.get('content_hash') or content_hash(record)
+
+
+class BloomFilter:
+    """定长位数组布隆过滤器，可持久化到文件"""
+    HEADER = struct.Struct('<QIIQ')  # 位数、哈希函数个数、已添加元素数、水位线（由调用方维护）
+
+    def __init__(self, capacity=2_000_000, error_rate=0.001):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self.watermark = 0
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+        self.watermark = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.num_bits, self.num_hashes, self.count, self.watermark))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    def _read(self, path):
+        """读取文件中的 (元素数, 水位线, 位数组)；文件不存在、参数或格式不一致时返回 None"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            header = f.read(self.HEADER.size)
+            if len(header) != self.HEADER.size:
+                return None
+            num_bits, num_hashes, count, watermark = self.HEADER.unpack(header)
+            if (num_bits, num_hashes) != (self.num_bits, self.num_hashes):
+                return None
+            bits = f.read()
+        if len(bits) != len(self.bits):
+            return None
+        return count, watermark, bits
+
+    def load(self, path):
+        """从文件恢复；参数不一致（容量/误判率已修改）时返回False，由调用方重建"""
+        saved = self._read(path)
+        if saved is None:
+            return False
+        self.count, self.watermark, bits = saved
+        self.bits = bytearray(bits)
+        return True
+
+    def merge(self, path):
+        """并入文件中的位（按位或），水位线取较大者；多个进程先后保存时不会互相覆盖对方添加的元素"""
+        saved = self._read(path)
+        if saved is None:
+            return
+        count, watermark, bits = saved
+        merged = int.from_bytes(self.bits, 'little') | int.from_bytes(bits, 'little')
+        self.bits = bytearray(merged.to_bytes(len(self.bits), 'little'))
+        if watermark > self.watermark:
+            self.count, self.watermark = count, watermark
+
+
+class JobDedupStore:
+    """去重存储：布隆过滤器判定“一定没见过”时免去查询，其余情况以SQLite精确索引为准。
+
+    写入先缓存在内存中，按条数/时间批量提交，每次只短暂持有写锁，
+    多个进程可以共享同一个数据库（WAL模式）。并发进程的布隆过滤器互不同步，
+    同一岗位可能在两个进程中都判为 new，合并输出时需再按 job_id 去重。
+    布隆过滤器文件记录已覆盖的最大 rowid，打开时补入之后写入库中的岗位，关闭时与文件按位合并，
+    因此其他进程写入或上次异常退出未保存过滤器都不会造成漏判。
+    auto_commit=False 时不自动提交，由调用方在记录确实写出后 commit(job_ids)。
+    """
+
+    def __init__(self, db_path=DEFAULT_DEDUP_DB, bloom_capacity=2_000_000, bloom_error_rate=0.001,
+                 commit_every=1000, commit_seconds=2, auto_commit=True):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.bloom_path = db_path + '.bloom'
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+        self.auto_commit = auto_commit
+        self.pending_rows = {}  # job_id -> (content_hash, seen_at)
+        self.last_commit = time.time()
+
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id       TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                first_seen   INTEGER NOT NULL,
+                last_seen    INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+        self.bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self.bloom.load(self.bloom_path)
+        self._sync_bloom(verify=True)
+
+    def _sync_bloom(self, verify=False):
+        """把水位线（已覆盖的最大 rowid）之后写入的岗位补进布隆过滤器；
+        verify=True 时核对补入后的条数与库中一致，不一致（文件缺失/损坏、库中有删除）则全量重建
+        """
+        self.conn.execute("BEGIN")  # 同一读事务内统计与补入，看到的是同一快照
+        try:
+            total, max_rowid = self.conn.execute("SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM jobs").fetchone()
+            (new_rows,) = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE rowid > ?", (self.bloom.watermark,)).fetchone()
+            if verify and self.bloom.count + new_rows != total:
+                self.bloom.clear()
+                rows = self.conn.execute("SELECT job_id FROM jobs")
+            else:
+                rows = self.conn.execute("SELECT job_id FROM jobs WHERE rowid > ?", (self.bloom.watermark,))
+            for (job_id,) in rows:
+                self.bloom.add(job_id)
+        finally:
+            self.conn.commit()
+        self.bloom.count = total
+        self.bloom.watermark = max_rowid
+
+    def _known_hash(self, job_id):
+        if job_id in self.pending_rows:
+            return self.pending_rows[job_id][0]
+        if job_id not in self.bloom:
+            return None
+        row = self.conn.execute("SELECT content_hash FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def check(self, job_id, record_hash):
+        """登记一条岗位并返回 new / updated / duplicate"""
+        known_hash = self._known_hash(job_id)
+        if known_hash is None:
+            status = NEW
+            self.bloom.add(job_id)
+        elif known_hash == record_hash:
+            status = DUPLICATE
+        else:
+            status = UPDATED
+
+        self.pending_rows[job_id] = (record_hash, int(time.time()))
+        if self.auto_commit and (len(self.pending_rows) >= self.commit_every
+                                 or time.time() - self.last_commit >= self.commit_seconds):
+            self.commit()
+        return status
+
+    def commit(self, job_ids=None):
+        """批量写入：新岗位插入，已有岗位更新内容哈希与最后出现时间（保留首次出现时间）。
+        指定 job_ids 时只提交其中的岗位，其余继续留在内存中
+        """
+        self.last_commit = time.time()
+        if job_ids is None:
+            rows, self.pending_rows = self.pending_rows, {}
+        else:
+            rows = {job_id: self.pending_rows.pop(job_id) for job_id in job_ids if job_id in self.pending_rows}
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO jobs (job_id, content_hash, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET content_hash = excluded.content_hash, last_seen = excluded.last_seen",
+                [(job_id, record_hash, seen_at, seen_at)
+                 for job_id, (record_hash, seen_at) in rows.items()])
+
+    def discard(self, job_id):
+        """放弃尚未提交的登记（记录最终没有写出），下次运行重新判定"""
+        self.pending_rows.pop(job_id, None)
+
+    def close(self, commit_pending=True):
+        if commit_pending:
+            self.commit()
+        self.pending_rows = {}
+        self._sync_bloom()
+        with FileLock(self.bloom_path + '.lock', timeout=60):
+            self.bloom.merge(self.bloom_path)
+            self.bloom.save(self.bloom_path)
+        self.conn.close()
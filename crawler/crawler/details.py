@@ -0,0 +1,66 @@
+# crawler/crawler/details.py
+# 岗位详情缓存：以列表内容哈希为key（内容寻址），岗位内容不变则详情直接复用，不再请求详情页
+import os
+import sqlite3
+import time
+
+DEFAULT_DETAIL_CACHE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'job_details.sqlite')
+
+
+class DetailCache:
+    """content_hash -> description（空字符串表示详情页中没有描述，同样缓存，避免反复请求）。
+
+    写入按条数/时间批量提交；WAL模式，多进程分片爬取可共享同一个缓存库。
+    """
+
+    def __init__(self, db_path=DEFAULT_DETAIL_CACHE_DB, commit_every=200, commit_seconds=5):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+        self.pending_rows = {}  # content_hash -> (job_id, description, fetched_at)
+        self.last_commit = time.time()
+
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_details (
+                content_hash TEXT PRIMARY KEY,
+                job_id       TEXT NOT NULL,
+                description  TEXT NOT NULL,
+                fetched_at   INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM job_details").fetchone()[0] + len(self.pending_rows)
+
+    def get(self, content_hash):
+        """已缓存的描述；未缓存返回 None"""
+        if content_hash in self.pending_rows:
+            return self.pending_rows[content_hash][1]
+        row = self.conn.execute("SELECT description FROM job_details WHERE content_hash = ?",
+                                (content_hash,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, content_hash, job_id, description):
+        self.pending_rows[content_hash] = (job_id, description or '', int(time.time()))
+        if len(self.pending_rows) >= self.commit_every or time.time() - self.last_commit >= self.commit_seconds:
+            self.commit()
+
+    def commit(self):
+        self.last_commit = time.time()
+        if not self.pending_rows:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO job_details (content_hash, job_id, description, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, job_id, description, fetched_at)
+                 for key, (job_id, description, fetched_at) in self.pending_rows.items()])
+        self.pending_rows = {}
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,635 @@
+# crawler/crawler/etl.py
+# 岗位数仓ETL（替代 data/ 下的 Kettle 作业 job_recruitment_etl.kjb 与 trans_01~05.ktr）：
+# ODS抽取 → 字段清洗 → 格式标准化 → DW输出 → DW->ADS加载，五个阶段各占一个线程，
+# 阶段之间用有界队列按批传递记录（内存有界，读文件、转换、写库互相重叠），逐阶段统计行数、速率与拒绝原因。
+# 增量模式下用本地SQLite记录已加载岗位的指纹，只处理新增/变化的岗位
+import hashlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from .feeds import DATA_DIR, iter_job_batches
+from .staging import CHINA_TZ
+
+ETL_VERSION = 1  # 转换规则变化时加一，增量指纹随之全部失效
+DEFAULT_CHUNK_RECORDS = 5000
+DEFAULT_BUFFER_CHUNKS = 4      # 阶段间队列最多积压的批数
+DEFAULT_DW_OUTPUT = os.path.join(DATA_DIR, 'dw_jobs.json')
+DEFAULT_STATE_DB = os.path.join(DATA_DIR, 'etl_state.sqlite')
+DEFAULT_RUNS_DIR = os.path.join(DATA_DIR, 'etl_runs')
+DEFAULT_ADS_TABLE = 'recruitment_jobs'
+DEFAULT_COMMIT_SIZE = 1000     # 与 Kettle 表输出的提交记录数一致
+REMOVED = 'removed'
+
+# trans_02：保留的字段及空值替换（None 表示不替换）
+CLEAN_DEFAULTS = {
+    'job_id': None,
+    'job_name': '职位名称未知',
+    'job_catory': '其他类',
+    'high_month_pay': 0,
+    'low_month_pay': 0,
+    'company_name': '公司名称未知',
+    'company_scale': '公司规模未知',
+    'company_property': '企业性质未知',
+    'company_tags': '无福利标签',
+    'prinvce_code_nme': '省份未知',
+    'search_area_name': '区域未知',
+    'degree_name': '学历不限',
+    'major_required': '不限专业',
+    'publish_date': None,
+    'update_date': None,
+    'sources_name_ch': '未知来源',
+    'recruit_type': '招聘类型未知',
+    'key_units': '关键单位未知',
+    'member_level': '公司类型未知',
+    'job_industry': '所属行业',
+}
+
+# trans_01：原 JSON Input 读取28个字段，其中只有字段清洗保留的这些会用到，抽取时只读它们；
+# 数值字段按类型转换（无法转换的记录拒绝）
+ODS_FIELDS = tuple(CLEAN_DEFAULTS)
+ODS_NUMBER_FIELDS = {'high_month_pay': float, 'low_month_pay': float, 'update_date': int, 'publish_date': int}
+
+# trans_03：去除特殊字符、统一分隔符、字段重命名与代码值映射
+SPECIAL_CHARS = re.compile(r"""[【】（）《》"']""")
+LEADING_SPACES = re.compile(r'^\s+')
+SEPARATORS = re.compile(r'[，；、,;]')
+DW_RENAMES = {
+    'degree_name': 'degree_requirement',
+    'high_month_pay': 'high_salary_k',
+    'low_month_pay': 'low_salary_k',
+    'major_required': 'major_requirement',
+    'prinvce_code_nme': 'province',
+    'search_area_name': 'city',
+    'sources_name_ch': 'data_source',
+}
+VALUE_MAPPINGS = {
+    'member_level': ({'0': '普通企业', '2': '精选企业'}, '普通企业'),
+    'key_units': ({'0': '普通企业', '1': '重点领域'}, '普通企业'),
+    'recruit_type': ({'0': '不限', '1': '职业', '2': '公告'}, '不限'),
+}
+MAX_SALARY_K = 9999.9  # recruitment_jobs 中薪资列为 DECIMAL(5,1)
+
+# trans_04 / trans_05：DW 与 ADS 的字段（顺序即 dw_jobs.json 中的顺序）
+DW_FIELDS = (
+    'job_id', 'job_name', 'job_catory', 'low_salary_k', 'high_salary_k', 'company_name', 'company_scale',
+    'company_property', 'company_tags', 'province', 'city', 'degree_requirement', 'major_requirement',
+    'publish_date', 'update_date', 'data_source', 'recruit_type', 'member_level', 'key_units', 'job_industry',
+)
+
+ADS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS `{table}` (
+    job_id             VARCHAR(64)   PRIMARY KEY,
+    job_name           VARCHAR(255),
+    job_catory         VARCHAR(100),
+    low_salary_k       DECIMAL(5,1),
+    high_salary_k      DECIMAL(5,1),
+    company_name       VARCHAR(255),
+    company_scale      VARCHAR(50),
+    company_property   VARCHAR(100),
+    company_tags       TEXT,
+    province           VARCHAR(100),
+    city               VARCHAR(100),
+    degree_requirement VARCHAR(50),
+    major_requirement  TEXT,
+    publish_date       DATETIME,
+    update_date        DATETIME      NOT NULL,
+    data_source        VARCHAR(100),
+    recruit_type       VARCHAR(20),
+    member_level       VARCHAR(20),
+    key_units          VARCHAR(20),
+    job_industry       VARCHAR(100),
+    KEY idx_{table}_update_date (update_date)
+)
+"""
+
+
+class Chunk:
+    """在阶段之间传递的一批记录：rows 为记录，fingerprints 为 job_id -> 增量指纹，removed 为下线的 job_id"""
+
+    def __init__(self, rows, fingerprints=None, removed=None):
+        self.rows = rows
+        self.fingerprints = fingerprints or {}
+        self.removed = removed or []
+
+
+class StageStats:
+    """单个阶段的统计：输入/输出行数、拒绝原因、其他计数，以及处理耗时（不含排队等待）。
+    seconds 为实际经过的时间（含写库等待、与其他阶段争用GIL），cpu_seconds 为该阶段线程自身的CPU时间
+    """
+
+    def __init__(self, name, label):
+        self.name = name
+        self.label = label
+        self.rows_in = 0
+        self.rows_out = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rejected = Counter()
+        self.counters = Counter()
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'label': self.label,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rejected': sum(self.rejected.values()),
+            'reject_reasons': dict(self.rejected),
+            'counters': dict(self.counters),
+            'chunks': self.chunks,
+            'seconds': round(self.seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'rows_per_second': round(self.rows_in / self.seconds) if self.seconds > 0 else None,
+            'rows_per_cpu_second': round(self.rows_in / self.cpu_seconds) if self.cpu_seconds > 0 else None,
+        }
+
+
+class RejectWriter:
+    """被拒绝的记录追加写入 rejects.jsonl（各阶段线程共用，首次写入时才创建文件）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    def write(self, stage, reason, row):
+        line = json.dumps({'stage': stage, 'reason': reason, 'record': row}, ensure_ascii=False, default=str)
+        with self.lock:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(line + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class EtlState:
+    """增量状态（本地SQLite）：已加载岗位的 job_id -> 指纹。抽取阶段读、加载阶段在写库提交后写"""
+
+    def __init__(self, db_path=DEFAULT_STATE_DB):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS loaded_jobs (
+                job_id      TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                loaded_at   INTEGER NOT NULL
+            )
+        """)
+
+    def fingerprints(self, job_ids):
+        found = {}
+        job_ids = list(job_ids)
+        with self.lock:
+            for start in range(0, len(job_ids), 500):  # SQLite 单条语句的参数个数有限
+                part = job_ids[start:start + 500]
+                found.update(self.conn.execute(
+                    f"SELECT job_id, fingerprint FROM loaded_jobs WHERE job_id IN ({','.join('?' * len(part))})",
+                    part))
+        return found
+
+    def commit(self, fingerprints, removed=()):
+        now = int(time.time())
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO loaded_jobs (job_id, fingerprint, loaded_at) VALUES (?, ?, ?)",
+                [(job_id, fingerprint, now) for job_id, fingerprint in fingerprints.items()])
+            self.conn.executemany("DELETE FROM loaded_jobs WHERE job_id = ?", [(job_id,) for job_id in removed])
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM loaded_jobs")
+
+    def close(self):
+        self.conn.close()
+
+
+class Stage:
+    """ETL阶段：process 对一批记录做转换并返回该批，不合格的记录调用 reject 记录原因后丢弃"""
+    name = ''
+    label = ''
+
+    def __init__(self):
+        self.stats = StageStats(self.name, self.label)
+        self.reject_writer = None
+
+    def open(self):
+        pass
+
+    def process(self, chunk):
+        raise NotImplementedError
+
+    def close(self, success):
+        pass
+
+    def reject(self, row, reason):
+        self.stats.rejected[reason] += 1
+        if self.reject_writer is not None:
+            self.reject_writer.write(self.name, reason, row)
+
+    def run(self, chunk, rows_in):
+        started, cpu_started = time.perf_counter(), time.thread_time()
+        chunk = self.process(chunk)
+        self.stats.seconds += time.perf_counter() - started
+        self.stats.cpu_seconds += time.thread_time() - cpu_started
+        self.stats.chunks += 1
+        self.stats.rows_in += rows_in
+        self.stats.rows_out += len(chunk.rows)
+        return chunk
+
+
+def fingerprint(row):
+    """增量指纹：抽取后的字段（类型转换后，字段顺序固定）加上规则版本"""
+    payload = json.dumps([ETL_VERSION, *row.values()], ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class OdsExtract(Stage):
+    """trans_01：读取字段并转换数值类型，过滤 job_id 为空的记录。
+    track=True 时计算增量指纹（写库时维护增量状态用），传入 state 时跳过指纹未变的岗位
+    """
+    name = 'ods_extract'
+    label = 'ODS抽取'
+
+    def __init__(self, state=None, track=False):
+        super().__init__()
+        self.state = state
+        self.track = track or state is not None
+
+    def _typed(self, record):
+        row = {field: record.get(field) for field in ODS_FIELDS}
+        for field, cast in ODS_NUMBER_FIELDS.items():
+            value = row[field]
+            if value is None or value == '':
+                row[field] = None
+                continue
+            try:
+                row[field] = cast(value) if cast is float or isinstance(value, int) else int(float(value))
+            except (TypeError, ValueError, OverflowError):
+                return None, f'invalid_{field}'
+        return row, None
+
+    def process(self, records):
+        chunk = Chunk([])
+        for record in records:
+            job_id = record.get('job_id')
+            if job_id is None or job_id == '':
+                self.reject(record, 'missing_job_id')
+                continue
+            if record.get('change_type') == REMOVED:
+                chunk.removed.append(str(job_id))
+                self.stats.counters['removed'] += 1
+                continue
+            row, error = self._typed(record)
+            if error:
+                self.reject(record, error)
+                continue
+            row['job_id'] = str(job_id)
+            chunk.rows.append(row)
+            if self.track:
+                chunk.fingerprints[row['job_id']] = fingerprint(row)
+        if self.state is not None and chunk.rows:
+            loaded = self.state.fingerprints(chunk.fingerprints)
+            unchanged = {job_id for job_id, value in chunk.fingerprints.items() if loaded.get(job_id) == value}
+            if unchanged:
+                chunk.rows = [row for row in chunk.rows if row['job_id'] not in unchanged]
+                for job_id in unchanged:
+                    del chunk.fingerprints[job_id]
+                self.stats.counters['unchanged'] += len(unchanged)
+        return chunk
+
+
+class FieldClean(Stage):
+    """trans_02：只保留后续需要的字段，空值（None/空字符串）替换为默认值"""
+    name = 'field_clean'
+    label = '字段清洗'
+
+    def process(self, chunk):
+        rows = []
+        for row in chunk.rows:
+            cleaned = {}
+            for field, default in CLEAN_DEFAULTS.items():
+                value = row.get(field)
+                cleaned[field] = default if (value is None or value == '') else value
+            rows.append(cleaned)
+        chunk.rows = rows
+        return chunk
+
+
+def format_timestamp(value):
+    """毫秒时间戳 → 'YYYY-MM-DD HH:MM:SS'（北京时间），无法转换时为 None"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromtimestamp(value / 1000, CHINA_TZ).strftime('%Y-%m-%d %H:%M:%S')
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def _text(value):
+    if isinstance(value, list):
+        return ','.join(str(item) for item in value)
+    return str(value)
+
+
+class FormatStandard(Stage):
+    """trans_03：时间戳转日期、去除特殊字符、统一分隔符、字段重命名、代码值映射。
+    原转换中更新时间误用了发布时间，这里按各自的时间戳转换；更新时间缺失时沿用发布时间，两者都缺失的记录拒绝
+    """
+    name = 'format_standard'
+    label = '格式标准化'
+
+    def process(self, chunk):
+        rows = []
+        for row in chunk.rows:
+            publish_date = format_timestamp(row['publish_date'])
+            update_date = format_timestamp(row['update_date']) or publish_date
+            if update_date is None:
+                self.reject(row, 'missing_update_date')
+                continue
+            salaries = (round(row['low_month_pay'], 1), round(row['high_month_pay'], 1))
+            if not all(0 <= salary <= MAX_SALARY_K for salary in salaries):
+                self.reject(row, 'salary_out_of_range')
+                continue
+
+            row['publish_date'] = publish_date
+            row['update_date'] = update_date
+            row['low_month_pay'], row['high_month_pay'] = salaries
+            row['job_name'] = LEADING_SPACES.sub('', _text(row['job_name']))
+            row['major_required'] = SEPARATORS.sub(',', SPECIAL_CHARS.sub('', _text(row['major_required'])))
+            row['company_tags'] = SEPARATORS.sub(',', _text(row['company_tags']))
+            for field, (mapping, default) in VALUE_MAPPINGS.items():
+                row[field] = mapping.get(str(row[field]), default)
+            renamed = {DW_RENAMES.get(field, field): value for field, value in row.items()}
+            rows.append({field: renamed[field] for field in DW_FIELDS})
+        chunk.rows = rows
+        return chunk
+
+
+def delta_output_path(output_path, run_id):
+    """增量运行的DW文件：dw_jobs.json -> dw_jobs.delta-<run_id>.json，与全量文件放在同一目录"""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.delta-{run_id}{ext or '.json'}"
+
+
+class DwOutput(Stage):
+    """trans_04：DW层写成 {"data": [...]} 格式的JSON文件（边处理边写，完成后替换旧文件）；output_path 为空时不写。
+    增量运行只包含新增/变化的岗位，run_etl 会改写到单独的 delta 文件，不覆盖全量DW文件
+    """
+    name = 'dw_output'
+    label = 'DW输出'
+
+    def __init__(self, output_path=DEFAULT_DW_OUTPUT):
+        super().__init__()
+        self.output_path = output_path
+        self.file = None
+        self.written = 0
+
+    def open(self):
+        if not self.output_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        self.file = open(self.output_path + '.part', 'w', encoding='utf-8')
+        self.file.write('{"data": [')
+
+    def process(self, chunk):
+        if self.file is not None and chunk.rows:
+            self.file.write(''.join(('\n' if self.written + i == 0 else ',\n') + json.dumps(row, ensure_ascii=False)
+                                    for i, row in enumerate(chunk.rows)))
+            self.written += len(chunk.rows)
+        return chunk
+
+    def close(self, success):
+        if self.file is None:
+            return
+        self.file.write('\n]}\n')
+        self.file.close()
+        self.file = None
+        if success:
+            os.replace(self.output_path + '.part', self.output_path)
+        else:
+            os.remove(self.output_path + '.part')
+
+
+class AdsLoad(Stage):
+    """trans_05：按 job_id 去重（保留先出现的一条），批量写入 MySQL 的 recruitment_jobs 表。
+    原作业为逐条 INSERT，重复运行会主键冲突；这里用 INSERT ... ON DUPLICATE KEY UPDATE，可反复/增量运行。
+    db_config 为空时只去重不写库；增量状态在每批写库提交后更新
+    """
+    name = 'dw_to_ads'
+    label = 'DW->ADS加载'
+
+    def __init__(self, db_config=None, table=DEFAULT_ADS_TABLE, commit_size=DEFAULT_COMMIT_SIZE, state=None):
+        super().__init__()
+        self.db_config = db_config
+        self.table = table
+        self.commit_size = commit_size
+        self.state = state
+        self.seen = set()
+        self.conn = None
+        column_list = ', '.join(f"`{c}`" for c in DW_FIELDS)
+        placeholders = ', '.join(['%s'] * len(DW_FIELDS))
+        updates = ', '.join(f"`{c}` = VALUES(`{c}`)" for c in DW_FIELDS if c != 'job_id')
+        self.upsert_sql = (f"INSERT INTO `{table}` ({column_list}) VALUES ({placeholders}) "
+                           f"ON DUPLICATE KEY UPDATE {updates}")
+        self.delete_sql = f"DELETE FROM `{table}` WHERE job_id = %s"
+
+    def open(self):
+        if not self.db_config:
+            return
+        import pymysql
+        # 启动时即连接并建表（原作业的“检查表是否存在 → 创建表”），配置错误尽早暴露
+        self.conn = pymysql.connect(**self.db_config)
+        with self.conn.cursor() as cursor:
+            cursor.execute(ADS_TABLE_DDL.format(table=self.table))
+        self.conn.commit()
+
+    def process(self, chunk):
+        rows = []
+        for row in chunk.rows:
+            if row['job_id'] in self.seen:
+                self.reject(row, 'duplicate_job_id')
+                chunk.fingerprints.pop(row['job_id'], None)
+                continue
+            self.seen.add(row['job_id'])
+            rows.append(row)
+        chunk.rows = rows
+
+        if self.conn is not None:
+            self.conn.ping(reconnect=True)
+            try:
+                with self.conn.cursor() as cursor:
+                    for start in range(0, len(rows), self.commit_size):
+                        cursor.executemany(self.upsert_sql, [[row[field] for field in DW_FIELDS]
+                                                             for row in rows[start:start + self.commit_size]])
+                        self.conn.commit()
+                    if chunk.removed:
+                        cursor.executemany(self.delete_sql, [(job_id,) for job_id in chunk.removed])
+                        self.conn.commit()
+                        self.stats.counters['deleted'] += len(chunk.removed)
+            except Exception:
+                self.conn.rollback()
+                raise
+        if self.state is not None:
+            self.state.commit({row['job_id']: chunk.fingerprints[row['job_id']] for row in rows}, chunk.removed)
+        return chunk
+
+    def close(self, success):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class EtlPipeline:
+    """按阶段顺序流式运行：每个阶段一个线程，阶段之间为有界队列（下游慢时上游阻塞，积压不超过 buffer_chunks 批）。
+    任一阶段出错后，上游停止读取、下游丢弃剩余批次，各阶段以失败状态关闭（DW文件不替换），最后抛出该错误
+    """
+    _STOP = object()
+
+    def __init__(self, stages, buffer_chunks=DEFAULT_BUFFER_CHUNKS, reject_writer=None):
+        self.stages = stages
+        self.buffer_chunks = buffer_chunks
+        self.failed = threading.Event()
+        self.errors = []
+        for stage in stages:
+            stage.reject_writer = reject_writer
+
+    def _fail(self, stage, error):
+        self.errors.append((stage.name, error))
+        self.failed.set()
+
+    def _run_source(self, batches, stage, output):
+        try:
+            batches = iter(batches)
+            while not self.failed.is_set():
+                started, cpu_started = time.perf_counter(), time.thread_time()
+                batch = next(batches, None)
+                # 读取与解析也计入抽取阶段
+                stage.stats.seconds += time.perf_counter() - started
+                stage.stats.cpu_seconds += time.thread_time() - cpu_started
+                if batch is None:
+                    break
+                output.put(stage.run(batch, len(batch)))
+        except Exception as e:
+            self._fail(stage, e)
+        finally:
+            output.put(self._STOP)
+
+    def _run_stage(self, stage, source, output):
+        while True:
+            chunk = source.get()
+            if chunk is self._STOP:
+                break
+            if self.failed.is_set():
+                continue
+            try:
+                chunk = stage.run(chunk, len(chunk.rows))
+            except Exception as e:
+                self._fail(stage, e)
+                continue
+            if output is not None:
+                output.put(chunk)
+        if output is not None:
+            output.put(self._STOP)
+
+    def run(self, batches):
+        """batches 为原始记录的分批迭代器；返回各阶段统计，出错时抛出第一个错误"""
+        queues = [queue.Queue(maxsize=self.buffer_chunks) for _ in self.stages]
+        opened = []
+        try:
+            for stage in self.stages:
+                stage.open()
+                opened.append(stage)
+            threads = [threading.Thread(target=self._run_source, args=(batches, self.stages[0], queues[0]),
+                                        name=f'etl-{self.stages[0].name}', daemon=True)]
+            for i, stage in enumerate(self.stages[1:], start=1):
+                output = queues[i] if i < len(self.stages) - 1 else None
+                threads.append(threading.Thread(target=self._run_stage, args=(stage, queues[i - 1], output),
+                                                name=f'etl-{stage.name}', daemon=True))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        except BaseException as e:
+            self.errors.append(('pipeline', e))
+            self.failed.set()
+        finally:
+            for stage in reversed(opened):
+                try:
+                    stage.close(not self.errors)
+                except Exception as e:
+                    self.errors.append((stage.name, e))
+        if self.errors:
+            stage_name, error = self.errors[0]
+            raise RuntimeError(f"ETL阶段 {stage_name} 失败：{error}") from error
+        return [stage.stats for stage in self.stages]
+
+
+def run_etl(source, chunk_records=DEFAULT_CHUNK_RECORDS, buffer_chunks=DEFAULT_BUFFER_CHUNKS,
+            dw_output=DEFAULT_DW_OUTPUT, db_config=None, table=DEFAULT_ADS_TABLE, commit_size=DEFAULT_COMMIT_SIZE,
+            incremental=False, state_db=DEFAULT_STATE_DB, runs_dir=DEFAULT_RUNS_DIR):
+    """运行五个阶段，拒绝记录与运行报告写入 <runs_dir>/<时间>/，返回报告（dict）。
+    source 为爬取输出：Parquet 暂存库、分片目录或 JSON数组/JSONL 文件
+    db_config 为空时只输出DW文件不写库。增量状态对应 ADS 表中的数据，只在写库时维护：
+    incremental=True 时跳过已加载且未变化的岗位；为 False 时全量处理并重建增量状态
+    """
+    if incremental and not db_config:
+        raise ValueError("增量模式需要写入ADS表（请提供数据库配置）")
+    run_id = time.strftime('%Y%m%d-%H%M%S')
+    run_dir = os.path.join(runs_dir, run_id)
+    if incremental and dw_output:
+        dw_output = delta_output_path(dw_output, run_id)
+    reject_writer = RejectWriter(os.path.join(run_dir, 'rejects.jsonl'))
+    state = EtlState(state_db) if db_config else None
+    if state is not None and not incremental:
+        state.clear()
+    stages = [
+        OdsExtract(state if incremental else None, track=state is not None),
+        FieldClean(),
+        FormatStandard(),
+        DwOutput(dw_output),
+        AdsLoad(db_config, table, commit_size, state),
+    ]
+    started = time.time()
+    try:
+        stats = EtlPipeline(stages, buffer_chunks, reject_writer).run(
+            iter_job_batches(source, chunk_records, columns=ODS_FIELDS + ('change_type',)))
+    finally:
+        reject_writer.close()
+        if state is not None:
+            state.close()
+
+    seconds = time.time() - started
+    loaded = stats[-1].rows_out
+    report = {
+        'source': os.path.abspath(source),
+        'incremental': incremental,
+        'etl_version': ETL_VERSION,
+        'started_at': int(started),
+        'seconds': round(seconds, 2),
+        'rows_read': stats[0].rows_in,
+        'rows_loaded': loaded,
+        'rows_per_second': round(stats[0].rows_in / seconds) if seconds > 0 else None,
+        'dw_output': dw_output or None,
+        'ads_table': table if db_config else None,
+        'stages': [stage_stats.as_dict() for stage_stats in stats],
+        'rejects_file': reject_writer.path if os.path.exists(reject_writer.path) else None,
+    }
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, 'report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    report['run_dir'] = run_dir
+    return report
@@ -0,0 +1,339 @@
+# crawler/crawler/extensions.py
+# 爬虫扩展：按下载槽位（直连 / 每个代理）自适应调整并发与延迟；按查询组合统计爬取指标
+import glob
+import json
+import logging
+import os
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from crawler.planner import make_query_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TELEMETRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'telemetry')
+
+# 自定义信号：爬虫解析完一页列表后发送（参数 response、job_count）
+page_parsed = object()
+# 自定义信号：分片输出把缓冲区写入分片后发送（参数 records），此前离开管道的条目均已落盘
+output_persisted = object()
+
+
+def output_barrier_enabled(settings):
+    """启用了分片输出时，去重登记与断点进度等到对应条目落盘后再提交（output_persisted）"""
+    pipelines = settings.getwithbase('ITEM_PIPELINES')
+    return any(order is not None and (path if isinstance(path, str) else getattr(path, '__name__', '')).endswith(
+        'JsonlShardPipeline') for path, order in pipelines.items())
+
+
+class SlotWindow:
+    """单个下载槽位的观测窗口与当前控制参数"""
+
+    def __init__(self, concurrency, delay):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+
+
+class AdaptiveSlotThrottle:
+    """AIMD限速：每个槽位每累计 window 个结果评估一次，
+    错误率（异常、429及RETRY_HTTP_CODES中的状态码）或平均延迟超标时并发减半、延迟加倍，
+    否则并发加一、延迟递减。与AutoThrottle都会修改槽位延迟，两者只应启用一个。
+    """
+    SEEN_META_KEY = '_slot_throttle_response'
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('SLOT_THROTTLE_ENABLED', False):
+            raise NotConfigured("AdaptiveSlotThrottle未启用（SLOT_THROTTLE_ENABLED=False）")
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.window = settings.getint('SLOT_THROTTLE_WINDOW', 20)
+        self.target_latency = settings.getfloat('SLOT_THROTTLE_TARGET_LATENCY', 2.0)
+        self.max_error_rate = settings.getfloat('SLOT_THROTTLE_MAX_ERROR_RATE', 0.1)
+        self.min_concurrency = settings.getint('SLOT_THROTTLE_MIN_CONCURRENCY', 1)
+        self.max_concurrency = settings.getint('SLOT_THROTTLE_MAX_CONCURRENCY', 8)
+        self.min_delay = settings.getfloat('SLOT_THROTTLE_MIN_DELAY', 0.0)
+        self.max_delay = settings.getfloat('SLOT_THROTTLE_MAX_DELAY', 10.0)
+        self.delay_step = settings.getfloat('SLOT_THROTTLE_DELAY_STEP', 0.1)
+        self.decrease_factor = settings.getfloat('SLOT_THROTTLE_DECREASE_FACTOR', 0.5)
+        self.start_concurrency = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN', 4)
+        self.start_delay = settings.getfloat('DOWNLOAD_DELAY', 0.0)
+        self.error_codes = {int(code) for code in settings.getlist('RETRY_HTTP_CODES')} | {429}
+        self.slots = {}  # 槽位key -> SlotWindow
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler)
+        crawler.signals.connect(ext.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(ext.request_left_downloader, signal=signals.request_left_downloader)
+        return ext
+
+    def response_downloaded(self, response, request, spider):
+        request.meta[self.SEEN_META_KEY] = True
+        self._observe(request, response.status in self.error_codes, request.meta.get('download_latency'))
+
+    def request_left_downloader(self, request, spider):
+        # 下载异常（超时、连接失败等）不会触发 response_downloaded，在此计为错误
+        if not request.meta.pop(self.SEEN_META_KEY, False):
+            self._observe(request, True, None)
+
+    def _observe(self, request, is_error, latency):
+        key = request.meta.get('download_slot')
+        if key is None:
+            return
+        state = self.slots.get(key)
+        if state is None:
+            state = self.slots[key] = SlotWindow(self.start_concurrency, self.start_delay)
+        state.requests += 1
+        if is_error:
+            state.errors += 1
+        if latency is not None:
+            state.latency_sum += latency
+            state.latency_count += 1
+        if state.requests >= self.window:
+            self._adjust(key, state)
+
+    def _adjust(self, key, state):
+        error_rate = state.errors / state.requests
+        avg_latency = state.latency_sum / state.latency_count if state.latency_count else None
+        old_concurrency, old_delay = state.concurrency, state.delay
+
+        if error_rate > self.max_error_rate or (avg_latency is not None and avg_latency > self.target_latency):
+            state.concurrency = max(self.min_concurrency, int(state.concurrency * self.decrease_factor))
+            state.delay = min(self.max_delay, max(state.delay * 2, self.delay_step))
+            self.stats.inc_value('slot_throttle/decrease')
+            action = '降速'
+        else:
+            state.concurrency = min(self.max_concurrency, state.concurrency + 1)
+            state.delay = max(self.min_delay, state.delay - self.delay_step)
+            self.stats.inc_value('slot_throttle/increase')
+            action = '提速'
+
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is not None:
+            slot.concurrency = state.concurrency
+            slot.delay = state.delay
+        latency_text = f"{avg_latency:.2f}s" if avg_latency is not None else 'N/A'
+        logger.info(f"[槽位限速] {key} {action}：并发 {old_concurrency}->{state.concurrency}，"
+                    f"延迟 {old_delay:.2f}s->{state.delay:.2f}s（{state.requests}个结果，"
+                    f"错误率 {error_rate:.0%}，平均延迟 {latency_text}）")
+        state.reset()
+
+
+# 延迟直方图的桶上界（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+QUERY_COUNTERS = ('pages', 'items', 'empty_pages', 'duplicates', 'retries', 'proxy_failures')
+
+
+def query_key_from_meta(meta):
+    """请求meta对应的查询组合key（探测请求的参数在 query_meta 中）"""
+    search_params_base = meta.get('search_params_base') or meta.get('query_meta', {}).get('search_params_base')
+    return make_query_key(search_params_base) if search_params_base else None
+
+
+def load_query_yields(telemetry_dir=DEFAULT_TELEMETRY_DIR, max_runs=5):
+    """读取最近 max_runs 次运行的统计报告（含分片子目录），返回 查询组合key -> 每页输出岗位数"""
+    reports = sorted(glob.glob(os.path.join(telemetry_dir, '**', 'query_telemetry-*.json'), recursive=True),
+                     key=os.path.getmtime, reverse=True)
+    totals = {}  # key -> [pages, items]
+    for report_path in reports[:max_runs]:
+        try:
+            with open(report_path, 'r', encoding='utf-8') as f:
+                queries = json.load(f).get('queries', {})
+        except (json.JSONDecodeError, OSError):
+            continue
+        for key, query in queries.items():
+            if query.get('pages'):
+                total = totals.setdefault(key, [0, 0])
+                total[0] += query['pages']
+                total[1] += query.get('items', 0)
+    return {key: items / pages for key, (pages, items) in totals.items()}
+
+
+def _prom_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class QueryTelemetry:
+    """按查询组合（地区|关键字|类别|行业）统计页数、岗位数、空页、重复、重试、代理失败与延迟分布，
+    运行中定期、结束时写出 JSON 报告与 Prometheus 文本格式文件
+    """
+    SCHEDULED_META_KEY = '_telemetry_retry_counts'  # 上次调度时的 (retry_times, _proxy_retry_count)
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('TELEMETRY_ENABLED', False):
+            raise NotConfigured("QueryTelemetry未启用（TELEMETRY_ENABLED=False）")
+        self.output_dir = settings.get('TELEMETRY_DIR') or DEFAULT_TELEMETRY_DIR
+        self.snapshot_interval = settings.getfloat('TELEMETRY_SNAPSHOT_INTERVAL', 60)
+        self.run_id = time.strftime('%Y%m%d-%H%M%S')
+        self.started_at = int(time.time())
+        self.queries = {}
+        self.snapshot_task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(ext.page_parsed, signal=page_parsed)
+        return ext
+
+    def _query(self, meta):
+        key = query_key_from_meta(meta)
+        if key is None:
+            return None
+        query = self.queries.get(key)
+        if query is None:
+            source = meta if 'search_params_base' in meta else meta.get('query_meta', {})
+            query = self.queries[key] = {
+                'area': source.get('search_area_name', ''),
+                'keyword': source['search_params_base'].get('jobName', ''),
+                'category': source.get('request_category_name', ''),
+                'industry': source.get('request_industry_name', ''),
+                **{counter: 0 for counter in QUERY_COUNTERS},
+                'latency_sum': 0.0,
+                'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return query
+
+    def spider_opened(self, spider):
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.snapshot_interval > 0:
+            self.snapshot_task = task.LoopingCall(self.write_reports, False)
+            self.snapshot_task.start(self.snapshot_interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.snapshot_task is not None and self.snapshot_task.running:
+            self.snapshot_task.stop()
+        self.write_reports(True, reason)
+        logger.info(f"查询组合统计已写入 {self.output_dir}（{len(self.queries)} 个组合）")
+
+    def request_scheduled(self, request, spider):
+        # 重试请求复制了原请求的meta：与上次调度时的计数比较，增加了才记一次
+        query = self._query(request.meta)
+        if query is None:
+            return
+        retry_times = request.meta.get('retry_times', 0)
+        proxy_retries = request.meta.get('_proxy_retry_count', 0)
+        last_retry_times, last_proxy_retries = request.meta.get(self.SCHEDULED_META_KEY, (0, 0))
+        if retry_times > last_retry_times:
+            query['retries'] += 1
+        if proxy_retries > last_proxy_retries:
+            query['proxy_failures'] += 1
+        request.meta[self.SCHEDULED_META_KEY] = (retry_times, proxy_retries)
+
+    def response_received(self, response, request, spider):
+        query = self._query(request.meta)
+        latency = request.meta.get('download_latency')
+        if query is None or latency is None:
+            return
+        query['latency_sum'] += latency
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                query['latency_buckets'][index] += 1
+                break
+        else:
+            query['latency_buckets'][-1] += 1
+
+    def page_parsed(self, response, job_count):
+        query = self._query(response.meta)
+        if query is None:
+            return
+        query['pages'] += 1
+        if job_count == 0:
+            query['empty_pages'] += 1
+
+    def item_scraped(self, item, response, spider):
+        query = self._query(response.meta)
+        if query is not None:
+            query['items'] += 1
+
+    def item_dropped(self, item, response, exception, spider):
+        # 当前只有去重管道会丢弃岗位
+        query = self._query(response.meta)
+        if query is not None:
+            query['duplicates'] += 1
+
+    def write_reports(self, final=False, reason=None):
+        report = {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'updated_at': int(time.time()),
+            'final': final,
+            'finish_reason': reason,
+            'queries': self.queries,
+        }
+        self._atomic_write(os.path.join(self.output_dir, f'query_telemetry-{self.run_id}.json'),
+                           json.dumps(report, ensure_ascii=False, indent=2))
+        self._atomic_write(os.path.join(self.output_dir, 'query_telemetry.prom'), self._prometheus_text())
+
+    @staticmethod
+    def _atomic_write(path, text):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def _prometheus_text(self):
+        lines = []
+        for counter in QUERY_COUNTERS:
+            metric = f'jobs_query_{counter}_total'
+            lines.append(f'# TYPE {metric} counter')
+            for key, query in self.queries.items():
+                lines.append(f'{metric}{{{self._labels(key, query)}}} {query[counter]}')
+
+        metric = 'jobs_query_latency_seconds'
+        lines.append(f'# TYPE {metric} histogram')
+        for key, query in self.queries.items():
+            labels = self._labels(key, query)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), query['latency_buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{labels}}} {query["latency_sum"]:.3f}')
+            lines.append(f'{metric}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(key, query):
+        return ','.join(f'{name}="{_prom_label(value)}"' for name, value in (
+            ('query', key), ('area', query['area']), ('keyword', query['keyword']),
+            ('category', query['category']), ('industry', query['industry'])))
+
+
+class StatsFileExporter:
+    """爬取结束时把Scrapy统计写入 JOBS_STATS_FILE（分片启动器据此汇总各进程统计）"""
+
+    def __init__(self, crawler, stats_file):
+        self.crawler = crawler
+        self.stats_file = stats_file
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        stats_file = crawler.settings.get('JOBS_STATS_FILE')
+        if not stats_file:
+            raise NotConfigured("StatsFileExporter未启用（JOBS_STATS_FILE为空）")
+        ext = cls(crawler, stats_file)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_closed(self, spider, reason):
+        stats = dict(self.crawler.stats.get_stats(), finish_reason=reason)
+        os.makedirs(os.path.dirname(os.path.abspath(self.stats_file)), exist_ok=True)
+        with open(self.stats_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2, default=str)
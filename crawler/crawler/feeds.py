@@ -0,0 +1,419 @@
+# crawler/crawler/feeds.py
+# 岗位数据的JSONL分片格式：写入端（管道使用）与读取端共用，不依赖Scrapy
+import glob
+import gzip
+import json
+import os
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from itertools import islice
+
+from filelock import FileLock, Timeout
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_SHARDS_DIR = os.path.join(DATA_DIR, 'jobs_shards')
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_LOCK = 'manifest.json.lock'  # 多个写入端共用一个目录时，清单的读-改-写在该锁内进行
+PART_SUFFIX = '.part'  # 写入中的分片，落盘完成后去掉该后缀
+RUN_LOCK_SUFFIX = '.lock'  # 写入端运行期间持有 <前缀>-<run_id>.lock，进程退出（含崩溃）后锁自动释放
+
+SHARD_SUFFIXES = {
+    '': '.jsonl',
+    'gzip': '.jsonl.gz',
+    'zstd': '.jsonl.zst',
+}
+
+
+def detect_compression(path):
+    """根据文件后缀判断压缩格式"""
+    path = path[:-len(PART_SUFFIX)] if path.endswith(PART_SUFFIX) else path
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return ''
+
+
+def open_shard(path, mode='r', compression=None):
+    """以文本方式打开分片文件，按需透明压缩/解压"""
+    if compression is None:
+        compression = detect_compression(path)
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("读写 zstd 分片需要安装 zstandard（pip install zstandard）")
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def read_manifest(output_dir):
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {'shards': [], 'runs': []}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(output_dir, manifest):
+    """原子更新清单：先写临时文件再替换，读取方不会看到半个文件"""
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def manifest_lock(output_dir):
+    return FileLock(os.path.join(output_dir, MANIFEST_LOCK), timeout=60)
+
+
+def update_manifest(output_dir, update):
+    """在清单锁内读取最新清单、调用 update(manifest) 修改后写回，并发写入端不会互相覆盖"""
+    with manifest_lock(output_dir):
+        manifest = read_manifest(output_dir)
+        update(manifest)
+        write_manifest(output_dir, manifest)
+    return manifest
+
+
+def list_shards(output_dir, run_id=None):
+    """清单中已落盘的分片路径（按写入顺序）；指定 run_id 时只返回该次运行写入的分片"""
+    return [os.path.join(output_dir, shard['file']) for shard in read_manifest(output_dir).get('shards', [])
+            if run_id is None or shard.get('run_id') == run_id]
+
+
+def _read_shard_lines(shard_path):
+    with open_shard(shard_path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def iter_shard_records(output_dir, run_id=None, latest=True):
+    """逐条读取已落盘分片中的记录（爬取进行中也可调用）。
+    清单累积了历次运行的分片，同一岗位每次更新都会再出现一次：latest=True（默认）时每个 job_id
+    只产出最新的一条（从最新的分片倒序读取），latest=False 时按写入顺序产出全部记录。
+    内存：latest=True 时需缓存一个分片的全部行，并记住已产出的 job_id（随不同岗位数增长，
+    每个 id 约几十字节）；latest=False 时与数据量无关
+    """
+    shard_paths = list_shards(output_dir, run_id)
+    if not latest:
+        for shard_path in shard_paths:
+            for line in _read_shard_lines(shard_path):
+                yield json.loads(line)
+        return
+    seen_job_ids = set()
+    for shard_path in reversed(shard_paths):
+        for line in reversed(deque(_read_shard_lines(shard_path))):
+            record = json.loads(line)
+            job_id = record.get('job_id')
+            if job_id:
+                if job_id in seen_job_ids:
+                    continue
+                seen_job_ids.add(job_id)
+            yield record
+
+
+def _iter_json_array(f, chunk_chars):
+    """逐个解析JSON数组中的元素：缓冲区只保留未解析的部分，内存与单条记录大小相关，与文件大小无关"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    while True:
+        # 跳过元素之间的空白与逗号
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        if pos < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                # 元素恰好解析到缓冲区末尾时可能被截断（如数字），需再读一块确认
+                if end < len(buffer) or eof:
+                    yield record
+                    pos = end
+                    continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+        if eof:
+            if buffer[pos:].strip():
+                raise ValueError("JSON数组未正常结束")
+            return
+        chunk = f.read(chunk_chars)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def _iter_jsonl(f, strict):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            if strict:
+                raise
+
+
+def iter_file_records(path, strict=False, chunk_chars=1 << 20):
+    """流式读取单个数据文件：自动识别JSON数组或JSONL，按后缀透明解压（.gz/.zst）。
+    JSONL中无法解析的行默认跳过（strict=True 时抛出异常）
+    """
+    with open_shard(path) as f:
+        head = ''
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                head = char
+                break
+        if head == '[':
+            yield from _iter_json_array(f, chunk_chars)
+        elif head:
+            first_line = head + f.readline()
+            yield from _iter_jsonl([first_line], strict)
+            yield from _iter_jsonl(f, strict)
+
+
+def iter_job_records(path, strict=False, columns=None):
+    """岗位数据的统一读取入口，逐条产出记录，不把整个数据集读进内存：
+    - Parquet 暂存库目录（staging.py）：只读 columns 中的列（为 None 时读全部列）
+    - 分片目录：有清单时按 job_id 只取最新一条（需记住已产出的 job_id，见 iter_shard_records），
+      否则读取目录下全部已落盘的数据文件
+    - 单个文件：JSON数组或JSONL，可为 gzip/zstd 压缩
+    """
+    if not os.path.isdir(path):
+        yield from iter_file_records(path, strict)
+        return
+    from .staging import is_staging_dir, iter_staged_records
+    if is_staging_dir(path):
+        yield from iter_staged_records(path, columns)
+        return
+    if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        yield from iter_shard_records(path)
+        return
+    for file_path in sorted(glob.glob(os.path.join(path, '*.json*'))):
+        if not file_path.endswith(PART_SUFFIX) and os.path.basename(file_path) != MANIFEST_NAME:
+            yield from iter_file_records(file_path, strict)
+
+
+def iter_job_batches(path, batch_size=1000, strict=False, columns=None):
+    """按固定条数分批产出记录（列表），便于批量处理/入库"""
+    records = iter_job_records(path, strict, columns)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def new_run_id(manifest):
+    """运行编号：毫秒级时间 + 进程号，再与清单中已有的编号比对，同一秒内启动的写入端不会重名"""
+    now = datetime.now()
+    base = f"{now:%Y%m%d-%H%M%S}-{now.microsecond // 1000:03d}-{os.getpid()}"
+    existing = {run.get('run_id') for run in manifest.get('runs', [])}
+    run_id, n = base, 1
+    while run_id in existing:
+        n += 1
+        run_id = f"{base}-{n}"
+    return run_id
+
+
+def _salvage_lines(part_path):
+    """尽量读出中断写入的分片：跳过写了一半的行，压缩流被截断时读到截断处为止"""
+    lines = []
+    try:
+        for line in _read_shard_lines(part_path):
+            try:
+                json.loads(line)
+            except ValueError:
+                continue
+            lines.append(line)
+    except (EOFError, OSError, ValueError, zlib.error):
+        pass
+    except Exception as e:  # zstandard 的截断错误不继承上面的异常类型
+        if type(e).__name__ != 'ZstdError':
+            raise
+    return lines
+
+
+def recover_orphan_shards(output_dir, prefix='jobs'):
+    """回收异常退出（崩溃/被杀）的写入端留下的 .part 分片：
+    运行锁能拿到说明持有它的进程已退出，把其中完整的记录落盘为正式分片并登记到清单（recovered=True）。
+    管道每次缓冲落盘后才提交去重/断点，回收之后这些记录不会因为已被判为重复而丢失
+    """
+    recovered = []
+    for lock_path in sorted(glob.glob(os.path.join(output_dir, f"{prefix}-*{RUN_LOCK_SUFFIX}"))):
+        run_id = os.path.basename(lock_path)[len(prefix) + 1:-len(RUN_LOCK_SUFFIX)]
+        run_lock = FileLock(lock_path, timeout=0)
+        try:
+            run_lock.acquire()
+        except Timeout:
+            continue  # 写入端仍在运行
+        try:
+            shards = []
+            for part_path in sorted(glob.glob(os.path.join(output_dir, f"{prefix}-{run_id}-*{PART_SUFFIX}"))):
+                lines = _salvage_lines(part_path)
+                if lines:
+                    shard_path = part_path[:-len(PART_SUFFIX)]
+                    tmp_path = shard_path + '.tmp'
+                    with open_shard(tmp_path, 'w', detect_compression(shard_path)) as f:
+                        f.write('\n'.join(lines) + '\n')
+                    os.replace(tmp_path, shard_path)
+                    shards.append({
+                        'file': os.path.basename(shard_path),
+                        'run_id': run_id,
+                        'records': len(lines),
+                        'bytes': os.path.getsize(shard_path),
+                        'created_at': int(os.path.getmtime(part_path)),
+                        'finalized_at': int(time.time()),
+                        'recovered': True,
+                    })
+                os.remove(part_path)
+
+            def update(manifest):
+                manifest['shards'].extend(shards)
+                for run in manifest.get('runs', []):
+                    if run.get('run_id') == run_id and run.get('finished_at') is None:
+                        run['records'] = (run.get('records') or 0) + sum(shard['records'] for shard in shards)
+                        run['recovered'] = True
+
+            if shards:
+                update_manifest(output_dir, update)
+            recovered.extend(shards)
+        finally:
+            run_lock.release()
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+    return recovered
+
+
+class JsonlShardWriter:
+    """批量写入JSONL分片：按大小/时间轮转，分片完成后原子改名并登记到清单。
+    运行期间持有运行锁，异常退出后由下一个写入端回收 .part 分片（recover_orphan_shards）；
+    on_flush(条数) 在每次缓冲写入分片后回调，调用方可据此提交依赖这些记录已落盘的状态
+    """
+
+    def __init__(self, output_dir=DEFAULT_SHARDS_DIR, prefix='jobs', compression='',
+                 batch_size=500, flush_seconds=5, rotate_bytes=64 * 1024 * 1024, rotate_seconds=600,
+                 on_flush=None):
+        if compression not in SHARD_SUFFIXES:
+            raise ValueError(f"不支持的压缩格式：{compression}（可选：gzip、zstd 或留空）")
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.compression = compression
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.on_flush = on_flush
+
+        self.recovered_shards = recover_orphan_shards(output_dir, prefix)
+        with manifest_lock(output_dir):
+            manifest = read_manifest(output_dir)
+            self.run_id = new_run_id(manifest)
+            self.run_lock_path = os.path.join(output_dir, f"{prefix}-{self.run_id}{RUN_LOCK_SUFFIX}")
+            self.run_lock = FileLock(self.run_lock_path)
+            self.run_lock.acquire()
+            manifest.setdefault('runs', []).append({
+                'run_id': self.run_id, 'started_at': int(time.time()), 'finished_at': None, 'records': 0,
+            })
+            write_manifest(output_dir, manifest)
+
+        self.buffer = []
+        self.last_flush = time.time()
+        self.shard_seq = 0
+        self.shard_file = None
+        self.total_records = 0
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(self.buffer) >= self.batch_size or time.time() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def tick(self):
+        """定时调用（管道用 LoopingCall 驱动）：没有新记录时也按 flush_seconds/rotate_seconds 落盘和轮转"""
+        now = time.time()
+        if self.buffer and now - self.last_flush >= self.flush_seconds:
+            self.flush()
+        elif self.shard_file is not None and now - self.shard_opened_at >= self.rotate_seconds:
+            self._finalize_shard()
+
+    def flush(self):
+        """把缓冲区写入当前分片，并在达到大小/时间阈值时轮转"""
+        self.last_flush = time.time()
+        if not self.buffer:
+            return
+        if self.shard_file is None:
+            self._open_shard()
+        payload = '\n'.join(self.buffer) + '\n'
+        self.shard_file.write(payload)
+        self.shard_file.flush()
+        flushed = len(self.buffer)
+        self.shard_records += flushed
+        self.shard_bytes += len(payload.encode('utf-8'))
+        self.total_records += flushed
+        self.buffer = []
+
+        if self.shard_bytes >= self.rotate_bytes or time.time() - self.shard_opened_at >= self.rotate_seconds:
+            self._finalize_shard()
+        if self.on_flush is not None:
+            self.on_flush(flushed)
+
+    def _open_shard(self):
+        self.shard_seq += 1
+        self.shard_name = f"{self.prefix}-{self.run_id}-{self.shard_seq:05d}{SHARD_SUFFIXES[self.compression]}"
+        self.shard_part_path = os.path.join(self.output_dir, self.shard_name + PART_SUFFIX)
+        self.shard_file = open_shard(self.shard_part_path, 'w', self.compression)
+        self.shard_records = 0
+        self.shard_bytes = 0
+        self.shard_opened_at = time.time()
+
+    def _update_run(self, manifest, **fields):
+        for run in manifest.setdefault('runs', []):
+            if run.get('run_id') == self.run_id:
+                run.update(fields)
+                return
+
+    def _finalize_shard(self):
+        self.shard_file.close()
+        self.shard_file = None
+        os.replace(self.shard_part_path, os.path.join(self.output_dir, self.shard_name))
+        shard = {
+            'file': self.shard_name,
+            'run_id': self.run_id,
+            'records': self.shard_records,
+            'bytes': self.shard_bytes,
+            'created_at': int(self.shard_opened_at),
+            'finalized_at': int(time.time()),
+        }
+
+        def update(manifest):
+            manifest['shards'].append(shard)
+            self._update_run(manifest, records=self.total_records)
+
+        update_manifest(self.output_dir, update)
+
+    def close(self):
+        self.flush()
+        if self.shard_file is not None:
+            self._finalize_shard()
+        update_manifest(self.output_dir, lambda manifest: self._update_run(
+            manifest, finished_at=int(time.time()), records=self.total_records))
+        self.run_lock.release()
+        try:
+            os.remove(self.run_lock_path)
+        except OSError:
+            pass
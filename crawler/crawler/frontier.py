@@ -0,0 +1,136 @@
+# crawler/crawler/frontier.py
+# 爬取断点：每个查询组合一行（总页数 + 已完成页位图 + 是否完成），中断后重启只补未完成的页
+import os
+import sqlite3
+import time
+
+DEFAULT_FRONTIER_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'frontier.sqlite')
+
+
+class QueryProgress:
+    """单个查询组合的进度；pages 为位图，第 n 页对应第 n-1 位"""
+
+    def __init__(self, total_pages=None, pages=b'', done=False):
+        self.total_pages = total_pages
+        self.pages = bytearray(pages)
+        self.done = done
+
+    def has_page(self, page):
+        index = page - 1
+        return index >> 3 < len(self.pages) and bool(self.pages[index >> 3] & (1 << (index & 7)))
+
+    def add_page(self, page):
+        index = page - 1
+        if index >> 3 >= len(self.pages):
+            self.pages.extend(b'\x00' * ((index >> 3) + 1 - len(self.pages)))
+        self.pages[index >> 3] |= 1 << (index & 7)
+
+    def pending_pages(self):
+        if not self.total_pages:
+            return []
+        return [page for page in range(1, self.total_pages + 1) if not self.has_page(page)]
+
+
+class FrontierStore:
+    """断点存储（SQLite）。与 JOBDIR 的请求队列不同，大小只与查询组合数有关，与待抓请求数无关。
+
+    frontier_id 标识目标维度（查询计划），与上次不一致时丢弃旧断点。
+    进度在内存中累积，按 commit_seconds 批量写入。
+    """
+
+    def __init__(self, db_path=DEFAULT_FRONTIER_DB, frontier_id='', commit_seconds=5):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.commit_seconds = commit_seconds
+        self.last_commit = time.time()
+        self.dirty = set()
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS frontier_meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                query_key   TEXT PRIMARY KEY,
+                total_pages INTEGER,
+                pages       BLOB NOT NULL,
+                done        INTEGER NOT NULL DEFAULT 0,
+                updated_at  INTEGER NOT NULL
+            );
+        """)
+        row = self.conn.execute("SELECT value FROM frontier_meta WHERE key = 'frontier_id'").fetchone()
+        with self.conn:
+            if row is None or row[0] != frontier_id:
+                self.conn.execute("DELETE FROM frontier")
+                self.conn.execute("INSERT OR REPLACE INTO frontier_meta (key, value) VALUES ('frontier_id', ?)",
+                                  (frontier_id,))
+        self.frontier_id = frontier_id
+        self.progress = {
+            query_key: QueryProgress(total_pages, pages, bool(done))
+            for query_key, total_pages, pages, done in self.conn.execute(
+                "SELECT query_key, total_pages, pages, done FROM frontier")
+        }
+
+    def __len__(self):
+        return len(self.progress)
+
+    def get(self, query_key):
+        return self.progress.get(query_key)
+
+    def is_page_done(self, query_key, page):
+        progress = self.progress.get(query_key)
+        return progress is not None and progress.has_page(page)
+
+    def mark_page(self, query_key, page, total_pages=None):
+        """记录一页已抓完；总页数已知且全部抓完时查询组合视为完成"""
+        progress = self.progress.setdefault(query_key, QueryProgress())
+        if total_pages is not None:
+            progress.total_pages = total_pages
+        progress.add_page(page)
+        if progress.total_pages and not progress.pending_pages():
+            progress.done = True
+        self._touch(query_key)
+
+    def mark_done(self, query_key):
+        self.progress.setdefault(query_key, QueryProgress()).done = True
+        self._touch(query_key)
+
+    def _touch(self, query_key):
+        self.dirty.add(query_key)
+        if time.time() - self.last_commit >= self.commit_seconds:
+            self.commit()
+
+    def unfinished_count(self):
+        return sum(1 for progress in self.progress.values() if not progress.done)
+
+    def commit(self):
+        self.last_commit = time.time()
+        if not self.dirty:
+            return
+        now = int(time.time())
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO frontier (query_key, total_pages, pages, done, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(query_key, self.progress[query_key].total_pages, bytes(self.progress[query_key].pages),
+                  int(self.progress[query_key].done), now) for query_key in self.dirty])
+        self.dirty = set()
+
+    def clear(self):
+        """整次爬取正常结束后清空断点，下次从头开始"""
+        with self.conn:
+            self.conn.execute("DELETE FROM frontier")
+        self.progress = {}
+        self.dirty = set()
+
+    def clear_done(self):
+        """整次爬取结束后清掉已完成的查询组合；未完成的保留，下次运行只补抓其剩余的页"""
+        self.commit()
+        with self.conn:
+            self.conn.execute("DELETE FROM frontier WHERE done = 1")
+        self.progress = {query_key: progress for query_key, progress in self.progress.items() if not progress.done}
+
+    def close(self):
+        self.commit()
+        self.conn.close()
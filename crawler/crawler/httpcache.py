@@ -0,0 +1,44 @@
+# crawler/crawler/httpcache.py
+# 列表接口的HTTP缓存：忽略URL中的 "_" 时间戳参数，支持完全离线回放
+import json
+import os
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from scrapy.extensions.httpcache import DummyPolicy, FilesystemCacheStorage
+
+# 每次请求都会变化、不影响返回内容的参数
+VOLATILE_PARAMS = frozenset({'_'})
+
+
+def normalize_url(url):
+    """去掉时间戳参数并按参数名排序，使同一查询的不同请求得到相同的缓存key"""
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(params), ''))
+
+
+class JobsApiCacheStorage(FilesystemCacheStorage):
+    """按规范化URL存储（HTTPCACHE_GZIP 压缩、HTTPCACHE_EXPIRATION_SECS 过期）；
+    回放模式下缓存永不过期
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        if settings.getbool('JOBS_HTTPCACHE_REPLAY', False):
+            self.expiration_secs = 0
+
+    def _get_request_path(self, spider, request):
+        key = self._fingerprinter.fingerprint(request.replace(url=normalize_url(request.url))).hex()
+        return os.path.join(self.cachedir, spider.name, key[0:2], key)
+
+
+class JobsApiCachePolicy(DummyPolicy):
+    """只缓存接口成功（HTTP 200 且 flag=true）的响应，避免把失败结果回放出来"""
+
+    def should_cache_response(self, response, request):
+        if not super().should_cache_response(response, request) or response.status != 200:
+            return False
+        try:
+            return json.loads(response.text).get('flag') is True
+        except (ValueError, AttributeError):
+            return False
@@ -36,10 +36,16 @@ class JobItem(scrapy.Item): # Renamed from NcssJobItem to JobItem
     key_units = scrapy.Field()        # keyUnits
     sources_name = scrapy.Field()     # sourcesName
 
+    # 详情页字段（JobDetailPipeline 补全，未启用时为空）
+    description = scrapy.Field()      # 岗位描述
+
     # 补充溯源字段
     search_area_code = scrapy.Field() # area_code
     search_area_name = scrapy.Field() # area_name
     search_keyword = scrapy.Field()
     search_category_code = scrapy.Field()
     search_industry_code = scrapy.Field()
-    source_url = scrapy.Field()         # URL
\ No newline at end of file
+    source_url = scrapy.Field()         # URL
+
+    # 去重管道标记：new（首次出现）/ updated（内容有变化）
+    change_type = scrapy.Field()
\ No newline at end of file
@@ -1,11 +1,13 @@
 # 中间件核心逻辑
 import random
+import socket
 import time
 import requests
 import threading
 import json
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+from scrapy import signals
 from scrapy.exceptions import NotConfigured, IgnoreRequest
 from twisted.internet.error import (
     ConnectionRefusedError, TCPTimedOutError, ConnectionDone, ConnectError,
@@ -14,6 +16,8 @@ from twisted.internet.error import (
 from twisted.web.client import ResponseFailed
 from scrapy.utils.log import logger
 
+from crawler.proxypool import ProxyPool
+
 # 安全网关域名列表（识别异常代理）
 SECURITY_GATEWAY_DOMAINS = [
     'zscaler', 'fortinet', 'barracuda', 'checkpoint', 'paloaltonetworks',
@@ -56,7 +60,7 @@ class EnhancedProxyPoolMiddleware:
     # 代理重试HTTP状态码
     PROXY_RETRY_HTTP_CODES = {400, 403, 407, 429, 500, 502, 503, 504, 520, 522, 524}
 
-    def __init__(self, settings):
+    def __init__(self, settings, stats=None):
         # 未启用则抛出异常
         if not settings.getbool('PROXY_POOL_ENABLED', False):
             raise NotConfigured("EnhancedProxyPoolMiddleware未启用（PROXY_POOL_ENABLED=False）")
@@ -73,35 +77,91 @@ class EnhancedProxyPoolMiddleware:
         self.min_pool_size_to_fetch = settings.getint('PROXY_MIN_POOL_SIZE_FETCH', 5)
         self.max_consecutive_fails_remove = settings.getint('PROXY_MAX_CONSECUTIVE_FAILS_REMOVE', 3)
         self.min_score_remove = settings.getfloat('PROXY_MIN_SCORE_REMOVE', 0.1)
-
-        # 代理池存储（双端队列）
-        self.proxies_deque = deque()
+        self.refresh_interval = settings.getfloat('PROXY_REFRESH_INTERVAL', 30)
+        self.validate_url = settings.get('PROXY_VALIDATE_URL', '')
+        self.validate_timeout = settings.getfloat('PROXY_VALIDATE_TIMEOUT', 5)
+        self.validate_workers = settings.getint('PROXY_VALIDATE_WORKERS', 20)
+        self.per_proxy_slot = settings.getbool('PROXY_PER_SLOT', False)
+
+        # 代理池存储（按 ip:port 索引，按延迟/成功率加权选取）
+        self.pool = ProxyPool(
+            ewma_alpha=settings.getfloat('PROXY_LATENCY_EWMA_ALPHA', 0.3),
+            min_score=self.min_score_remove,
+            max_consecutive_fails=self.max_consecutive_fails_remove,
+            default_latency=self.proxy_request_timeout / 2,
+        )
         self.lock = threading.Lock()  # 线程锁（保护代理池操作）
+        self.stats = stats
         self.last_fetch_time = 0
 
-        # 初始化请求会话
+        # 初始化请求会话（仅后台补充线程使用）
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': 'ScrapyProxyFetcher/1.0'})
 
+        # 后台补充线程：下载流程只从池中取已验证的代理，从不等待代理API
+        self.refresh_wakeup = threading.Event()
+        self.refresh_stopped = threading.Event()
+        self.refresh_thread = threading.Thread(target=self._refresh_loop, name='proxy-refresher', daemon=True)
+
         logger.info(f"增强版代理池中间件已启用，代理API地址：{self.proxy_pool_url}")
-        self._fetch_new_proxies()  # 初始化拉取代理
+        self.refresh_thread.start()  # 初始化拉取代理（后台进行）
 
     @classmethod
     def from_crawler(cls, crawler):
-        return cls(crawler.settings)
-
-    def _fetch_new_proxies(self):
-        """从API拉取新代理（带冷却、数量校验）"""
+        middleware = cls(crawler.settings, crawler.stats)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_closed(self, spider):
+        """停止后台补充线程，并记录代理池最终概况"""
+        self.refresh_stopped.set()
+        self.refresh_wakeup.set()
+        self._record_pool_stats()
+
+    def _record_pool_stats(self):
+        """代理池概况写入爬虫统计（proxy_pool/*）"""
+        if self.stats is None:
+            return
+        with self.lock:
+            snapshot = self.pool.snapshot()
+        for key, value in snapshot.items():
+            self.stats.set_value(f'proxy_pool/{key}', value)
+
+    def _refresh_loop(self):
+        """后台线程：代理池低于阈值时拉取并验证新代理，平时按间隔巡检或被请求唤醒"""
+        while not self.refresh_stopped.is_set():
+            self._refill_pool()
+            self.refresh_wakeup.wait(self.refresh_interval)
+            self.refresh_wakeup.clear()
+
+    def _refill_pool(self):
+        """从API拉取新代理（带冷却、数量校验），并发验证后加入代理池"""
         with self.lock:
             current_time = time.time()
             # 冷却时间内不请求
             if current_time - self.last_fetch_time < self.fetch_cooldown_seconds:
                 return False
             # 代理池充足时不请求
-            if self.proxies_deque and len(self.proxies_deque) >= self.min_pool_size_to_fetch:
+            if len(self.pool) >= self.min_pool_size_to_fetch:
                 return False
             self.last_fetch_time = current_time
 
+        candidates = [ip_port for ip_port in self._fetch_candidates() if ip_port not in self.pool]
+        if not candidates:
+            logger.info("代理API返回无新代理或列表为空")
+            return False
+
+        validated = self._validate_candidates(candidates)
+        with self.lock:
+            for ip_port, latency in validated:
+                self.pool.add(ip_port, latency)
+            pool_size = len(self.pool)
+        logger.info(f"拉取{len(candidates)}个候选代理，验证通过{len(validated)}个，当前池大小：{pool_size}")
+        self._record_pool_stats()
+        return bool(validated)
+
+    def _fetch_candidates(self):
+        """请求代理API，返回候选代理 ip:port 列表"""
         logger.info(f"开始从API拉取新代理：{self.proxy_pool_url}")
         try:
             response = self.session.get(self.proxy_pool_url, timeout=self.api_timeout)
@@ -113,40 +173,26 @@ class EnhancedProxyPoolMiddleware:
                 proxy_items_from_api = api_data.get("list", [])
                 if not isinstance(proxy_items_from_api, list):
                     logger.error("代理API返回成功状态，但list字段非列表")
-                    return False
-
-                fetched_proxies_count = 0
-                newly_added_proxies_log = []
-                with self.lock:
-                    current_pool_ips = {p['ip_port'] for p in self.proxies_deque}
-                    # 解析代理列表并去重添加
-                    for item in proxy_items_from_api:
-                        if isinstance(item, dict):
-                            ip = item.get("sever")
-                            port = item.get("port")
-                            if ip and port:
-                                try:
-                                    ip_port_str = f"{ip}:{int(port)}"
-                                    if ip_port_str not in current_pool_ips:
-                                        proxy_obj = {
-                                            "ip_port": ip_port_str, "score": 1.0, "last_used": 0,
-                                            "fail_count": 0, "success_count": 0, "consecutive_fails": 0
-                                        }
-                                        self.proxies_deque.append(proxy_obj)
-                                        newly_added_proxies_log.append(ip_port_str)
-                                        fetched_proxies_count += 1
-                                except ValueError:
-                                    logger.warning(f"代理端口格式错误：{item}")
-                            else:
-                                logger.warning(f"代理字段缺失（sever/port）：{item}")
+                    return []
+
+                candidates = []
+                # 解析代理列表并去重
+                for item in proxy_items_from_api:
+                    if isinstance(item, dict):
+                        ip = item.get("sever")
+                        port = item.get("port")
+                        if ip and port:
+                            try:
+                                ip_port_str = f"{ip}:{int(port)}"
+                                if ip_port_str not in candidates:
+                                    candidates.append(ip_port_str)
+                            except ValueError:
+                                logger.warning(f"代理端口格式错误：{item}")
                         else:
-                            logger.warning(f"代理格式错误：{item}")
-                
-                if fetched_proxies_count > 0:
-                    logger.info(f"成功拉取{fetched_proxies_count}个新代理，当前池大小：{len(self.proxies_deque)}")
-                else:
-                    logger.info("代理API返回无新代理或列表为空")
-                return True
+                            logger.warning(f"代理字段缺失（sever/port）：{item}")
+                    else:
+                        logger.warning(f"代理格式错误：{item}")
+                return candidates
             else:
                 error_message = api_data.get('msg', '无错误信息')
                 logger.error(f"代理API返回失败状态：{api_data.get('status')}，错误信息：{error_message}")
@@ -160,67 +206,53 @@ class EnhancedProxyPoolMiddleware:
         except Exception as e:
             logger.error(f"代理拉取未知异常：{e}", exc_info=True)
         
-        return False
+        return []
 
-    def _get_proxy(self):
-        """从代理池获取代理（轮询）"""
-        if not self.proxies_deque:
+    def _probe_proxy(self, ip_port):
+        """轻量健康检查：配置了验证地址则经代理请求一次，否则只测试TCP连通；返回耗时，失败返回None"""
+        started = time.time()
+        try:
+            if self.validate_url:
+                proxy_url = f"http://{ip_port}"
+                response = requests.head(self.validate_url, proxies={'http': proxy_url, 'https': proxy_url},
+                                         timeout=self.validate_timeout, allow_redirects=False)
+                if response.status_code >= 400:
+                    return None
+            else:
+                host, port = ip_port.rsplit(':', 1)
+                with socket.create_connection((host, int(port)), timeout=self.validate_timeout):
+                    pass
+        except (requests.exceptions.RequestException, OSError, ValueError):
             return None
-        # 轮询：左出右入
-        proxy = self.proxies_deque.popleft()
-        self.proxies_deque.append(proxy)
-        proxy['last_used'] = time.time()
-        return proxy
-
-    def _update_proxy_stats(self, proxy_ip_port, success):
-        """更新代理状态（分数/失败次数），低于阈值则移除"""
-        found_proxy_obj = None
-        for p_obj in self.proxies_deque:
-            if p_obj['ip_port'] == proxy_ip_port:
-                found_proxy_obj = p_obj
-                break
-        if not found_proxy_obj:
-            return
-
-        # 更新状态
-        if success:
-            found_proxy_obj['score'] = min(1.0, found_proxy_obj['score'] + 0.05)
-            found_proxy_obj['success_count'] += 1
-            found_proxy_obj['consecutive_fails'] = 0
-        else:
-            found_proxy_obj['score'] = max(0.0, found_proxy_obj['score'] - 0.2)
-            found_proxy_obj['fail_count'] += 1
-            found_proxy_obj['consecutive_fails'] += 1
-
-        # 低分/连续失败代理移除
-        if found_proxy_obj['score'] < self.min_score_remove or found_proxy_obj['consecutive_fails'] >= self.max_consecutive_fails_remove:
-            logger.warning(f"移除低质量代理：{found_proxy_obj['ip_port']}（分数：{found_proxy_obj['score']:.2f}，连续失败：{found_proxy_obj['consecutive_fails']}）")
-            try:
-                new_deque = deque(p for p in self.proxies_deque if p['ip_port'] != found_proxy_obj['ip_port'])
-                self.proxies_deque.clear()
-                self.proxies_deque.extend(new_deque)
-            except Exception as e:
-                logger.error(f"代理移除异常：{e}")
+        return time.time() - started
+
+    def _validate_candidates(self, candidates):
+        """并发验证候选代理，返回通过验证的 (ip:port, 耗时) 列表"""
+        with ThreadPoolExecutor(max_workers=max(1, min(self.validate_workers, len(candidates)))) as executor:
+            results = executor.map(self._probe_proxy, candidates)
+            return [(ip_port, latency) for ip_port, latency in zip(candidates, results) if latency is not None]
+
+    def _update_proxy_stats(self, proxy_ip_port, success, latency=None):
+        """更新代理状态（分数/成功率/延迟），低于阈值则移除（调用方持有锁）"""
+        removed = self.pool.record(proxy_ip_port, success, latency)
+        if removed:
+            logger.warning(f"移除低质量代理：{removed['ip_port']}（分数：{removed['score']:.2f}，连续失败：{removed['consecutive_fails']}）")
+            if self.stats is not None:
+                self.stats.inc_value('proxy_pool/removed')
+                self.stats.set_value('proxy_pool/size', len(self.pool))
 
     def process_request(self, request, spider):
-        """请求处理：分配代理（无代理则拉新）"""
+        """请求处理：分配代理（池不足时通知后台补充）"""
         # 重试请求保留原有代理
         if request.meta.get('proxy') and request.meta.get('_proxy_retry_count', 0) > 0:
             return None
 
-        # 代理池不足时拉新
-        needs_fetch_check = False
-        with self.lock:
-            if not self.proxies_deque or len(self.proxies_deque) < self.min_pool_size_to_fetch:
-                needs_fetch_check = True
-        if needs_fetch_check:
-            self._fetch_new_proxies()
-
-        # 分配代理
+        # 分配代理；代理池不足时唤醒后台线程补充（不在此等待）
         proxy_obj_to_use = None
         with self.lock:
-            if self.proxies_deque:
-                proxy_obj_to_use = self._get_proxy()
+            if len(self.pool) < self.min_pool_size_to_fetch:
+                self.refresh_wakeup.set()
+            proxy_obj_to_use = self.pool.select()
 
         if proxy_obj_to_use:
             ip_port = proxy_obj_to_use['ip_port']
@@ -228,11 +260,21 @@ class EnhancedProxyPoolMiddleware:
             request.meta['proxy'] = proxy_url
             request.meta['_current_proxy_obj'] = proxy_obj_to_use
             request.meta['download_timeout'] = self.proxy_request_timeout
+            # 每个代理独立的下载槽位，便于按代理分别控制并发与延迟；
+            # 请求自带的槽位（如详情请求的 job-detail）保留，其并发由指定方控制
+            if self.per_proxy_slot and self._owns_slot(request):
+                request.meta['download_slot'] = f"proxy:{ip_port}"
             logger.debug(f"使用代理 {proxy_url} 访问 {request.url}（分数：{proxy_obj_to_use['score']:.2f}）")
         else:
             logger.warning(f"无可用代理，{request.url} 将直接请求")
         return None
 
+    @staticmethod
+    def _owns_slot(request):
+        """请求没有指定槽位，或槽位是本中间件按代理分配的"""
+        slot = request.meta.get('download_slot')
+        return slot is None or str(slot).startswith('proxy:')
+
     def _handle_proxy_failure(self, request, spider, reason_msg):
         """代理失败处理：更新状态+重试（未达最大次数则换代理）"""
         current_proxy_obj = request.meta.get('_current_proxy_obj')
@@ -250,6 +292,8 @@ class EnhancedProxyPoolMiddleware:
             # 清空旧代理信息
             if 'proxy' in new_request.meta: del new_request.meta['proxy']
             if '_current_proxy_obj' in new_request.meta: del new_request.meta['_current_proxy_obj']
+            if self._owns_slot(new_request):
+                new_request.meta.pop('download_slot', None)
             
             logger.info(f"重试 {request.url}（代理重试次数：{retry_count + 1}/{self.max_proxy_retries_per_request}）")
             return new_request
@@ -287,9 +331,10 @@ class EnhancedProxyPoolMiddleware:
                 except json.JSONDecodeError:
                     logger.warning(f"代理 {proxy_ip_port} 访问 {request.url} 返回非JSON数据：{response.text[:200]}")
                 
-                # 更新代理状态
+                # 更新代理状态（Scrapy在meta中记录了本次下载耗时）
                 with self.lock:
-                    self._update_proxy_stats(proxy_ip_port, success_on_target_api_level)
+                    self._update_proxy_stats(proxy_ip_port, success_on_target_api_level,
+                                             request.meta.get('download_latency'))
                 
                 # API返回失败则重试
                 if not success_on_target_api_level:
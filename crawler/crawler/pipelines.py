@@ -1,7 +1,20 @@
 import pymysql,json,openpyxl
+import queue
+import threading
+import time
+from collections import Counter
 from datetime import datetime
 from itemadapter import ItemAdapter
-from scrapy.exceptions import DropItem
+from scrapy import Request, signals
+from scrapy.exceptions import DropItem, NotConfigured
+from twisted.internet import task
+from twisted.internet.defer import DeferredSemaphore, succeed
+from twisted.internet.threads import deferToThread
+
+from crawler.feeds import JsonlShardWriter, DEFAULT_SHARDS_DIR
+from crawler.dedup import JobDedupStore, DEFAULT_DEDUP_DB, DUPLICATE, content_hash
+from crawler.details import DetailCache, DEFAULT_DETAIL_CACHE_DB
+from crawler.extensions import output_barrier_enabled, output_persisted
 
 class BasePipeline:
     """基础管道类，提供通用方法"""
@@ -13,24 +26,390 @@ class BasePipeline:
         """获取当前时间字符串"""
         return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-class JobPipeline:
+class JobDedupPipeline:
+    """跨运行去重：丢弃内容未变化的重复岗位，内容变化的岗位标记为 updated。
+
+    启用分片输出时，岗位的去重登记在其写入分片之后才提交（output_persisted 信号），
+    进程中途崩溃时尚未落盘的岗位下次仍判为新增/更新，不会因为已登记而丢失；
+    被后续管道丢弃或出错的岗位放弃登记。
+    """
+    def __init__(self, settings, stats):
+        if not settings.getbool('DEDUP_ENABLED', True):
+            raise NotConfigured("JobDedupPipeline未启用（DEDUP_ENABLED=False）")
+        self.db_path = settings.get('DEDUP_DB') or DEFAULT_DEDUP_DB
+        self.bloom_capacity = settings.getint('DEDUP_BLOOM_CAPACITY', 2_000_000)
+        self.bloom_error_rate = settings.getfloat('DEDUP_BLOOM_ERROR_RATE', 0.001)
+        self.persist_barrier = output_barrier_enabled(settings)
+        self.stats = stats
+        self.store = None
+        self.in_flight = Counter()  # job_id -> 已通过去重、尚未离开管道的条目数
+        self.written_job_ids = set()  # 已离开管道、等待落盘后提交的岗位
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(crawler.settings, crawler.stats)
+        if pipeline.persist_barrier:
+            crawler.signals.connect(pipeline.item_scraped, signal=signals.item_scraped)
+            crawler.signals.connect(pipeline.item_discarded, signal=signals.item_dropped)
+            crawler.signals.connect(pipeline.item_discarded, signal=signals.item_error)
+            crawler.signals.connect(pipeline.output_persisted, signal=output_persisted)
+        return pipeline
+
     def open_spider(self, spider):
         if spider.name == 'jobs':
-            self.file = open('crawler\data1\jobs.json', 'w', encoding='utf-8')
-            self.file.write('[\n')
-            self.first_item = True
-    
+            self.store = JobDedupStore(self.db_path, self.bloom_capacity, self.bloom_error_rate,
+                                       auto_commit=not self.persist_barrier)
+            spider.logger.info(f"去重存储：{self.db_path}（布隆过滤器已有 {self.store.bloom.count} 个岗位）")
+
     def close_spider(self, spider):
+        if self.store is None:
+            return
+        # 分片输出先于本管道关闭（close_spider 按相反顺序调用），已落盘的登记此时都已提交
+        unpersisted = len(self.store.pending_rows) if self.persist_barrier else 0
+        if unpersisted:
+            spider.logger.warning(f"{unpersisted} 个岗位的去重登记未提交（对应条目没有写入分片）")
+        self.store.close(commit_pending=not self.persist_barrier)
+        total = self.stats.get_value('dedup/total', 0)
+        if total:
+            duplicates = self.stats.get_value('dedup/duplicate', 0)
+            self.stats.set_value('dedup/duplicate_ratio', round(duplicates / total, 4))
+            spider.logger.info(
+                f"去重统计：共 {total} 条，新增 {self.stats.get_value('dedup/new', 0)}，"
+                f"更新 {self.stats.get_value('dedup/updated', 0)}，重复 {duplicates}（{duplicates / total:.1%}）")
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        job_id = adapter.get('job_id')
+        if self.store is None or not job_id:
+            return item
+
+        status = self.store.check(job_id, content_hash(adapter.asdict()))
+        self.stats.inc_value('dedup/total')
+        self.stats.inc_value(f'dedup/{status}')
+        if status == DUPLICATE:
+            if self.persist_barrier and job_id not in self.in_flight:
+                self.written_job_ids.add(job_id)  # 只更新最后出现时间，无需等待输出
+            raise DropItem(f"重复岗位：{job_id}")
+        adapter['change_type'] = status
+        if self.persist_barrier:
+            self.in_flight[job_id] += 1
+        return item
+
+    def item_scraped(self, item):
+        self._item_left(item, written=True)
+
+    def item_discarded(self, item):
+        self._item_left(item, written=False)
+
+    def _item_left(self, item, written):
+        job_id = ItemAdapter(item).get('job_id')
+        if self.store is None or not self.in_flight.get(job_id):
+            return
+        self.in_flight[job_id] -= 1
+        if written:
+            self.written_job_ids.add(job_id)
+        if not self.in_flight[job_id]:
+            del self.in_flight[job_id]
+            if job_id not in self.written_job_ids:
+                self.store.discard(job_id)
+
+    def output_persisted(self):
+        if self.store is None:
+            return
+        ready = {job_id for job_id in self.written_job_ids if job_id not in self.in_flight}
+        self.store.commit(ready)
+        self.written_job_ids -= ready
+
+class JobDetailPipeline:
+    """岗位详情补全：为通过去重的岗位（新增或内容变化）请求详情页，提取 description。
+
+    详情按列表内容哈希缓存，同一内容只请求一次；详情请求由独立的信号量限制并发，
+    使用单独的下载槽位，不挤占列表页的并发。请求失败时岗位照常输出，只是没有描述。
+    """
+    DETAIL_SLOT = 'job-detail'
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('JOBS_DETAIL_ENABLED', False):
+            raise NotConfigured("JobDetailPipeline未启用（JOBS_DETAIL_ENABLED=False）")
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.url_template = settings.get('JOBS_DETAIL_URL')
+        self.selectors = settings.getlist('JOBS_DETAIL_DESCRIPTION_SELECTORS')
+        self.semaphore = DeferredSemaphore(max(1, settings.getint('JOBS_DETAIL_CONCURRENCY', 4)))
+        self.cache_path = settings.get('JOBS_DETAIL_CACHE_DB') or DEFAULT_DETAIL_CACHE_DB
+        self.cache = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def open_spider(self, spider):
         if spider.name == 'jobs':
-            self.file.write('\n]')
-            self.file.close()
-    
+            self.cache = DetailCache(self.cache_path)
+            spider.logger.info(f"岗位详情补全已启用，缓存：{self.cache_path}（已有 {len(self.cache)} 条）")
+
+    def close_spider(self, spider):
+        if self.cache is not None:
+            self.cache.close()
+
     def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        job_id = adapter.get('job_id')
+        if self.cache is None or not job_id or adapter.get('description'):
+            return item
+
+        # 去重管道在前：重复岗位已被丢弃，到这里的都是新增/变化的岗位（或未启用去重）
+        key = content_hash(adapter.asdict())
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats.inc_value('job_detail/cache_hit')
+            adapter['description'] = cached or None
+            return item
+
+        d = self.semaphore.run(self._fetch, job_id)
+        d.addCallback(self._on_detail, adapter, key, spider)
+        d.addErrback(self._on_error, job_id, spider)
+        return d.addCallback(lambda _: item)
+
+    def _fetch(self, job_id):
+        self.stats.inc_value('job_detail/requested')
+        request = Request(self.url_template.format(job_id=job_id),
+                          headers={'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8'},
+                          meta={'download_slot': self.DETAIL_SLOT})
+        return self.crawler.engine.download(request)
+
+    def _on_detail(self, response, adapter, key, spider):
+        if response.status != 200:
+            self.stats.inc_value(f'job_detail/status_{response.status}')
+            spider.logger.debug(f"详情页返回 {response.status}：{response.url}")
+            return
+        description = self._extract_description(response)
+        self.stats.inc_value('job_detail/fetched' if description else 'job_detail/empty')
+        self.cache.put(key, adapter['job_id'], description)
+        adapter['description'] = description or None
+
+    def _extract_description(self, response):
+        """按配置的选择器依次尝试，取第一个有文本的区域"""
+        if not hasattr(response, 'css'):
+            return ''
+        for selector in self.selectors:
+            texts = [text.strip() for text in response.css(selector).css('*::text').getall()]
+            text = '\n'.join(text for text in texts if text)
+            if text:
+                return text
+        return ''
+
+    def _on_error(self, failure, job_id, spider):
+        self.stats.inc_value('job_detail/failed')
+        spider.logger.warning(f"岗位 {job_id} 详情请求失败：{failure.getErrorMessage()}")
+
+class JsonlShardPipeline:
+    """流式JSONL分片输出：批量写入、按大小/时间轮转、可选gzip/zstd压缩、原子落盘并维护分片清单"""
+    def __init__(self, settings):
+        self.output_dir = settings.get('JOBS_OUTPUT_DIR') or DEFAULT_SHARDS_DIR
+        self.writer_kwargs = {
+            'compression': settings.get('JOBS_OUTPUT_COMPRESSION', ''),
+            'batch_size': settings.getint('JOBS_OUTPUT_BATCH_SIZE', 500),
+            'flush_seconds': settings.getfloat('JOBS_OUTPUT_FLUSH_SECONDS', 5),
+            'rotate_bytes': settings.getint('JOBS_OUTPUT_ROTATE_BYTES', 64 * 1024 * 1024),
+            'rotate_seconds': settings.getfloat('JOBS_OUTPUT_ROTATE_SECONDS', 600),
+        }
+        self.writer = None
+        self.tick_task = None
+        self.signals = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(crawler.settings)
+        pipeline.signals = crawler.signals
+        return pipeline
+
+    def _persisted(self, records):
+        self.signals.send_catch_log(output_persisted, records=records)
+
+    def open_spider(self, spider):
         if spider.name == 'jobs':
-            line = json.dumps(dict(item), ensure_ascii=False)
-            if self.first_item:
-                self.file.write(line)
-                self.first_item = False
-            else:
-                self.file.write(',\n' + line)
-        return item
\ No newline at end of file
+            self.writer = JsonlShardWriter(self.output_dir, prefix=spider.name,
+                                           on_flush=self._persisted if self.signals else None, **self.writer_kwargs)
+            if self.writer.recovered_shards:
+                spider.logger.warning(f"回收上次异常退出遗留的分片 {len(self.writer.recovered_shards)} 个，"
+                                      f"共 {sum(s['records'] for s in self.writer.recovered_shards)} 条")
+            # 爬取停顿（限速、等待重试）时没有新条目触发写入，定时检查以按时落盘和轮转
+            self.tick_task = task.LoopingCall(self.writer.tick)
+            self.tick_task.start(max(1.0, min(self.writer.flush_seconds, 10.0)), now=False).addErrback(
+                lambda failure: spider.logger.error(f"分片定时落盘失败：{failure.getErrorMessage()}"))
+            spider.logger.info(f"岗位数据输出到分片目录：{self.output_dir}")
+
+    def close_spider(self, spider):
+        if self.tick_task is not None and self.tick_task.running:
+            self.tick_task.stop()
+        if self.writer is not None:
+            self.writer.close()
+            if self.signals is not None:
+                self._persisted(0)
+            spider.logger.info(f"分片输出完成，共写入 {self.writer.total_records} 条，清单：{self.output_dir}")
+
+    def process_item(self, item, spider):
+        if self.writer is not None:
+            self.writer.write(ItemAdapter(item).asdict())
+        return item
+
+
+class MySQLJobPipeline:
+    """批量写入MySQL原始岗位表：后台线程按批次 INSERT ... ON DUPLICATE KEY UPDATE，不阻塞Twisted反应器"""
+    # 与 schema.sql 中 raw_jobs 表的列一致（job_id 为主键）
+    COLUMNS = (
+        'job_id', 'job_name', 'job_catory', 'job_industry', 'high_month_pay', 'low_month_pay',
+        'update_date', 'publish_date', 'head_count', 'member_level', 'recruit_type', 'degree_name',
+        'company_name', 'company_logo', 'area_code_name', 'prinvce_code_nme', 'company_scale',
+        'sort_priority', 'sources_name_ch', 'sources_type', 'company_tags', 'major_required',
+        'company_property', 'user_type', 'company_id', 'key_units', 'sources_name', 'description',
+        'search_area_code', 'search_area_name', 'search_keyword', 'search_category_code',
+        'search_industry_code', 'source_url', 'change_type', 'crawled_at',
+    )
+    _STOP = object()  # 写入线程结束标记
+    BACKPRESSURE_POLL = 0.05  # 队列满时重试入队的间隔（秒）
+
+    def __init__(self, settings, stats):
+        if not settings.getbool('MYSQL_PIPELINE_ENABLED', False):
+            raise NotConfigured("MySQLJobPipeline未启用（MYSQL_PIPELINE_ENABLED=False）")
+        self.db_config = {
+            'host': settings.get('MYSQL_HOST', '127.0.0.1'),
+            'port': settings.getint('MYSQL_PORT', 3306),
+            'user': settings.get('MYSQL_USER', 'root'),
+            'password': settings.get('MYSQL_PASSWORD', ''),
+            'database': settings.get('MYSQL_DATABASE', 'jobviz'),
+            'charset': 'utf8mb4',
+        }
+        self.table = settings.get('MYSQL_JOBS_TABLE', 'raw_jobs')
+        self.batch_size = settings.getint('MYSQL_JOBS_BATCH_SIZE', 500)
+        self.flush_interval = settings.getfloat('MYSQL_JOBS_FLUSH_INTERVAL', 2.0)
+        # 队列满时 process_item 返回未触发的Deferred，Scrapy据此放慢产出（背压）
+        self.queue = queue.Queue(maxsize=settings.getint('MYSQL_JOBS_QUEUE_SIZE', 5000))
+        self.stats = stats
+        self.conn = None
+        self.writer_thread = None
+
+        column_list = ', '.join(f"`{c}`" for c in self.COLUMNS)
+        placeholders = ', '.join(['%s'] * len(self.COLUMNS))
+        updates = ', '.join(f"`{c}` = VALUES(`{c}`)" for c in self.COLUMNS if c != 'job_id')
+        self.upsert_sql = (f"INSERT INTO `{self.table}` ({column_list}) VALUES ({placeholders}) "
+                           f"ON DUPLICATE KEY UPDATE {updates}")
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler.stats)
+
+    def open_spider(self, spider):
+        if spider.name != 'jobs':
+            return
+        # 启动时即连接，配置错误尽早暴露
+        self.conn = pymysql.connect(**self.db_config)
+        self.writer_thread = threading.Thread(target=self._writer_loop, args=(spider,),
+                                              name='mysql-job-writer', daemon=True)
+        self.writer_thread.start()
+        spider.logger.info(f"MySQL批量写入已启用：{self.db_config['host']}:{self.db_config['port']}/"
+                           f"{self.db_config['database']}.{self.table}（每批 {self.batch_size} 条）")
+
+    def close_spider(self, spider):
+        if self.writer_thread is None:
+            return None
+        # 在线程池中等待写入线程排空队列，避免阻塞反应器
+        return deferToThread(self._stop_writer)
+
+    def _stop_writer(self):
+        # 写入线程已退出时队列不会再被消费，不能无限期阻塞在 put 上
+        while self.writer_thread.is_alive():
+            try:
+                self.queue.put(self._STOP, timeout=1)
+                break
+            except queue.Full:
+                continue
+        self.writer_thread.join()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def process_item(self, item, spider):
+        if self.writer_thread is None:
+            return item
+        row = self._to_row(ItemAdapter(item))
+        try:
+            self._put(row)
+        except queue.Full:
+            self.stats.inc_value('mysql/backpressure_waits')
+            return self._put_when_free(row).addCallback(lambda _: item)
+        return item
+
+    def _put(self, row):
+        if not self.writer_thread.is_alive():
+            self.stats.inc_value('mysql/rows_failed')
+            return
+        self.queue.put_nowait(row)
+
+    def _put_when_free(self, row):
+        """队列满时由反应器定时重试入队：不占用共享线程池（DNS解析、其他 deferToThread 调用都依赖它）"""
+        from twisted.internet import reactor  # 在Scrapy安装反应器之后再导入
+        try:
+            self._put(row)
+        except queue.Full:
+            return task.deferLater(reactor, self.BACKPRESSURE_POLL, self._put_when_free, row)
+        return succeed(None)
+
+    def _to_row(self, adapter):
+        row = []
+        for column in self.COLUMNS:
+            if column == 'crawled_at':
+                row.append(datetime.now())
+                continue
+            value = adapter.get(column)
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, ensure_ascii=False)
+            row.append(value)
+        return tuple(row)
+
+    def _writer_loop(self, spider):
+        """攒够 batch_size 条或距上次写入超过 flush_interval 秒即写入一批"""
+        batch = []
+        deadline = time.time() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                row = self.queue.get(timeout=max(0.05, deadline - time.time()))
+                if row is self._STOP:
+                    stopping = True
+                else:
+                    batch.append(row)
+            except queue.Empty:
+                pass
+            if batch and (stopping or len(batch) >= self.batch_size or time.time() >= deadline):
+                try:
+                    self._write_batch(batch, spider)
+                except Exception:
+                    # 非 MySQLError 的异常（数据无法转义、连接对象异常等）只丢弃本批，线程继续消费队列
+                    spider.logger.error(f"MySQL批量写入异常，丢弃本批 {len(batch)} 条", exc_info=True)
+                    self.stats.inc_value('mysql/rows_failed', len(batch))
+                batch = []
+            if time.time() >= deadline:
+                deadline = time.time() + self.flush_interval
+
+    def _write_batch(self, batch, spider):
+        for attempt in (1, 2):
+            try:
+                self.conn.ping(reconnect=True)
+                with self.conn.cursor() as cursor:
+                    cursor.executemany(self.upsert_sql, batch)
+                self.conn.commit()
+                self.stats.inc_value('mysql/rows_written', len(batch))
+                self.stats.inc_value('mysql/batches')
+                return
+            except pymysql.MySQLError as e:
+                try:
+                    if self.conn.open:
+                        self.conn.rollback()
+                except Exception:
+                    pass  # 连接已断开，下一次 ping 时重连
+                spider.logger.error(f"MySQL批量写入失败（第{attempt}次，{len(batch)}条）：{e}")
+        self.stats.inc_value('mysql/rows_failed', len(batch))
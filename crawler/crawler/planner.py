@@ -0,0 +1,128 @@
+# crawler/crawler/planner.py
+# 查询空间规划：先用粗粒度查询探测结果数，只在超过接口页数上限时才拆分维度
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_PLAN_FILE = os.path.join(DATA_DIR, 'query_plan.json')
+
+# 可从“不限”开始、按需拆分的维度
+SPLITTABLE_DIMENSIONS = ('industry', 'city')
+
+ANY_INDUSTRY = {"code": "", "name": "不限行业"}  # 仅用于日志/请求元数据，不写入岗位的 job_industry
+
+
+def make_query_key(search_params_base):
+    """查询组合的稳定标识：地区|关键字|类别|行业（不含页码与时间戳）"""
+    return '|'.join(str(search_params_base.get(field, '') or '')
+                    for field in ('areaCode', 'jobName', 'categoryCode', 'industrySectors'))
+
+
+def province_prefixes(cities):
+    """城市编码的省份前缀（多进程分片的最小单位），排序后返回"""
+    return sorted({city.get('code', "")[:2] for city in cities})
+
+
+def shard_prefixes(cities, shard_index, shard_count):
+    """第 shard_index 个分片（共 shard_count 个）负责的省份前缀"""
+    return set(province_prefixes(cities)[shard_index::shard_count])
+
+
+class QueryPlanner:
+    """根据目标维度生成探测树，并负责查询计划的持久化"""
+
+    def __init__(self, cities, keywords, categories, industries,
+                 province_names=None, split_dimensions=SPLITTABLE_DIMENSIONS, max_results=1000):
+        self.keywords = keywords or [""]
+        self.categories = categories
+        self.industries = industries
+        self.max_results = max_results
+        self.split_dimensions = [d for d in split_dimensions if d in SPLITTABLE_DIMENSIONS]
+        province_names = province_names or {}
+
+        # 城市维度：省级编码作为粗粒度根，其余城市按省份前缀归组
+        self.provinces = OrderedDict()
+        self.cities_by_province = {}
+        for city in cities:
+            code = city.get('code', "")
+            prefix = code[:2]
+            if prefix not in self.provinces:
+                self.provinces[prefix] = {"code": prefix, "name": province_names.get(prefix, city.get('name', prefix))}
+            if len(code) > 2:
+                self.cities_by_province.setdefault(prefix, []).append(city)
+        self.cities = cities
+
+    def fingerprint(self):
+        """目标维度与拆分参数的指纹，用于判断已保存的计划能否复用"""
+        payload = json.dumps({
+            'cities': [c.get('code', "") for c in self.cities],
+            'keywords': self.keywords,
+            'categories': [c.get('code', "") for c in self.categories],
+            'industries': [i.get('code', "") for i in self.industries],
+            'split_dimensions': self.split_dimensions,
+            'max_results': self.max_results,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def root_nodes(self):
+        """粗粒度根节点：可拆分维度取“不限”（城市取省份），其余维度照常枚举"""
+        city_roots = list(self.provinces.values()) if 'city' in self.split_dimensions else self.cities
+        industry_roots = [ANY_INDUSTRY] if 'industry' in self.split_dimensions else self.industries
+
+        for city in city_roots:
+            for keyword in self.keywords:
+                for category in self.categories:
+                    for industry in industry_roots:
+                        yield {
+                            'city': city, 'keyword': keyword,
+                            'category': category, 'industry': industry,
+                            'open_dimensions': list(self.split_dimensions),
+                        }
+
+    def needs_split(self, total_results):
+        return total_results is not None and total_results > self.max_results
+
+    def split(self, node):
+        """按拆分顺序展开第一个仍可细分的维度，无法再拆分时返回空列表"""
+        for dimension in node['open_dimensions']:
+            if dimension == 'city':
+                children = self.cities_by_province.get(node['city'].get('code', ""), [])
+            else:
+                children = [i for i in self.industries if i.get('code')]
+            if not children:
+                continue
+            remaining = [d for d in node['open_dimensions'] if d != dimension]
+            return [dict(node, **{dimension: child, 'open_dimensions': remaining}) for child in children]
+        return []
+
+    def load_plan(self, plan_file=DEFAULT_PLAN_FILE, max_age_hours=0):
+        """读取已保存的查询计划；指纹不符或过期时返回None"""
+        if not os.path.exists(plan_file):
+            return None
+        try:
+            with open(plan_file, 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+        if plan.get('fingerprint') != self.fingerprint():
+            return None
+        if max_age_hours and time.time() - plan.get('created_at', 0) > max_age_hours * 3600:
+            return None
+        return plan.get('leaves', [])
+
+    def save_plan(self, leaves, plan_file=DEFAULT_PLAN_FILE):
+        """原子写入查询计划（先写临时文件再替换）"""
+        os.makedirs(os.path.dirname(plan_file), exist_ok=True)
+        plan = {
+            'fingerprint': self.fingerprint(),
+            'created_at': int(time.time()),
+            'max_results': self.max_results,
+            'leaves': leaves,
+        }
+        tmp_file = f"{plan_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, plan_file)
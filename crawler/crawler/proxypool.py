@@ -0,0 +1,185 @@
+# crawler/crawler/proxypool.py
+# 代理池数据结构：按 ip:port 索引，记录EWMA延迟与成功率，按“成功率/延迟”加权抽样
+import random
+import time
+
+
+class _WeightTree:
+    """按槽位保存权重的树状数组（Fenwick树）：单点更新、求总和、按累积权重定位槽位均为 O(log n)"""
+
+    def __init__(self):
+        self.weights = []
+        self.tree = [0.0]  # 下标从1开始
+        self.updates = 0
+        self.positive = 0  # 权重大于0的槽位数（增量更新有浮点残差，不能靠总和判断是否全为0）
+
+    def __len__(self):
+        return len(self.weights)
+
+    def _prefix(self, i):
+        total = 0.0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def append(self, weight):
+        self.weights.append(weight)
+        self.positive += weight > 0
+        i = len(self.weights)
+        self.tree.append(weight + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+
+    def pop(self):
+        """移除最后一个槽位（它不在其他槽位的区间和里）"""
+        self.positive -= self.weights.pop() > 0
+        self.tree.pop()
+
+    def update(self, slot, weight):
+        delta = weight - self.weights[slot]
+        self.positive += (weight > 0) - (self.weights[slot] > 0)
+        self.weights[slot] = weight
+        i = slot + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+        # 增量更新会累积浮点误差，更新次数超过槽位数时按原始权重重建（均摊 O(1)）
+        self.updates += 1
+        if self.updates >= max(len(self.weights), 64):
+            self.rebuild()
+
+    def rebuild(self):
+        n = len(self.weights)
+        self.tree = [0.0] + self.weights
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                self.tree[j] += self.tree[i]
+        self.updates = 0
+
+    def total(self):
+        return self._prefix(len(self.weights))
+
+    def find(self, target):
+        """累积权重首次超过 target 的槽位"""
+        n = len(self.weights)
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            if pos + step <= n and self.tree[pos + step] <= target:
+                pos += step
+                target -= self.tree[pos]
+            step >>= 1
+        return min(pos, n - 1)
+
+
+class ProxyPool:
+    """以字典保存代理状态（O(1)查找/移除），选取时快代理、健康代理被选中的概率更高。
+    各代理的权重存放在树状数组中，登记结果只更新该代理的权重，抽样不需要重建累积权重
+    """
+
+    def __init__(self, ewma_alpha=0.3, min_score=0.1, max_consecutive_fails=3, default_latency=1.0):
+        self.ewma_alpha = ewma_alpha
+        self.min_score = min_score
+        self.max_consecutive_fails = max_consecutive_fails
+        self.default_latency = default_latency
+        self.proxies = {}  # ip_port -> 代理状态
+        self._slots = {}  # ip_port -> 权重槽位
+        self._slot_proxies = []  # 槽位 -> ip_port
+        self._weights = _WeightTree()
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def __contains__(self, ip_port):
+        return ip_port in self.proxies
+
+    def get(self, ip_port):
+        return self.proxies.get(ip_port)
+
+    def add(self, ip_port, latency=None):
+        """加入新代理（验证时测得的延迟作为EWMA初值）"""
+        if ip_port in self.proxies:
+            return False
+        proxy = self.proxies[ip_port] = {
+            "ip_port": ip_port, "score": 1.0, "last_used": 0,
+            "fail_count": 0, "success_count": 0, "consecutive_fails": 0,
+            "ewma_latency": latency if latency is not None else self.default_latency,
+            "success_rate": 1.0,
+        }
+        self._slots[ip_port] = len(self._slot_proxies)
+        self._slot_proxies.append(ip_port)
+        self._weights.append(self._weight(proxy))
+        return True
+
+    def remove(self, ip_port):
+        proxy = self.proxies.pop(ip_port, None)
+        if proxy is not None:
+            self._release_slot(ip_port)
+        return proxy
+
+    def _release_slot(self, ip_port):
+        # 最后一个槽位的代理移到空出的槽位，保持槽位连续
+        slot = self._slots.pop(ip_port)
+        last = len(self._slot_proxies) - 1
+        if slot != last:
+            moved = self._slot_proxies[last]
+            self._slot_proxies[slot] = moved
+            self._slots[moved] = slot
+            self._weights.update(slot, self._weights.weights[last])
+        self._slot_proxies.pop()
+        self._weights.pop()
+
+    def _weight(self, proxy):
+        # 延迟设下限，避免极小延迟把权重放大到独占
+        return max(proxy['success_rate'], 0.01) * proxy['score'] / max(proxy['ewma_latency'], 0.05)
+
+    def select(self):
+        """按权重抽样一个代理；池为空时返回None"""
+        if not self.proxies:
+            return None
+        if self._weights.positive:
+            slot = self._weights.find(random.random() * self._weights.total())
+        else:
+            slot = random.randrange(len(self._slot_proxies))  # 权重全为0（min_score=0 时分数可降到0）时均匀抽样
+        proxy = self.proxies[self._slot_proxies[slot]]
+        proxy['last_used'] = time.time()
+        return proxy
+
+    def record(self, ip_port, success, latency=None):
+        """登记一次请求结果；返回被移除的代理（未移除时为None）"""
+        proxy = self.proxies.get(ip_port)
+        if proxy is None:
+            return None
+
+        alpha = self.ewma_alpha
+        proxy['success_rate'] = alpha * (1.0 if success else 0.0) + (1 - alpha) * proxy['success_rate']
+        if latency is not None:
+            proxy['ewma_latency'] = alpha * latency + (1 - alpha) * proxy['ewma_latency']
+        if success:
+            proxy['score'] = min(1.0, proxy['score'] + 0.05)
+            proxy['success_count'] += 1
+            proxy['consecutive_fails'] = 0
+        else:
+            proxy['score'] = max(0.0, proxy['score'] - 0.2)
+            proxy['fail_count'] += 1
+            proxy['consecutive_fails'] += 1
+
+        # 低分/连续失败代理移除
+        if proxy['score'] < self.min_score or proxy['consecutive_fails'] >= self.max_consecutive_fails:
+            self._release_slot(ip_port)
+            return self.proxies.pop(ip_port)
+        self._weights.update(self._slots[ip_port], self._weight(proxy))
+        return None
+
+    def snapshot(self, top_n=5):
+        """代理池概况（写入爬虫统计）"""
+        proxies = list(self.proxies.values())
+        if not proxies:
+            return {'size': 0, 'avg_latency': None, 'avg_success_rate': None, 'top': []}
+        ranked = sorted(proxies, key=self._weight, reverse=True)[:top_n]
+        return {
+            'size': len(proxies),
+            'avg_latency': round(sum(p['ewma_latency'] for p in proxies) / len(proxies), 3),
+            'avg_success_rate': round(sum(p['success_rate'] for p in proxies) / len(proxies), 3),
+            'top': [f"{p['ip_port']}（延迟{p['ewma_latency']:.2f}s，成功率{p['success_rate']:.0%}）" for p in ranked],
+        }
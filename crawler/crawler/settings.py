@@ -26,10 +26,38 @@ DEFAULT_REQUEST_HEADERS = {
 }
 
 # --- 数据管道配置 ---
-# 仅启用JobPipeline处理爬取到的JobItem数据（JSON存储）
+# 1. JobDedupPipeline：跨运行去重（丢弃未变化的重复岗位）
+# 2. JobDetailPipeline：为新增/变化的岗位请求详情页补全 description（JOBS_DETAIL_ENABLED）
+# 3. JsonlShardPipeline：流式写入JSONL分片（data/jobs_shards/，清单 manifest.json）
 ITEM_PIPELINES = {
-   'crawler.pipelines.JobPipeline': 500
+   'crawler.pipelines.JobDedupPipeline': 300,
+   'crawler.pipelines.JobDetailPipeline': 400,
+   'crawler.pipelines.JsonlShardPipeline': 500,
+   'crawler.pipelines.MySQLJobPipeline': 600
 }
+# 重复岗位很多，丢弃日志降为DEBUG
+DEFAULT_DROPITEM_LOG_LEVEL = 'DEBUG'
+
+# --- 去重配置 ---
+DEDUP_ENABLED = True
+DEDUP_DB = ''                       # 去重索引SQLite文件（留空为 data/dedup.sqlite，布隆过滤器保存在同名 .bloom 文件）
+DEDUP_BLOOM_CAPACITY = 2_000_000    # 布隆过滤器预计容量（岗位数）
+DEDUP_BLOOM_ERROR_RATE = 0.001      # 布隆过滤器误判率
+
+# --- 岗位详情补全配置（只请求新增/内容变化岗位的详情页） ---
+JOBS_DETAIL_ENABLED = False                 # 默认关闭，开启后 description 字段可用于技能提取
+JOBS_DETAIL_URL = 'https://24365.ncss.cn/student/jobs/{job_id}/detail.html'  # 详情页地址模板
+JOBS_DETAIL_DESCRIPTION_SELECTORS = ['.details', '.job-detail', '.mainContent']  # 描述区域CSS选择器，依次尝试
+JOBS_DETAIL_CONCURRENCY = 4                 # 详情请求的并发上限（独立于列表页并发）
+JOBS_DETAIL_CACHE_DB = ''                   # 详情缓存SQLite文件（留空为 data/job_details.sqlite），按内容哈希寻址
+
+# --- 分片输出配置 ---
+JOBS_OUTPUT_DIR = ''                        # 分片目录（留空为 data/jobs_shards）
+JOBS_OUTPUT_COMPRESSION = ''                # 压缩格式：''、'gzip' 或 'zstd'（需安装zstandard）
+JOBS_OUTPUT_BATCH_SIZE = 500                # 每批写入的条数
+JOBS_OUTPUT_FLUSH_SECONDS = 5               # 缓冲区最长停留时间（秒）
+JOBS_OUTPUT_ROTATE_BYTES = 64 * 1024 * 1024 # 单个分片达到该大小（未压缩字节）后轮转
+JOBS_OUTPUT_ROTATE_SECONDS = 600            # 单个分片最长写入时间（秒）
 
 # --- 下载中间件配置（顺序影响执行逻辑） ---
 DOWNLOADER_MIDDLEWARES = {
@@ -56,19 +84,50 @@ PROXY_REQUEST_TIMEOUT = 10          # 代理请求超时时间
 PROXY_POOL_MAX_REQUEST_RETRIES = 3  # 单请求最大代理重试次数
 PROXY_FETCH_COOLDOWN_SECONDS = 180  # 代理API请求冷却时间
 PROXY_MIN_POOL_SIZE_FETCH = 5       # 代理池最小数量阈值（低于则拉新）
+PROXY_REFRESH_INTERVAL = 30         # 后台补充线程巡检间隔（秒）
+PROXY_VALIDATE_URL = "https://24365.ncss.cn/"  # 候选代理验证地址（留空则只测TCP连通）
+PROXY_VALIDATE_TIMEOUT = 5          # 单个候选代理验证超时
+PROXY_VALIDATE_WORKERS = 20         # 并发验证线程数
+PROXY_LATENCY_EWMA_ALPHA = 0.3      # 代理延迟/成功率EWMA平滑系数（越大越看重最近请求）
+PROXY_PER_SLOT = True               # 每个代理使用独立下载槽位（配合槽位限速扩展）
 
 # --- 并发与延迟配置（反爬关键） ---
 DOWNLOAD_DELAY = 1                  # 同域名请求基础延迟
 CONCURRENT_REQUESTS = 16            # 全局最大并发请求数
 CONCURRENT_REQUESTS_PER_DOMAIN = 4  # 单域名最大并发请求数
 
-# --- 自动限速配置 ---
-AUTOTHROTTLE_ENABLED = True
+# --- 自动限速配置（已由下方槽位限速扩展替代） ---
+AUTOTHROTTLE_ENABLED = False
 AUTOTHROTTLE_START_DELAY = DOWNLOAD_DELAY
 AUTOTHROTTLE_MAX_DELAY = 5
 AUTOTHROTTLE_TARGET_CONCURRENCY = 2
 AUTOTHROTTLE_DEBUG = False
 
+# --- 槽位限速扩展（直连与每个代理分别做AIMD调整） ---
+EXTENSIONS = {
+    'crawler.extensions.AdaptiveSlotThrottle': 500,
+    'crawler.extensions.QueryTelemetry': 510,
+    'crawler.extensions.StatsFileExporter': 520,
+}
+SLOT_THROTTLE_ENABLED = True
+SLOT_THROTTLE_WINDOW = 20               # 每个槽位累计多少个结果评估一次
+SLOT_THROTTLE_TARGET_LATENCY = 2.0      # 平均延迟超过该值（秒）则降速
+SLOT_THROTTLE_MAX_ERROR_RATE = 0.1      # 错误率（异常/429/RETRY_HTTP_CODES）超过该值则降速
+SLOT_THROTTLE_MIN_CONCURRENCY = 1
+SLOT_THROTTLE_MAX_CONCURRENCY = 8       # 单槽位并发上限（全局仍受CONCURRENT_REQUESTS限制）
+SLOT_THROTTLE_MIN_DELAY = 0.0
+SLOT_THROTTLE_MAX_DELAY = 10.0
+SLOT_THROTTLE_DELAY_STEP = 0.1          # 提速时每次减少的延迟（秒）
+SLOT_THROTTLE_DECREASE_FACTOR = 0.5     # 降速时并发乘以该系数
+
+# --- 查询组合统计（JSON报告 + Prometheus文本格式） ---
+TELEMETRY_ENABLED = True
+TELEMETRY_DIR = ''                      # 输出目录（留空为 data/telemetry）
+TELEMETRY_SNAPSHOT_INTERVAL = 60        # 运行中快照间隔（秒），0表示只在结束时写出
+
+# --- 统计导出（run_shards.py 为每个分片进程设置） ---
+JOBS_STATS_FILE = ''                    # 结束时写出Scrapy统计的JSON文件（留空不写）
+
 # --- 内置重试中间件配置 ---
 RETRY_ENABLED = True
 RETRY_TIMES = 2                     # 基础重试次数（不含代理重试）
@@ -90,8 +149,17 @@ RETRY_EXCEPTIONS = [
 # --- Cookie配置 ---
 COOKIES_ENABLED = False  # 无状态API场景禁用Cookie
 
-# --- HTTP缓存配置（动态数据禁用） ---
+# --- HTTP缓存配置（动态数据默认禁用；开发调试、解析器修改、压测时开启） ---
+# 录制：scrapy crawl jobs -s HTTPCACHE_ENABLED=1
+# 回放（完全离线，未缓存的请求直接忽略）：
+#   scrapy crawl jobs -s HTTPCACHE_ENABLED=1 -s JOBS_HTTPCACHE_REPLAY=1 -s HTTPCACHE_IGNORE_MISSING=1 -s PROXY_POOL_ENABLED=0
 HTTPCACHE_ENABLED = False
+HTTPCACHE_STORAGE = 'crawler.httpcache.JobsApiCacheStorage'   # 缓存key忽略 "_" 时间戳参数
+HTTPCACHE_POLICY = 'crawler.httpcache.JobsApiCachePolicy'     # 只缓存 flag=true 的成功响应
+HTTPCACHE_DIR = 'httpcache'               # 相对路径位于 crawler/.scrapy/ 下
+HTTPCACHE_GZIP = True                   # 压缩存储
+HTTPCACHE_EXPIRATION_SECS = 6 * 3600    # 缓存有效期（秒）
+JOBS_HTTPCACHE_REPLAY = False           # 回放模式：缓存永不过期
 
 # --- 日志配置 ---
 LOG_LEVEL = 'INFO'
@@ -99,4 +167,43 @@ LOG_FORMAT = '%(asctime)s [%(name)s] %(levelname)s: %(message)s'
 LOG_DATEFORMAT = '%Y-%m-%d %H:%M:%S'
 
 # --- 全局下载超时 ---
-DOWNLOAD_TIMEOUT = 10
\ No newline at end of file
+DOWNLOAD_TIMEOUT = 10
+
+# --- 分页调度配置 ---
+JOBS_PAGINATION_FANOUT = True       # 第一页返回总页数后一次性调度剩余页（False则逐页串行）
+JOBS_FANOUT_PRIORITY = 0            # 扇出页的请求优先级（调高则优先抓完已开启的组合）
+JOBS_MAX_PAGES_PER_QUERY = 0        # 单个查询组合最多抓取的页数（0表示不限）
+
+# --- 按历史产出排序（-a time_budget / -a request_budget 时自动开启） ---
+JOBS_YIELD_PRIORITY = False         # 按 data/telemetry 中历史每页新岗位数设置请求优先级
+JOBS_YIELD_HISTORY_RUNS = 5         # 参考最近几次运行的统计
+JOBS_YIELD_PRIORITY_RANGE = 100     # 产出最高的组合优先级加成（无历史数据取一半）
+JOBS_YIELD_PAGE_DECAY = 5           # 每往后一页优先级降低的值
+
+# --- 查询规划配置 ---
+JOBS_QUERY_PLANNER = False                       # 启用后先粗粒度探测结果数，再按需拆分（也可用 -a use_planner=1）
+JOBS_PLANNER_SPLIT_DIMENSIONS = ['industry', 'city']  # 从“不限”开始、按此顺序拆分的维度（类别决定job_catory，始终枚举）
+JOBS_PLANNER_MAX_RESULTS = 1000                  # 单个查询可完整翻完的结果数上限，超过则拆分
+JOBS_PLANNER_PLAN_FILE = ''                      # 查询计划文件（留空为 data/query_plan.json）
+JOBS_PLANNER_PLAN_MAX_AGE_HOURS = 168            # 计划有效期（小时），0表示永久复用
+
+# --- 增量爬取配置（-a run_type=incremental） ---
+JOBS_WATERMARK_DB = ''              # 水位线SQLite文件（留空为 data/watermarks.sqlite）
+JOBS_WATERMARK_SEEN_LIMIT = 500     # 每个查询组合保留的近期 jobId 数量
+
+# --- 断点续爬配置 ---
+JOBS_FRONTIER_ENABLED = True        # 记录每个查询组合的已抓页，中断后重启只补抓未完成部分
+JOBS_FRONTIER_DB = ''               # 断点SQLite文件（留空为 data/frontier.sqlite）
+JOBS_FRONTIER_COMMIT_SECONDS = 5    # 进度写入间隔（秒）
+
+# MySQL 原始岗位表批量写入（表结构见项目根目录 schema.sql 中的 raw_jobs）
+MYSQL_PIPELINE_ENABLED = False   # 默认关闭，开启后爬到的岗位数秒内即可在 jobviz 中查询
+MYSQL_HOST = '127.0.0.1'
+MYSQL_PORT = 3306
+MYSQL_USER = 'root'
+MYSQL_PASSWORD = '123456'
+MYSQL_DATABASE = 'jobviz'
+MYSQL_JOBS_TABLE = 'raw_jobs'
+MYSQL_JOBS_BATCH_SIZE = 500        # 每批写入条数
+MYSQL_JOBS_FLUSH_INTERVAL = 2.0    # 不足一批时最长等待秒数
+MYSQL_JOBS_QUEUE_SIZE = 5000       # 待写入队列上限，写满后管道暂停产出（背压）
@@ -0,0 +1,160 @@
+# crawler/crawler/snapshot_diff.py
+# 两次爬取结果的差异：外部排序（分块排序写临时文件 + 多路归并）后按 job_id 归并对比，
+# 内存只与分块大小有关，不会同时载入两份数据。输出新增/下线/变化三个JSONL文件和汇总统计
+import heapq
+import json
+import os
+import tempfile
+from collections import Counter
+from itertools import groupby
+
+from crawler.dedup import PROVENANCE_FIELDS, record_content_hash
+from crawler.feeds import PART_SUFFIX, SHARD_SUFFIXES, iter_job_records, iter_shard_records, open_shard
+
+DEFAULT_CHUNK_RECORDS = 50_000
+ADDED, REMOVED, CHANGED = 'added', 'removed', 'changed'
+SUMMARY_NAME = 'summary.json'
+
+
+def iter_snapshot_records(path, run_id=None):
+    """读取一次爬取的输出：JSONL分片目录（可按 run_id 只取一次运行），或单个 JSON数组/JSONL 文件"""
+    if run_id is not None:
+        return iter_shard_records(path, run_id)
+    return iter_job_records(path)
+
+
+class SortedSnapshot:
+    """把记录按 job_id 外部排序，迭代得到 (job_id, 内容哈希, 记录)；同一 job_id 保留最后出现的一条"""
+
+    def __init__(self, records, tmp_dir, chunk_records=DEFAULT_CHUNK_RECORDS):
+        self.tmp_dir = tmp_dir
+        self.chunk_records = chunk_records
+        self.run_paths = []
+        self.total = 0
+        self.missing_id = 0
+        self._spill(records)
+
+    def _spill(self, records):
+        chunk = []
+        for record in records:
+            job_id = record.get('job_id')
+            if not job_id:
+                self.missing_id += 1
+                continue
+            self.total += 1
+            chunk.append((str(job_id), record))
+            if len(chunk) >= self.chunk_records:
+                self._write_run(chunk)
+                chunk = []
+        if chunk:
+            self._write_run(chunk)
+
+    def _write_run(self, chunk):
+        # 稳定排序：同一 job_id 保持读入顺序，归并时各分块也按写入顺序排列，因此“最后一条”与读入顺序一致
+        chunk.sort(key=lambda entry: entry[0])
+        path = os.path.join(self.tmp_dir, f"run-{id(self):x}-{len(self.run_paths):05d}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for job_id, record in chunk:
+                f.write(json.dumps([job_id, record_content_hash(record), record], ensure_ascii=False) + '\n')
+        self.run_paths.append(path)
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __iter__(self):
+        merged = heapq.merge(*(self._read_run(path) for path in self.run_paths), key=lambda entry: entry[0])
+        for job_id, entries in groupby(merged, key=lambda entry: entry[0]):
+            last = None
+            for last in entries:
+                pass
+            yield last
+
+
+def changed_fields(old_record, new_record):
+    """内容字段中取值不同的字段名（溯源字段不参与比较）"""
+    fields = (set(old_record) | set(new_record)) - PROVENANCE_FIELDS
+    return sorted(field for field in fields if old_record.get(field) != new_record.get(field))
+
+
+def merge_join(old_sorted, new_sorted):
+    """按 job_id 归并两个有序序列，产出 (类型, 旧记录, 新记录)，类型为 added/removed/changed/None（未变化）"""
+    old_iter, new_iter = iter(old_sorted), iter(new_sorted)
+    old_entry, new_entry = next(old_iter, None), next(new_iter, None)
+    while old_entry is not None or new_entry is not None:
+        if new_entry is None or (old_entry is not None and old_entry[0] < new_entry[0]):
+            yield REMOVED, old_entry[2], None
+            old_entry = next(old_iter, None)
+        elif old_entry is None or new_entry[0] < old_entry[0]:
+            yield ADDED, None, new_entry[2]
+            new_entry = next(new_iter, None)
+        else:
+            yield (CHANGED if old_entry[1] != new_entry[1] else None), old_entry[2], new_entry[2]
+            old_entry, new_entry = next(old_iter, None), next(new_iter, None)
+
+
+def diff_snapshots(old_records, new_records, output_dir, chunk_records=DEFAULT_CHUNK_RECORDS,
+                   compression='', tmp_dir=None):
+    """对比两次爬取结果，写出 added/removed/changed 三个JSONL文件与 summary.json，返回汇总统计。
+
+    added/changed 为新一次的完整记录（可直接作为增量导入的输入），changed 额外带 changed_fields；
+    removed 为旧一次的记录。每条记录的 change_type 标明差异类型。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {kind: os.path.join(output_dir, kind + SHARD_SUFFIXES[compression]) for kind in (ADDED, REMOVED, CHANGED)}
+    counts = Counter()
+    field_counts = Counter()
+
+    with tempfile.TemporaryDirectory(prefix='snapshot-diff-', dir=tmp_dir) as sort_dir:
+        old_sorted = SortedSnapshot(old_records, sort_dir, chunk_records)
+        new_sorted = SortedSnapshot(new_records, sort_dir, chunk_records)
+
+        files = {kind: open_shard(path + PART_SUFFIX, 'w', compression) for kind, path in paths.items()}
+        try:
+            for kind, old_record, new_record in merge_join(old_sorted, new_sorted):
+                if old_record is not None:
+                    counts['old_unique'] += 1
+                if new_record is not None:
+                    counts['new_unique'] += 1
+                if kind is None:
+                    counts['unchanged'] += 1
+                    continue
+                counts[kind] += 1
+                if kind == CHANGED:
+                    fields = changed_fields(old_record, new_record)
+                    field_counts.update(fields)
+                    record = dict(new_record, change_type=CHANGED, changed_fields=fields)
+                else:
+                    record = dict(old_record if kind == REMOVED else new_record, change_type=kind)
+                files[kind].write(json.dumps(record, ensure_ascii=False) + '\n')
+        finally:
+            for f in files.values():
+                f.close()
+    # 全部写完才改名，下游不会读到半个差异文件
+    for path in paths.values():
+        os.replace(path + PART_SUFFIX, path)
+
+    new_unique = counts['new_unique']
+    summary = {
+        'old_records': old_sorted.total,
+        'new_records': new_sorted.total,
+        'old_unique': counts['old_unique'],
+        'new_unique': new_unique,
+        'old_duplicates': old_sorted.total - counts['old_unique'],
+        'new_duplicates': new_sorted.total - new_unique,
+        'missing_job_id': old_sorted.missing_id + new_sorted.missing_id,
+        ADDED: counts[ADDED],
+        REMOVED: counts[REMOVED],
+        CHANGED: counts[CHANGED],
+        'unchanged': counts['unchanged'],
+        # 变动率：新增+下线+变化 相对两次并集的比例
+        'churn_rate': round((counts[ADDED] + counts[REMOVED] + counts[CHANGED])
+                            / max(1, counts[ADDED] + counts[REMOVED] + counts[CHANGED] + counts['unchanged']), 4),
+        'changed_fields': dict(field_counts.most_common()),
+        'files': {kind: os.path.basename(path) for kind, path in paths.items()},
+    }
+    with open(os.path.join(output_dir, SUMMARY_NAME), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
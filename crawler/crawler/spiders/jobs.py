@@ -1,10 +1,19 @@
 # crawler/crawler/spiders/jobs.py
 import scrapy
+import hashlib
 import json
 import os
 import time
-from urllib.parse import urlencode
+from collections import deque
+from functools import partial
+from urllib.parse import urlencode, urlsplit
+from scrapy import signals
+from crawler.extensions import (page_parsed, output_persisted, output_barrier_enabled, load_query_yields,
+                                DEFAULT_TELEMETRY_DIR)
+from crawler.frontier import FrontierStore, DEFAULT_FRONTIER_DB
 from crawler.items import JobItem
+from crawler.planner import QueryPlanner, DEFAULT_PLAN_FILE, make_query_key, shard_prefixes
+from crawler.watermarks import WatermarkStore, DEFAULT_WATERMARK_DB
 
 class JobsSpider(scrapy.Spider):
     name = 'jobs'
@@ -15,11 +24,25 @@ class JobsSpider(scrapy.Spider):
     DEFAULT_SOURCES_NAME = ""
     DEFAULT_SOURCES_TYPE = ""
     DEFAULT_LIMIT = 20
+    PROBE_PRIORITY = 1  # 规划探测请求优先于普通列表页
+
+    # 查询组合上下文（翻页时沿用），不含代理/重试等下载层的meta
+    QUERY_META_KEYS = (
+        'search_params_base', 'search_area_name', 'search_province_name',
+        'request_category_code', 'request_category_name',
+        'request_industry_code', 'request_industry_name',
+    )
 
     def __init__(self, target_cities_json=None, target_keywords_str=None,
                  target_categories_json=None, target_industries_json=None,
-                 run_type="default", *args, **kwargs):
+                 run_type="default", use_planner=None, shard_index=None, shard_count=None,
+                 base_url=None, *args, **kwargs):
         super(JobsSpider, self).__init__(*args, **kwargs)
+
+        # 接口地址可覆盖（-a base_url=...），用于对本地模拟接口压测；allowed_domains 随之调整
+        if base_url:
+            self.base_url = base_url
+            self.allowed_domains = [urlsplit(base_url).hostname]
         
         self.province_code_to_name_map = {}
         options_data = {} # 存储target_options.json中的数据
@@ -54,6 +77,20 @@ class JobsSpider(scrapy.Spider):
             options_data = {}
 
         self.run_type = run_type
+        # 增量模式：按查询组合的水位线提前结束翻页（需逐页串行）
+        self.incremental = run_type == "incremental"
+        self.watermark_store = None
+        self._watermarks = {}
+        self.frontier = None
+        # 启用分片输出时，断点进度与水位线等本页岗位写入分片后再提交
+        self.persist_barrier = False
+        self._page_pending_items = {}  # 列表页URL -> 尚未离开管道的岗位数
+        self._persist_queue = deque()  # (列表页URL或None, 提交动作)，按解析顺序执行
+        self.query_yields = None  # 查询组合 -> 历史每页新岗位数（启用按产出排序时加载）
+        # None 表示沿用 JOBS_QUERY_PLANNER 配置
+        self.use_planner = None if use_planner is None else str(use_planner).lower() in ('1', 'true', 'yes')
+        # 来自 target_options.json 默认值的维度（完整枚举，规划器可从“不限”开始拆分）
+        self.default_dimensions = set()
 
         # 工作地点
         if target_cities_json:
@@ -61,11 +98,24 @@ class JobsSpider(scrapy.Spider):
             except json.JSONDecodeError:
                 self.logger.warning("Failed to parse target_cities_json. Using default from target_options.json or fallback.")
                 self.TARGET_CITIES = options_data.get("citys", [])
+                self.default_dimensions.add('city')
         else:
             self.TARGET_CITIES = options_data.get("citys", [])
+            self.default_dimensions.add('city')
         if not self.TARGET_CITIES:
             self.TARGET_CITIES = [{"code": "", "name": "全国"}]
 
+        # 多进程分片（run_shards.py）：按城市编码的省份前缀把查询空间分给各工作进程
+        self.shard_index = int(shard_index or 0)
+        self.shard_count = max(1, int(shard_count or 1))
+        if self.shard_count > 1:
+            owned_prefixes = shard_prefixes(self.TARGET_CITIES, self.shard_index, self.shard_count)
+            self.TARGET_CITIES = [c for c in self.TARGET_CITIES if c.get('code', "")[:2] in owned_prefixes]
+            if owned_prefixes:
+                self.logger.info(f"分片 {self.shard_index + 1}/{self.shard_count}：负责省份前缀 {sorted(owned_prefixes)}")
+            else:
+                self.logger.warning(f"分片 {self.shard_index + 1}/{self.shard_count}：分片数多于省份前缀数，本分片没有查询")
+
 
         # 关键词（默认不筛选）
         if target_keywords_str:
@@ -94,8 +144,10 @@ class JobsSpider(scrapy.Spider):
             except json.JSONDecodeError:
                 self.logger.warning("Failed to parse target_industries_json. Using default from target_options.json or fallback.")
                 self.TARGET_INDUSTRY_CODES = options_data.get("industriesNew", [])
+                self.default_dimensions.add('industry')
         else:
             self.TARGET_INDUSTRY_CODES = options_data.get("industriesNew", [])
+            self.default_dimensions.add('industry')
         
         
         if not self.TARGET_INDUSTRY_CODES:
@@ -103,80 +155,322 @@ class JobsSpider(scrapy.Spider):
 
 
         self.logger.info(f"Spider initialized with run_type: {self.run_type}")
+        if getattr(self, 'time_budget', None) or getattr(self, 'request_budget', None):
+            self.logger.info(f"爬取预算：时间 {getattr(self, 'time_budget', None) or '不限'} 秒，"
+                             f"请求 {getattr(self, 'request_budget', None) or '不限'} 个")
         self.logger.info(f"Targeting {len(self.TARGET_CITIES)} cities, {len(self.TARGET_KEYWORDS)} keywords, "
                          f"{len(self.TARGET_CATEGORY_CODES)} categories, {len(self.TARGET_INDUSTRY_CODES)} industries.")
         if not options_data:
              self.logger.warning("target_options.json was not loaded or was empty. Defaults may be minimal.")
 
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        # 时间/请求预算（-a time_budget=秒数 -a request_budget=个数）交给内置CloseSpider扩展执行，
+        # 需在配置冻结前设置；有预算时按历史产出排序，让高产组合与靠前页面先抓
+        time_budget = kwargs.get('time_budget')
+        request_budget = kwargs.get('request_budget')
+        if time_budget:
+            crawler.settings.set('CLOSESPIDER_TIMEOUT', float(time_budget), priority='spider')
+        if request_budget:
+            crawler.settings.set('CLOSESPIDER_PAGECOUNT', int(request_budget), priority='spider')
+        if time_budget or request_budget:
+            crawler.settings.set('JOBS_YIELD_PRIORITY', True, priority='spider')
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if output_barrier_enabled(crawler.settings):
+            spider.persist_barrier = True
+            for signal in (signals.item_scraped, signals.item_dropped, signals.item_error):
+                crawler.signals.connect(spider._item_finished, signal=signal)
+            crawler.signals.connect(spider._output_persisted, signal=output_persisted)
+        return spider
+
+    def _item_finished(self, item):
+        page_url = item.get('source_url')
+        if page_url in self._page_pending_items:
+            self._page_pending_items[page_url] -= 1
+            if not self._page_pending_items[page_url]:
+                del self._page_pending_items[page_url]
+
+    def _after_output_persisted(self, action, page_url=None):
+        """本页岗位都已离开管道并写入分片后再执行 action；page_url 为 None 表示本页没有产出岗位"""
+        if not self.persist_barrier or (page_url is None and not self._persist_queue):
+            action()
+            return
+        self._persist_queue.append((page_url, action))
+
+    def _output_persisted(self):
+        # 按解析顺序执行，某页的岗位尚未全部离开管道时，其后的提交一起等待（mark_done 不会越过未落盘的页）
+        while self._persist_queue:
+            page_url, action = self._persist_queue[0]
+            if page_url is not None and self._page_pending_items.get(page_url, 0) > 0:
+                break
+            self._persist_queue.popleft()
+            action()
+
     def start_requests(self):
         if not self.TARGET_CITIES: 
             self.logger.error("TARGET_CITIES 为空。爬虫将不发送请求。")
             return
+
+        if self.incremental:
+            self.watermark_store = WatermarkStore(
+                self.settings.get('JOBS_WATERMARK_DB') or DEFAULT_WATERMARK_DB,
+                seen_limit=self.settings.getint('JOBS_WATERMARK_SEEN_LIMIT', 500))
+            self.logger.info(f"增量模式，水位线存储：{self.watermark_store.db_path}")
+
+        use_planner = self.use_planner
+        if use_planner is None:
+            use_planner = self.settings.getbool('JOBS_QUERY_PLANNER', False)
+
+        if self.settings.getbool('JOBS_YIELD_PRIORITY', False):
+            self.query_yields = load_query_yields(self.settings.get('TELEMETRY_DIR') or DEFAULT_TELEMETRY_DIR,
+                                                  self.settings.getint('JOBS_YIELD_HISTORY_RUNS', 5))
+            self.max_query_yield = max(self.query_yields.values(), default=0)
+            self.logger.info(f"按历史产出排序：{len(self.query_yields)} 个查询组合有历史数据，"
+                             f"最高每页 {self.max_query_yield:.1f} 个新岗位")
+
+        if self.settings.getbool('JOBS_FRONTIER_ENABLED', False):
+            self.frontier = FrontierStore(
+                self.settings.get('JOBS_FRONTIER_DB') or DEFAULT_FRONTIER_DB,
+                frontier_id=self._frontier_id(use_planner),
+                commit_seconds=self.settings.getfloat('JOBS_FRONTIER_COMMIT_SECONDS', 5))
+            if len(self.frontier):
+                self.logger.info(f"发现上次未完成的爬取断点：{len(self.frontier)} 个查询组合有进度，"
+                                 f"其中 {self.frontier.unfinished_count()} 个未完成，将只补抓未完成的页")
+
+        if use_planner:
+            yield from self._planned_requests()
+            return
+
         # 遍历城市维度
         for city_info in self.TARGET_CITIES:
-            city_code = city_info.get('code', "") 
-            city_name = city_info.get('name', "未知城市")
-
-            search_province_name = "未知省份" 
-            if not city_code or city_name == "全国": 
-                search_province_name = "全国" 
-            elif len(city_code) >= 2:
-                province_code_prefix = city_code[:2]
-                search_province_name = self.province_code_to_name_map.get(
-                    province_code_prefix, 
-                    f"未知省份(市代码前缀: {province_code_prefix})"
-                )
-            else: 
-                search_province_name = f"未知省份(市代码: {city_code})"
-
             for keyword in self.TARGET_KEYWORDS:
                 # 遍历职位类别维度
                 for category_info in self.TARGET_CATEGORY_CODES:
-                    category_code = category_info.get('code', "")
-                    category_name = category_info.get('name', "未知类别") 
                     # 遍历行业维度
                     for industry_info in self.TARGET_INDUSTRY_CODES:
-                        industry_code = industry_info.get('code', "")
-                        industry_name = industry_info.get('name', "未知行业") 
-                        # 补充字段
-                        search_params_base = {
-                            'areaCode': city_code,
-                            'jobName': keyword,
-                            'categoryCode': category_code,
-                            'industrySectors': industry_code,
-                            'limit': self.DEFAULT_LIMIT,
-                            'sourcesName': self.DEFAULT_SOURCES_NAME,
-                            'sourcesType': self.DEFAULT_SOURCES_TYPE,
-                            'jobType': '', 'monthPay': '', 'property': '',
-                            'memberLevel': '', 'recruitType': '', 'keyUnits': '', 'degreeCode': ''
-                        }
-
-                        current_page_params = search_params_base.copy()
-                        current_page_params['offset'] = 1 
-                        current_page_params['_'] = int(time.time() * 1000)
-
-                        url = f"{self.base_url}?{urlencode(current_page_params)}"
-                        self.logger.info(
-                            f"请求URL (省份: {search_province_name}, 城市: {city_name}({city_code}), 关键字: '{keyword}', "
-                            f"类别: {category_name}({category_code}), 行业: {industry_name}({industry_code}))"
-                        )
+                        query_meta = self._make_query_meta(city_info, keyword, category_info, industry_info)
+                        self._log_query("请求URL", query_meta)
 
                         # 任务调度器 发送初始请求（提交第一页爬取任务）
-                        yield scrapy.Request(
-                            url=url,
-                            callback=self.parse_job_list,
-                            meta={
-                                'search_params_base': search_params_base, 
-                                'search_area_name': city_name, 
-                                'search_province_name': search_province_name, 
-                                'request_category_code': category_code, 
-                                'request_category_name': category_name, 
-                                'request_industry_code': industry_code, 
-                                'request_industry_name': industry_name, 
-                                'current_offset': 1
-                            }
-                        )
+                        yield from self._initial_requests(query_meta)
+
+    def _resolve_province_name(self, city_code, city_name):
+        """根据城市编码前两位解析省份名称"""
+        if not city_code or city_name == "全国": 
+            return "全国" 
+        if len(city_code) >= 2:
+            province_code_prefix = city_code[:2]
+            return self.province_code_to_name_map.get(
+                province_code_prefix, 
+                f"未知省份(市代码前缀: {province_code_prefix})"
+            )
+        return f"未知省份(市代码: {city_code})"
+
+    def _make_query_meta(self, city_info, keyword, category_info, industry_info):
+        """构造一个查询组合的上下文（请求参数 + 溯源字段）"""
+        city_code = city_info.get('code', "") 
+        city_name = city_info.get('name', "未知城市")
+        category_code = category_info.get('code', "")
+        industry_code = industry_info.get('code', "")
+        # 补充字段
+        search_params_base = {
+            'areaCode': city_code,
+            'jobName': keyword,
+            'categoryCode': category_code,
+            'industrySectors': industry_code,
+            'limit': self.DEFAULT_LIMIT,
+            'sourcesName': self.DEFAULT_SOURCES_NAME,
+            'sourcesType': self.DEFAULT_SOURCES_TYPE,
+            'jobType': '', 'monthPay': '', 'property': '',
+            'memberLevel': '', 'recruitType': '', 'keyUnits': '', 'degreeCode': ''
+        }
+        return {
+            'search_params_base': search_params_base, 
+            'search_area_name': city_name, 
+            'search_province_name': self._resolve_province_name(city_code, city_name), 
+            'request_category_code': category_code, 
+            'request_category_name': category_info.get('name', "未知类别"), 
+            'request_industry_code': industry_code, 
+            'request_industry_name': industry_info.get('name', "未知行业"), 
+        }
+
+    def _log_query(self, prefix, meta):
+        params = meta['search_params_base']
+        self.logger.info(
+            f"{prefix} (省份: {meta['search_province_name']}, 城市: {meta['search_area_name']}({params['areaCode']}), "
+            f"关键字: '{params['jobName']}', "
+            f"类别: {meta['request_category_name']}({params['categoryCode']}), "
+            f"行业: {meta['request_industry_name']}({params['industrySectors']}))"
+        )
+
+    # --- 断点续爬 ---
+    def _frontier_id(self, use_planner):
+        """目标维度的指纹：与上次不同（换了查询计划）时不沿用旧断点"""
+        payload = json.dumps({
+            'cities': [c.get('code', "") for c in self.TARGET_CITIES],
+            'keywords': self.TARGET_KEYWORDS,
+            'categories': [c.get('code', "") for c in self.TARGET_CATEGORY_CODES],
+            'industries': [i.get('code', "") for i in self.TARGET_INDUSTRY_CODES],
+            'run_type': self.run_type,
+            'use_planner': bool(use_planner),
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _initial_requests(self, query_meta):
+        """提交查询组合的第一页；有断点时跳过已完成的组合，只补抓未完成的页"""
+        progress = None
+        if self.frontier is not None:
+            progress = self.frontier.get(make_query_key(query_meta['search_params_base']))
+        if progress is None or not progress.has_page(1):
+            yield self._build_page_request(query_meta, 1)
+            return
+        if progress.done:
+            self.crawler.stats.inc_value('frontier/skipped_queries')
+            return
+
+        pending_pages = progress.pending_pages()
+        self.crawler.stats.inc_value('frontier/resumed_queries')
+        self._log_query(f"断点续爬（剩余 {len(pending_pages)} 页）", query_meta)
+        if not self.incremental and self.settings.getbool('JOBS_PAGINATION_FANOUT', True):
+            fanout_priority = self.settings.getint('JOBS_FANOUT_PRIORITY', 0)
+            for offset in pending_pages:
+                yield self._build_page_request(query_meta, offset, priority=fanout_priority, fanned_out=True)
+        elif pending_pages:
+            # 逐页串行模式：从第一个未完成的页继续往后翻
+            yield self._build_page_request(query_meta, pending_pages[0])
+
+    # --- 查询规划模式 ---
+    def _planned_requests(self):
+        """规划模式：复用已保存的查询计划，或从粗粒度查询开始探测"""
+        self.planner = QueryPlanner(
+            self.TARGET_CITIES, self.TARGET_KEYWORDS,
+            self.TARGET_CATEGORY_CODES, self.TARGET_INDUSTRY_CODES,
+            province_names=self.province_code_to_name_map,
+            # 仅对使用默认完整枚举的维度从“不限”开始，用户显式指定的维度照常枚举
+            split_dimensions=[d for d in self.settings.getlist('JOBS_PLANNER_SPLIT_DIMENSIONS')
+                              if d in self.default_dimensions],
+            max_results=self.settings.getint('JOBS_PLANNER_MAX_RESULTS', 1000),
+        )
+        self.plan_file = self.settings.get('JOBS_PLANNER_PLAN_FILE') or DEFAULT_PLAN_FILE
+        self.plan_leaves = None
+
+        leaves = self.planner.load_plan(self.plan_file, self.settings.getfloat('JOBS_PLANNER_PLAN_MAX_AGE_HOURS', 0))
+        if leaves is not None:
+            self.logger.info(f"复用查询计划 {self.plan_file}：{len(leaves)} 个查询组合")
+            for leaf in leaves:
+                yield from self._initial_requests(
+                    self._make_query_meta(leaf['city'], leaf['keyword'], leaf['category'], leaf['industry']))
+            return
+
+        self.logger.info(f"未找到可复用的查询计划，开始粗粒度探测（拆分维度：{self.planner.split_dimensions}）")
+        self.plan_leaves = []
+        for node in self.planner.root_nodes():
+            yield self._build_probe_request(node)
+
+    def _build_probe_request(self, node):
+        """limit=1 的探测请求：返回的总页数即结果总数"""
+        query_meta = self._make_query_meta(node['city'], node['keyword'], node['category'], node['industry'])
+        probe_params = query_meta['search_params_base'].copy()
+        probe_params.update({'limit': 1, 'offset': 1, '_': int(time.time() * 1000)})
+        return scrapy.Request(
+            url=f"{self.base_url}?{urlencode(probe_params)}",
+            callback=self.parse_probe,
+            errback=self.probe_failed,
+            priority=self.PROBE_PRIORITY,
+            meta={'plan_node': node, 'query_meta': query_meta}
+        )
+
+    def parse_probe(self, response):
+        node = response.meta['plan_node']
+        query_meta = response.meta['query_meta']
+        total_results = None
+        try:
+            data = response.json()
+            if data.get("flag"):
+                total_results = data.get("data", {}).get("pagenation", {}).get("total")
+        except json.JSONDecodeError:
+            pass
+
+        if total_results is None:
+            self._log_query("探测失败，按原查询抓取", query_meta)
+        elif total_results == 0:
+            self._log_query("探测结果为空，跳过", query_meta)
+            return
+        elif self.planner.needs_split(total_results):
+            children = self.planner.split(node)
+            if children:
+                self._log_query(f"结果数 {total_results} 超过上限，拆分为 {len(children)} 个子查询", query_meta)
+                for child in children:
+                    yield self._build_probe_request(child)
+                return
+            self._log_query(f"结果数 {total_results} 超过上限但已无法拆分，结果可能被截断", query_meta)
+
+        yield from self._plan_leaf(node, query_meta, total_results)
+
+    def probe_failed(self, failure):
+        request = failure.request
+        self.logger.warning(f"探测请求失败：{request.url}（{failure.value!r}），按原查询抓取")
+        yield from self._plan_leaf(request.meta['plan_node'], request.meta['query_meta'], None)
+
+    def _plan_leaf(self, node, query_meta, total_results):
+        """确定为叶子查询：记入计划并提交第一页"""
+        self.plan_leaves.append({
+            'city': node['city'], 'keyword': node['keyword'],
+            'category': node['category'], 'industry': node['industry'],
+            'total': total_results,
+        })
+        yield from self._initial_requests(query_meta)
+
+    def closed(self, reason):
+        # 完整探测结束后保存查询计划，供后续运行复用
+        if getattr(self, 'plan_leaves', None) is not None and reason == 'finished':
+            self.planner.save_plan(self.plan_leaves, self.plan_file)
+            self.logger.info(f"查询计划已保存到 {self.plan_file}：{len(self.plan_leaves)} 个查询组合")
+        if self._persist_queue:
+            self.logger.warning(f"{len(self._persist_queue)} 个断点/水位线提交因对应岗位未写入分片而放弃")
+        if self.watermark_store is not None:
+            self.watermark_store.close()
+        if self.frontier is not None:
+            if reason == 'finished':
+                unfinished = self.frontier.unfinished_count()
+                if unfinished:
+                    self.logger.warning(f"爬取结束，仍有 {unfinished} 个查询组合未完成（请求失败），"
+                                        f"已保留其断点，下次运行将续抓")
+                    self.frontier.clear_done()
+                else:
+                    self.frontier.clear()
+            self.frontier.close()
+
+    def _build_page_request(self, meta, offset, priority=0, fanned_out=False):
+        """构造指定页码的列表请求（meta沿用查询组合的上下文）"""
+        page_params = meta['search_params_base'].copy()
+        page_params['offset'] = offset
+        page_params['_'] = int(time.time() * 1000)
+
+        page_meta = {key: meta[key] for key in self.QUERY_META_KEYS if key in meta}
+        page_meta['current_offset'] = offset
+        page_meta['fanned_out'] = fanned_out
+        page_meta['base_priority'] = priority
+
+        return scrapy.Request(
+            url=f"{self.base_url}?{urlencode(page_params)}",
+            callback=self.parse_job_list,
+            priority=priority + self._yield_priority(meta['search_params_base'], offset),
+            meta=page_meta
+        )
+
+    def _yield_priority(self, search_params_base, offset):
+        """历史产出越高的查询组合优先级越高，同一组合中越靠前的页越先抓；无历史数据的组合取中间值"""
+        if self.query_yields is None:
+            return 0
+        priority_range = self.settings.getint('JOBS_YIELD_PRIORITY_RANGE', 100)
+        query_yield = self.query_yields.get(make_query_key(search_params_base))
+        if query_yield is None or not self.max_query_yield:
+            score = priority_range // 2
+        else:
+            score = round(query_yield / self.max_query_yield * priority_range)
+        return score - (offset - 1) * self.settings.getint('JOBS_YIELD_PAGE_DECAY', 5)
 
     # 解析请求返回的岗位信息列表
     def parse_job_list(self, response):
@@ -202,6 +496,13 @@ class JobsSpider(scrapy.Spider):
 
         api_data = data.get("data", {})
         job_list_data = api_data.get("list", [])
+        self.crawler.signals.send_catch_log(page_parsed, spider=self, response=response, job_count=len(job_list_data))
+
+        watermark = None
+        page_is_stale = False
+        if self.incremental:
+            watermark = self._get_watermark(search_params_base, current_offset)
+            job_list_data, page_is_stale = watermark.filter_page(job_list_data)
 
         if not job_list_data:
             self.logger.info(
@@ -216,6 +517,8 @@ class JobsSpider(scrapy.Spider):
                 f"省份: {search_province_name}, 地区：{search_params_base['areaCode']}, 关键字：'{search_params_base['jobName']}', "
                 f"类别：{request_category_name}({request_category_code}), 行业：{request_industry_name}({request_industry_code})。"
             )
+            if self.persist_barrier:
+                self._page_pending_items[response.url] = self._page_pending_items.get(response.url, 0) + len(job_list_data)
             for job_data in job_list_data:
                 item = JobItem()
                 item['job_id'] = job_data.get('jobId')
@@ -247,7 +550,8 @@ class JobsSpider(scrapy.Spider):
                 item['sources_name'] = job_data.get('sourcesName')
 
                 item['job_catory'] = request_category_name  
-                item['job_industry'] = request_industry_name 
+                # 未按行业拆分的查询（行业代码为空）不知道岗位所属行业，留空交给下游按“未知行业”处理
+                item['job_industry'] = request_industry_name if request_industry_code else None
 
                 item['search_area_code'] = search_params_base['areaCode']
                 item['search_area_name'] = search_area_name 
@@ -262,33 +566,84 @@ class JobsSpider(scrapy.Spider):
         pagenation_info = api_data.get("pagenation", {})
         total_pages = pagenation_info.get("total")
 
-        if total_pages and current_offset < total_pages:
-            next_offset = current_offset + 1
+        last_offset = total_pages
+        max_pages = self.settings.getint('JOBS_MAX_PAGES_PER_QUERY', 0)
+        if total_pages and max_pages and total_pages > max_pages:
+            last_offset = max_pages
 
-            params_for_next_page = search_params_base.copy()
-            params_for_next_page['offset'] = next_offset
-            params_for_next_page['_'] = int(time.time() * 1000)
+        query_key = make_query_key(search_params_base)
+        page_url = response.url if job_list_data else None
+        if self.frontier is not None:
+            self._after_output_persisted(partial(self.frontier.mark_page, query_key, current_offset, last_offset),
+                                         page_url)
 
-            next_url = f"{self.base_url}?{urlencode(params_for_next_page)}"
+        # 扇出得到的页面由第一页统一调度，自身不再继续翻页
+        if response.meta.get('fanned_out'):
+            return
+
+        if watermark is not None and page_is_stale:
+            self.logger.info(
+                f"增量：第 {current_offset} 页均为已抓取或早于水位线的岗位，停止翻页，参数："
+                f"省份: {search_province_name}, 地区：{search_params_base['areaCode']}, 关键字：'{search_params_base['jobName']}', "
+                f"类别：{request_category_name}({request_category_code}), 行业：{request_industry_name}({request_industry_code})。"
+            )
+            self._commit_watermark(watermark, page_url)
+            if self.frontier is not None:
+                self._after_output_persisted(partial(self.frontier.mark_done, query_key), page_url)
+            return
+
+        if last_offset and current_offset < last_offset and current_offset == 1 and not self.incremental \
+                and self.settings.getbool('JOBS_PAGINATION_FANOUT', True):
+            if last_offset < total_pages:
+                self.logger.warning(
+                    f"总页数 {total_pages} 超过上限 {max_pages}，仅调度前 {last_offset} 页，参数："
+                    f"省份: {search_province_name}, 地区：{search_params_base['areaCode']}, 关键字：'{search_params_base['jobName']}', "
+                    f"类别：{request_category_name}({request_category_code}), 行业：{request_industry_name}({request_industry_code})。"
+                )
+            self.logger.info(
+                f"一次性调度第 2-{last_offset} 页（共 {total_pages} 页），参数："
+                f"省份: {search_province_name}, 地区：{search_params_base['areaCode']}, 关键字：'{search_params_base['jobName']}', "
+                f"类别：{request_category_name}({request_category_code}), 行业：{request_industry_name}({request_industry_code})。"
+            )
+            fanout_priority = self.settings.getint('JOBS_FANOUT_PRIORITY', 0)
+            # 提交剩余全部页的爬取任务，由并发配置决定实际吞吐
+            for next_offset in range(2, last_offset + 1):
+                # 断点续爬时跳过上次已抓完的页
+                if self.frontier is not None and self.frontier.is_page_done(query_key, next_offset):
+                    continue
+                yield self._build_page_request(response.meta, next_offset,
+                                               priority=fanout_priority, fanned_out=True)
+
+        elif last_offset and current_offset < last_offset:
+            next_offset = current_offset + 1
             self.logger.info(
                 f"请求下一页 {next_offset}/{total_pages}，参数："
                 f"省份: {search_province_name}, 地区：{search_params_base['areaCode']}, 关键字：'{search_params_base['jobName']}', "
                 f"类别：{request_category_name}({request_category_code}), 行业：{request_industry_name}({request_industry_code})。"
             )
 
-            next_meta = response.meta.copy() 
-            next_meta['current_offset'] = next_offset
-            
             # 提交下一页爬取任务
-            yield scrapy.Request(
-                url=next_url,
-                callback=self.parse_job_list,
-                meta=next_meta 
-            )
+            yield self._build_page_request(response.meta, next_offset, priority=response.meta.get('base_priority', 0))
         else:
             self.logger.info(
                 f"没有更多页面了，参数：省份: {search_province_name}, 地区：{search_params_base['areaCode']}, "
                 f"关键字：'{search_params_base['jobName']}', "
                 f"类别：{request_category_name}({request_category_code}), 行业：{request_industry_name}({request_industry_code})。 "
                 f"当前页 {current_offset}，总页数 {total_pages if total_pages is not None else '未知'}。"
-            )
\ No newline at end of file
+            )
+            if watermark is not None:
+                self._commit_watermark(watermark, page_url)
+            if self.frontier is not None:
+                self._after_output_persisted(partial(self.frontier.mark_done, query_key), page_url)
+
+    # --- 增量模式 ---
+    def _get_watermark(self, search_params_base, current_offset):
+        """第一页时从存储加载该查询组合的水位线，后续页沿用"""
+        query_key = make_query_key(search_params_base)
+        if current_offset == 1 or query_key not in self._watermarks:
+            self._watermarks[query_key] = self.watermark_store.load(query_key)
+        return self._watermarks[query_key]
+
+    def _commit_watermark(self, watermark, page_url=None):
+        self._after_output_persisted(partial(self.watermark_store.commit, watermark), page_url)
+        self._watermarks.pop(watermark.query_key, None)
@@ -0,0 +1,286 @@
+# crawler/crawler/staging.py
+# 岗位暂存库：把爬取输出转成按发布月份/省份分区的 Parquet 数据集（类型化列，重复度高的字符串列字典编码）。
+# 看板、训练与导入脚本只读需要的列、按分区裁剪，不再反复解析JSON文本。需要安装 pyarrow
+import json
+import os
+import shutil
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote
+
+from .dedup import record_content_hash
+from .feeds import DATA_DIR, MANIFEST_NAME, iter_job_records
+
+DEFAULT_STAGING_DIR = os.path.join(DATA_DIR, 'jobs_parquet')
+STAGING_MARKER = '_staging.json'  # 转换完成后写入，读取端据此识别暂存库（'_' 开头，不会被当成数据文件）
+STAGING_FORMAT = 1
+DEFAULT_BATCH_RECORDS = 50_000
+DEFAULT_ROWS_PER_FILE = 1_000_000
+DEFAULT_ROW_GROUP_ROWS = 10_000  # 每个分区攒够这么多行才写一个行组（行组太小压缩与读取都慢，太大占内存）
+
+PARTITION_COLUMNS = ('publish_month', 'province')
+UNKNOWN_PARTITION = 'unknown'
+HASH_COLUMN = 'content_hash'  # 原始记录的内容哈希：类型转换后现算会不同，增量导入/快照对比直接用它
+EXTRA_COLUMN = 'extra'        # 不在下表中的字段，以及无法按列类型无损保存的原值，以JSON保存，读取时还原
+CHINA_TZ = timezone(timedelta(hours=8))
+
+# 列类型：dict 为字典编码字符串（取值重复度高），str 为普通字符串，int/float 为数值
+FIELD_TYPES = {
+    'job_id': 'str',
+    'job_name': 'dict',
+    'job_catory': 'dict',
+    'job_industry': 'dict',
+    'high_month_pay': 'float',
+    'low_month_pay': 'float',
+    'update_date': 'int',      # 毫秒时间戳
+    'publish_date': 'int',     # 毫秒时间戳
+    'head_count': 'int',
+    'member_level': 'dict',
+    'recruit_type': 'dict',
+    'degree_name': 'dict',
+    'company_name': 'dict',
+    'company_logo': 'str',
+    'area_code_name': 'dict',
+    'prinvce_code_nme': 'dict',
+    'company_scale': 'dict',
+    'sort_priority': 'int',
+    'sources_name_ch': 'dict',
+    'sources_type': 'dict',
+    'company_tags': 'dict',
+    'major_required': 'dict',
+    'company_property': 'dict',
+    'user_type': 'dict',
+    'company_id': 'str',
+    'key_units': 'dict',
+    'sources_name': 'dict',
+    'description': 'str',
+    'search_area_code': 'dict',
+    'search_area_name': 'dict',
+    'search_keyword': 'dict',
+    'search_category_code': 'dict',
+    'search_industry_code': 'dict',
+    'source_url': 'str',
+    'change_type': 'dict',
+    HASH_COLUMN: 'str',
+    EXTRA_COLUMN: 'str',
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError:
+        raise RuntimeError("读写 Parquet 暂存库需要安装 pyarrow（pip install pyarrow）")
+    return pyarrow, pyarrow.dataset
+
+
+def staging_schema(with_partitions=False):
+    pa, _ = _pyarrow()
+    types = {
+        'dict': pa.dictionary(pa.int32(), pa.string()),
+        'str': pa.string(),
+        'int': pa.int64(),
+        'float': pa.float64(),
+    }
+    fields = [(name, types[kind]) for name, kind in FIELD_TYPES.items()]
+    if with_partitions:
+        fields += [(name, pa.string()) for name in PARTITION_COLUMNS]
+    return pa.schema(fields)
+
+
+def partitioning():
+    pa, ds = _pyarrow()
+    return ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor='hive')
+
+
+def is_staging_dir(path):
+    return os.path.isfile(os.path.join(path, STAGING_MARKER))
+
+
+def read_staging_info(path):
+    with open(os.path.join(path, STAGING_MARKER), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_staging_fresh(path, source):
+    """暂存库存在且不早于爬取输出 source（分片目录看清单的修改时间，单个文件看文件本身）时返回 True。
+    爬虫之后又写入了新分片而暂存库没有重建时返回 False，读取端应改读 source
+    """
+    if not is_staging_dir(path):
+        return False
+    if os.path.isdir(source):
+        source = os.path.join(source, MANIFEST_NAME)
+    if not os.path.exists(source):
+        return True
+    try:
+        built_at = read_staging_info(path).get('built_at', 0)
+    except (OSError, ValueError):
+        return False
+    # built_at 取整到秒，这里同样按秒比较
+    return built_at >= int(os.path.getmtime(source))
+
+
+def _coerce(value, kind):
+    """按列类型转换取值，无法转换的数值记为空（原值由调用方存入 extra）"""
+    if value is None or (value == '' and kind in ('int', 'float')):
+        return None
+    try:
+        if kind == 'int':
+            return int(value)
+        if kind == 'float':
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else str(value)
+
+
+def partition_values(record):
+    """(发布月份 YYYY-MM（北京时间）, 省份)，取不到时为 unknown"""
+    month = UNKNOWN_PARTITION
+    publish_date = _coerce(record.get('publish_date'), 'int')
+    if publish_date:
+        try:
+            month = datetime.fromtimestamp(publish_date / 1000, CHINA_TZ).strftime('%Y-%m')
+        except (OverflowError, OSError, ValueError):
+            pass
+    province = str(record.get('prinvce_code_nme') or '').strip().replace('/', '_') or UNKNOWN_PARTITION
+    return month, province
+
+
+def _record_batches(records, schema, batch_records, stats):
+    """把记录流转换成 RecordBatch 流（每批 batch_records 条，内存有界）"""
+    pa, _ = _pyarrow()
+    known = [name for name in FIELD_TYPES if name not in (HASH_COLUMN, EXTRA_COLUMN)]
+    columns = {name: [] for name in schema.names}
+    failures = stats['coerce_failures']
+    for record in records:
+        extra = {key: value for key, value in record.items() if key not in FIELD_TYPES}
+        for name in known:
+            value = record.get(name)
+            coerced = _coerce(value, FIELD_TYPES[name])
+            if coerced is None and value is not None and value != '':
+                # 数值列中无法转换的取值：列中记为空，原值保存在 extra，读取时不会丢失
+                extra[name] = value
+                failures[name] += 1
+            elif isinstance(value, (list, dict)):
+                extra[name] = value  # 列中是JSON文本，读取时还原为原来的列表/字典
+            columns[name].append(coerced)
+        columns[EXTRA_COLUMN].append(json.dumps(extra, ensure_ascii=False) if extra else None)
+        columns[HASH_COLUMN].append(record_content_hash(record))
+        month, province = partition_values(record)
+        columns['publish_month'].append(month)
+        columns['province'].append(province)
+        stats['records'] += 1
+        if len(columns[HASH_COLUMN]) >= batch_records:
+            yield pa.RecordBatch.from_pydict(columns, schema=schema)
+            columns = {name: [] for name in schema.names}
+    if columns[HASH_COLUMN]:
+        yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def build_staging(records, output_dir=DEFAULT_STAGING_DIR, compression='zstd',
+                  batch_records=DEFAULT_BATCH_RECORDS, rows_per_file=DEFAULT_ROWS_PER_FILE,
+                  row_group_rows=DEFAULT_ROW_GROUP_ROWS, source=None):
+    """把岗位记录流写成分区 Parquet 数据集，返回转换信息。
+    先写到 <output_dir>.part，完成后整体替换旧数据集，读取端不会读到写了一半的数据
+    """
+    _, ds = _pyarrow()
+    schema = staging_schema(with_partitions=True)
+    tmp_dir = output_dir + '.part'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    started = time.time()
+    stats = {'records': 0, 'coerce_failures': Counter()}
+
+    row_group_rows = min(row_group_rows, rows_per_file)
+    ds.write_dataset(
+        _record_batches(records, schema, batch_records, stats), tmp_dir, schema=schema,
+        format='parquet', partitioning=partitioning(),
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression or None),
+        basename_template='part-{i}.parquet', max_rows_per_file=rows_per_file,
+        min_rows_per_group=row_group_rows, max_rows_per_group=max(row_group_rows, batch_records))
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    info = {
+        'format': STAGING_FORMAT,
+        'records': stats['records'],
+        'coerce_failures': dict(stats['coerce_failures']),  # 列名 -> 无法按列类型转换（原值存入 extra）的条数
+        'partitions': sorted({unquote(os.path.relpath(root, tmp_dir)) for root, _, files in os.walk(tmp_dir)
+                              if any(name.endswith('.parquet') for name in files)}),
+        'partition_columns': list(PARTITION_COLUMNS),
+        'compression': compression,
+        'source': source,
+        'built_at': int(time.time()),
+        'seconds': round(time.time() - started, 2),
+    }
+    with open(os.path.join(tmp_dir, STAGING_MARKER), 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+    old_dir = output_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return info
+
+
+def build_staging_from(path, output_dir=DEFAULT_STAGING_DIR, **kwargs):
+    """从爬取输出（分片目录或 JSON数组/JSONL 文件）构建暂存库"""
+    return build_staging(iter_job_records(path), output_dir, source=os.path.abspath(path), **kwargs)
+
+
+def _dataset(path):
+    _, ds = _pyarrow()
+    return ds.dataset(path, format='parquet', partitioning=partitioning())
+
+
+def _partition_filter(months=None, provinces=None):
+    """分区裁剪条件：只打开对应月份/省份目录下的文件"""
+    _, ds = _pyarrow()
+    expression = None
+    for name, values in (('publish_month', months), ('province', provinces)):
+        if values:
+            condition = ds.field(name).isin(list(values))
+            expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _projection(dataset, columns):
+    if columns is None:
+        return None
+    return [name for name in dict.fromkeys(columns) if name in dataset.schema.names]
+
+
+def read_jobs(path=DEFAULT_STAGING_DIR, columns=None, months=None, provinces=None, categorical=False):
+    """读取暂存库为 DataFrame：只读 columns 中的列（不存在的列忽略），按 months/provinces 裁剪分区。
+    categorical=False 时字典编码列还原为普通字符串列，与从JSON加载的 DataFrame 用法一致
+    """
+    pa, _ = _pyarrow()
+    dataset = _dataset(path)
+    table = dataset.to_table(columns=_projection(dataset, columns), filter=_partition_filter(months, provinces))
+    if not categorical:
+        table = table.cast(pa.schema([
+            pa.field(field.name, field.type.value_type) if pa.types.is_dictionary(field.type) else field
+            for field in table.schema]))
+    return table.to_pandas()
+
+
+def iter_staged_records(path=DEFAULT_STAGING_DIR, columns=None, months=None, provinces=None, batch_size=10_000):
+    """逐条产出暂存库中的记录（dict），空值字段省略，extra 中的字段还原，分区列不输出"""
+    dataset = _dataset(path)
+    projection = _projection(dataset, columns)
+    if projection is not None and EXTRA_COLUMN in dataset.schema.names:
+        projection.append(EXTRA_COLUMN)
+    for batch in dataset.to_batches(columns=projection, filter=_partition_filter(months, provinces),
+                                    batch_size=batch_size):
+        for row in batch.to_pylist():
+            extra = row.pop(EXTRA_COLUMN, None)
+            record = {key: value for key, value in row.items()
+                      if value is not None and key not in PARTITION_COLUMNS}
+            if extra:
+                record.update(json.loads(extra))
+            yield record
@@ -0,0 +1,104 @@
+# crawler/crawler/watermarks.py
+# 增量爬取水位线：按查询组合记录最大 updateDate 与近期见过的 jobId（本地SQLite）
+import os
+import sqlite3
+import time
+
+DEFAULT_WATERMARK_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'watermarks.sqlite')
+
+
+class QueryWatermark:
+    """单个查询组合的水位线，以及本次运行中翻页看到的岗位"""
+
+    def __init__(self, query_key, max_update_date=None, seen_jobs=None):
+        self.query_key = query_key
+        self.max_update_date = max_update_date
+        self.seen_jobs = seen_jobs or {}   # jobId -> updateDate
+        self.crawled_jobs = {}             # 本次运行看到的 jobId -> updateDate
+
+    def _is_known(self, job_id, update_date):
+        """已见过且未更新"""
+        if job_id not in self.seen_jobs:
+            return False
+        seen_update = self.seen_jobs[job_id]
+        return update_date is None or (seen_update is not None and update_date <= seen_update)
+
+    def _is_older(self, update_date):
+        return self.max_update_date is not None and update_date is not None and update_date <= self.max_update_date
+
+    def filter_page(self, job_list):
+        """返回 (本页需要输出的岗位, 本页是否全部为已见或早于水位线的岗位)"""
+        fresh_jobs = []
+        all_stale = True
+        for job_data in job_list:
+            job_id = job_data.get('jobId')
+            update_date = job_data.get('updateDate')
+            known = self._is_known(job_id, update_date)
+            if not known:
+                fresh_jobs.append(job_data)
+            if not (known or self._is_older(update_date)):
+                all_stale = False
+            if job_id:
+                self.crawled_jobs[job_id] = update_date
+        return fresh_jobs, all_stale
+
+    def new_max_update_date(self):
+        dates = [d for d in self.crawled_jobs.values() if d is not None]
+        if self.max_update_date is not None:
+            dates.append(self.max_update_date)
+        return max(dates) if dates else None
+
+
+class WatermarkStore:
+    """水位线的SQLite存储；每个查询组合只保留最近 seen_limit 个 jobId"""
+
+    def __init__(self, db_path=DEFAULT_WATERMARK_DB, seen_limit=500):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.seen_limit = seen_limit
+        # 多个分片进程共享同一水位线库（查询组合互不重叠），等待写锁而不是立即报错
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                query_key       TEXT PRIMARY KEY,
+                max_update_date INTEGER,
+                updated_at      INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS seen_jobs (
+                query_key   TEXT NOT NULL,
+                job_id      TEXT NOT NULL,
+                update_date INTEGER,
+                seen_at     INTEGER NOT NULL,
+                PRIMARY KEY (query_key, job_id)
+            );
+        """)
+
+    def load(self, query_key):
+        row = self.conn.execute(
+            "SELECT max_update_date FROM watermarks WHERE query_key = ?", (query_key,)).fetchone()
+        seen_jobs = dict(self.conn.execute(
+            "SELECT job_id, update_date FROM seen_jobs WHERE query_key = ?", (query_key,)))
+        return QueryWatermark(query_key, row[0] if row else None, seen_jobs)
+
+    def commit(self, watermark):
+        """查询组合翻页结束后写入新水位线（中途失败的组合不会推进水位线）"""
+        now = int(time.time())
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO watermarks (query_key, max_update_date, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(query_key) DO UPDATE SET max_update_date = excluded.max_update_date, "
+                "updated_at = excluded.updated_at",
+                (watermark.query_key, watermark.new_max_update_date(), now))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO seen_jobs (query_key, job_id, update_date, seen_at) VALUES (?, ?, ?, ?)",
+                [(watermark.query_key, job_id, update_date, now)
+                 for job_id, update_date in watermark.crawled_jobs.items()])
+            self.conn.execute(
+                "DELETE FROM seen_jobs WHERE query_key = ? AND job_id NOT IN ("
+                "SELECT job_id FROM seen_jobs WHERE query_key = ? "
+                "ORDER BY update_date DESC, seen_at DESC LIMIT ?)",
+                (watermark.query_key, watermark.query_key, self.seen_limit))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,54 @@
+# crawler/diff_snapshots.py
+# 对比两次爬取的输出，得到新增/下线/变化的岗位，供看板展示变动、下游只处理变化部分
+#
+# 用法（在 crawler/ 目录下）：
+#   python diff_snapshots.py data/shard_runs/20250601-020000/worker-1/jobs_shards data/jobs_shards
+#   python diff_snapshots.py data/jobs_shards data/jobs_shards --old-run 20250601-020000 --new-run 20250602-020000
+#
+# 每次运行的分片只包含该次输出的岗位：要得到“下线”岗位，两次爬取都需是完整快照（DEDUP_ENABLED=0）
+import argparse
+import json
+import os
+import sys
+import time
+
+CRAWLER_ROOT = os.path.dirname(os.path.abspath(__file__))
+if CRAWLER_ROOT not in sys.path:
+    sys.path.insert(0, CRAWLER_ROOT)
+
+from crawler.feeds import DATA_DIR
+from crawler.snapshot_diff import DEFAULT_CHUNK_RECORDS, diff_snapshots, iter_snapshot_records
+
+SNAPSHOT_DIFFS_DIR = os.path.join(DATA_DIR, 'snapshot_diffs')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按 job_id 对比两次爬取结果（外部排序，内存占用与数据量无关）")
+    parser.add_argument('old', help="旧一次的输出：分片目录或 JSON数组/JSONL 文件（可压缩）")
+    parser.add_argument('new', help="新一次的输出：分片目录或 JSON数组/JSONL 文件（可压缩）")
+    parser.add_argument('--old-run', default=None, help="旧输出为分片目录时，只取该 run_id 写入的分片")
+    parser.add_argument('--new-run', default=None, help="新输出为分片目录时，只取该 run_id 写入的分片")
+    parser.add_argument('--output-dir', default=None, help="差异输出目录（默认 data/snapshot_diffs/<时间>）")
+    parser.add_argument('--chunk-records', type=int, default=DEFAULT_CHUNK_RECORDS, help="外部排序每块的记录数")
+    parser.add_argument('--compression', default='', choices=['', 'gzip', 'zstd'], help="差异文件压缩格式")
+    parser.add_argument('--tmp-dir', default=None, help="排序临时文件目录（默认系统临时目录）")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.join(SNAPSHOT_DIFFS_DIR, time.strftime('%Y%m%d-%H%M%S'))
+    started = time.time()
+    summary = diff_snapshots(iter_snapshot_records(args.old, args.old_run),
+                             iter_snapshot_records(args.new, args.new_run),
+                             output_dir, chunk_records=args.chunk_records,
+                             compression=args.compression, tmp_dir=args.tmp_dir)
+
+    print(f"对比完成（{time.time() - started:.1f} 秒）：旧 {summary['old_unique']} 条，新 {summary['new_unique']} 条")
+    print(f"新增 {summary['added']}，下线 {summary['removed']}，变化 {summary['changed']}，"
+          f"未变 {summary['unchanged']}，变动率 {summary['churn_rate']:.2%}")
+    if summary['changed_fields']:
+        print(f"变化字段：{json.dumps(summary['changed_fields'], ensure_ascii=False)}")
+    print(f"差异文件与汇总已写入 {output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
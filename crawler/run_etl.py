@@ -0,0 +1,87 @@
+# crawler/run_etl.py
+# 岗位数仓ETL：ODS抽取 → 字段清洗 → 格式标准化 → DW输出（data/dw_jobs.json）→ DW->ADS加载（MySQL recruitment_jobs）
+# 替代 data/ 下的 Kettle 作业（job_recruitment_etl.kjb），不再需要 JVM 和写死的 Windows 路径
+#
+# 用法（在 crawler/ 目录下）：
+#   python run_etl.py                                  # 默认读取 data/jobs_parquet、data/jobs_shards 或 data/jobs.json
+#   python run_etl.py data/jobs.json --incremental     # 只处理新增/变化的岗位（下线岗位从ADS表删除），
+#                                                      # DW层只输出本次变化到 data/dw_jobs.delta-<时间>.json
+#   python run_etl.py data/jobs.json --no-ads          # 只输出DW文件，不连接数据库
+#
+# 数据库连接取 crawler/settings.py 中的 MYSQL_*；每次运行的统计与被拒绝的记录写入 data/etl_runs/<时间>/
+import argparse
+import os
+import sys
+
+CRAWLER_ROOT = os.path.dirname(os.path.abspath(__file__))
+if CRAWLER_ROOT not in sys.path:
+    sys.path.insert(0, CRAWLER_ROOT)
+
+from crawler import settings
+from crawler.etl import (DEFAULT_ADS_TABLE, DEFAULT_BUFFER_CHUNKS, DEFAULT_CHUNK_RECORDS, DEFAULT_COMMIT_SIZE,
+                         DEFAULT_DW_OUTPUT, DEFAULT_STATE_DB, run_etl)
+from crawler.feeds import DATA_DIR, DEFAULT_SHARDS_DIR, MANIFEST_NAME
+from crawler.staging import DEFAULT_STAGING_DIR, is_staging_dir
+
+
+def default_source():
+    if is_staging_dir(DEFAULT_STAGING_DIR):
+        return DEFAULT_STAGING_DIR
+    if os.path.exists(os.path.join(DEFAULT_SHARDS_DIR, MANIFEST_NAME)):
+        return DEFAULT_SHARDS_DIR
+    return os.path.join(DATA_DIR, 'jobs.json')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="岗位数仓ETL（ODS → DW → ADS），流式分批处理")
+    parser.add_argument('source', nargs='?', default=None,
+                        help="爬取输出：Parquet 暂存库、分片目录或 JSON数组/JSONL 文件（可压缩），"
+                             "默认 data/jobs_parquet、data/jobs_shards 或 data/jobs.json")
+    parser.add_argument('--incremental', action='store_true', help="增量运行：跳过已加载且未变化的岗位")
+    parser.add_argument('--state-db', default=DEFAULT_STATE_DB, help="增量状态库（默认 data/etl_state.sqlite）")
+    parser.add_argument('--dw-output', default=DEFAULT_DW_OUTPUT,
+                        help="DW层JSON文件（留空不输出）；增量运行写到同目录的 <文件名>.delta-<时间>.json，不覆盖全量文件")
+    parser.add_argument('--no-ads', action='store_true', help="不写入ADS表（不连接数据库）")
+    parser.add_argument('--table', default=DEFAULT_ADS_TABLE, help="ADS表名")
+    parser.add_argument('--chunk-records', type=int, default=DEFAULT_CHUNK_RECORDS, help="每批处理的记录数")
+    parser.add_argument('--buffer-chunks', type=int, default=DEFAULT_BUFFER_CHUNKS, help="阶段之间最多积压的批数")
+    parser.add_argument('--commit-size', type=int, default=DEFAULT_COMMIT_SIZE, help="写入ADS表时每次提交的记录数")
+    args = parser.parse_args()
+
+    source = args.source or default_source()
+    if not os.path.exists(source):
+        print(f"找不到爬取输出：{source}")
+        return 1
+    if args.incremental and args.no_ads:
+        print("增量模式需要写入ADS表，不能与 --no-ads 同时使用")
+        return 1
+
+    db_config = None if args.no_ads else {
+        'host': settings.MYSQL_HOST,
+        'port': settings.MYSQL_PORT,
+        'user': settings.MYSQL_USER,
+        'password': settings.MYSQL_PASSWORD,
+        'database': settings.MYSQL_DATABASE,
+        'charset': 'utf8mb4',
+    }
+    report = run_etl(source, chunk_records=args.chunk_records, buffer_chunks=args.buffer_chunks,
+                     dw_output=args.dw_output, db_config=db_config, table=args.table,
+                     commit_size=args.commit_size, incremental=args.incremental, state_db=args.state_db)
+
+    print(f"ETL完成（{report['seconds']} 秒，{'增量' if report['incremental'] else '全量'}）：读取 {report['rows_read']} 条，"
+          f"加载 {report['rows_loaded']} 条，整体 {report['rows_per_second'] or 0} 条/秒")
+    for stage in report['stages']:
+        notes = dict(stage['reject_reasons'], **stage['counters'])
+        print(f"  {stage['label']}：输入 {stage['rows_in']}，输出 {stage['rows_out']}，拒绝 {stage['rejected']}，"
+              f"{stage['rows_per_second'] or 0} 条/秒（按CPU时间 {stage['rows_per_cpu_second'] or 0} 条/秒）"
+              + (f"  {', '.join(f'{k}={v}' for k, v in notes.items())}" if notes else ''))
+    if report['dw_output']:
+        print(f"DW文件：{report['dw_output']}")
+    if report['rejects_file']:
+        print(f"被拒绝的记录：{report['rejects_file']}")
+    print(f"运行报告已写入 {report['run_dir']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# crawler/run_shards.py
+# 多进程分片爬取：按省份前缀把查询空间分给 N 个 Scrapy 进程，结束后合并输出并汇总统计
+#
+# 用法（在 crawler/ 目录下）：
+#   python run_shards.py --workers 4
+#   python run_shards.py --workers 4 -a run_type=incremental -s JOBS_QUERY_PLANNER=1
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+CRAWLER_ROOT = os.path.dirname(os.path.abspath(__file__))
+if CRAWLER_ROOT not in sys.path:
+    sys.path.insert(0, CRAWLER_ROOT)
+
+from crawler import settings as crawl_settings
+from crawler.feeds import DATA_DIR, DEFAULT_SHARDS_DIR, JsonlShardWriter, iter_shard_records
+from crawler.planner import province_prefixes
+
+SHARD_RUNS_DIR = os.path.join(DATA_DIR, 'shard_runs')
+TARGET_OPTIONS_FILE = os.path.join(DATA_DIR, 'target_options.json')
+
+
+def target_cities(spider_args):
+    """按爬虫的规则确定目标城市：-a target_cities_json=... 优先，否则取 target_options.json 中的全部城市"""
+    cities = None
+    for arg in spider_args:
+        name, _, value = arg.partition('=')
+        if name == 'target_cities_json' and value:
+            try:
+                cities = json.loads(value)
+            except json.JSONDecodeError:
+                cities = None
+    if cities is None:
+        try:
+            with open(TARGET_OPTIONS_FILE, 'r', encoding='utf-8') as f:
+                cities = json.load(f).get("citys", [])
+        except (OSError, ValueError):
+            cities = []
+    return cities or [{"code": "", "name": "全国"}]
+
+
+def split_rate_budget(workers, overrides=None):
+    """把全局并发/速率预算平分给各进程：并发上限除以 N，各项延迟（含自适应限速能降到的最小延迟、
+    AutoThrottle 的起始延迟）乘以 N。命令行 -s 覆盖的值同样参与分摊
+    """
+    overrides = overrides or {}
+
+    def value(name, cast):
+        return cast(overrides.get(name, getattr(crawl_settings, name)))
+
+    def divided(name):
+        return max(1, value(name, int) // workers)
+
+    def multiplied(name):
+        return value(name, float) * workers
+
+    min_delay = multiplied('SLOT_THROTTLE_MIN_DELAY')
+    start_delay = multiplied('AUTOTHROTTLE_START_DELAY')
+    return {
+        'CONCURRENT_REQUESTS': divided('CONCURRENT_REQUESTS'),
+        'CONCURRENT_REQUESTS_PER_DOMAIN': divided('CONCURRENT_REQUESTS_PER_DOMAIN'),
+        'SLOT_THROTTLE_MAX_CONCURRENCY': divided('SLOT_THROTTLE_MAX_CONCURRENCY'),
+        'DOWNLOAD_DELAY': multiplied('DOWNLOAD_DELAY'),
+        'SLOT_THROTTLE_MIN_DELAY': min_delay,
+        'SLOT_THROTTLE_MAX_DELAY': max(value('SLOT_THROTTLE_MAX_DELAY', float), min_delay),
+        'AUTOTHROTTLE_START_DELAY': start_delay,
+        'AUTOTHROTTLE_MAX_DELAY': max(value('AUTOTHROTTLE_MAX_DELAY', float), start_delay),
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': value('AUTOTHROTTLE_TARGET_CONCURRENCY', float) / workers,
+    }
+
+
+def worker_command(index, workers, worker_dir, spider_args, extra_settings):
+    shard_label = f"shard{index + 1}of{workers}"
+    settings = {
+        # 各进程独立的输出与进度文件；去重库、水位线库、HTTP缓存共享
+        # （去重库的布隆过滤器关闭时按位合并、打开时补入其他进程写入的岗位，共享不会漏判）
+        'JOBS_OUTPUT_DIR': os.path.join(worker_dir, 'jobs_shards'),
+        'JOBS_STATS_FILE': os.path.join(worker_dir, 'stats.json'),
+        'LOG_FILE': os.path.join(worker_dir, 'crawl.log'),
+        # 断点、查询计划与分片范围绑定，跨运行保留（分片数不变时可续爬/复用）
+        'JOBS_FRONTIER_DB': os.path.join(DATA_DIR, f'frontier-{shard_label}.sqlite'),
+        'JOBS_PLANNER_PLAN_FILE': os.path.join(DATA_DIR, f'query_plan-{shard_label}.json'),
+        'TELEMETRY_DIR': os.path.join(DATA_DIR, 'telemetry', shard_label),
+    }
+    settings.update(extra_settings)
+    settings.update(split_rate_budget(workers, extra_settings))
+
+    cmd = [sys.executable, '-m', 'scrapy', 'crawl', 'jobs',
+           '-a', f'shard_index={index}', '-a', f'shard_count={workers}']
+    for arg in spider_args:
+        cmd += ['-a', arg]
+    for name, value in settings.items():
+        cmd += ['-s', f'{name}={value}']
+    return cmd
+
+
+def merge_outputs(worker_dirs, output_dir):
+    """合并各进程的分片输出，按 job_id 去重（并发进程可能都把同一岗位判为新岗位）"""
+    writer = JsonlShardWriter(
+        output_dir,
+        compression=crawl_settings.JOBS_OUTPUT_COMPRESSION,
+        batch_size=crawl_settings.JOBS_OUTPUT_BATCH_SIZE,
+        rotate_bytes=crawl_settings.JOBS_OUTPUT_ROTATE_BYTES,
+    )
+    seen_job_ids = set()
+    duplicates = 0
+    for worker_dir in worker_dirs:
+        shards_dir = os.path.join(worker_dir, 'jobs_shards')
+        if not os.path.isdir(shards_dir):
+            continue
+        for record in iter_shard_records(shards_dir):
+            job_id = record.get('job_id')
+            if job_id in seen_job_ids:
+                duplicates += 1
+                continue
+            if job_id:
+                seen_job_ids.add(job_id)
+            writer.write(record)
+    writer.close()
+    return writer.total_records, duplicates
+
+
+def combine_stats(worker_dirs):
+    """数值型统计求和，其余按进程保留"""
+    per_worker = {}
+    totals = {}
+    for worker_dir in worker_dirs:
+        stats_file = os.path.join(worker_dir, 'stats.json')
+        if not os.path.exists(stats_file):
+            continue
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        per_worker[os.path.basename(worker_dir)] = stats
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+    return {'totals': totals, 'workers': per_worker}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程分片运行 jobs 爬虫并合并输出")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="工作进程数（默认CPU核数，不超过目标城市的省份前缀数）")
+    parser.add_argument('--output-dir', default=DEFAULT_SHARDS_DIR, help="合并后的分片输出目录")
+    parser.add_argument('-a', dest='spider_args', action='append', default=[], help="传给爬虫的参数 NAME=VALUE")
+    parser.add_argument('-s', dest='settings', action='append', default=[], help="覆盖的Scrapy配置 NAME=VALUE")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    # 分片按省份前缀划分，多出的进程分不到查询，却会摊薄其他进程的并发/速率预算
+    prefix_count = len(province_prefixes(target_cities(args.spider_args)))
+    if workers > prefix_count:
+        print(f"目标城市只涉及 {prefix_count} 个省份前缀，工作进程数从 {workers} 降为 {prefix_count}")
+        workers = prefix_count
+    extra_settings = dict(item.split('=', 1) for item in args.settings)
+    run_dir = os.path.join(SHARD_RUNS_DIR, time.strftime('%Y%m%d-%H%M%S'))
+    worker_dirs = [os.path.join(run_dir, f'worker-{i + 1}') for i in range(workers)]
+
+    processes = []
+    for index, worker_dir in enumerate(worker_dirs):
+        os.makedirs(worker_dir, exist_ok=True)
+        cmd = worker_command(index, workers, worker_dir, args.spider_args, extra_settings)
+        processes.append(subprocess.Popen(cmd, cwd=CRAWLER_ROOT))
+        print(f"启动分片 {index + 1}/{workers}，日志：{os.path.join(worker_dir, 'crawl.log')}")
+
+    return_codes = [process.wait() for process in processes]
+    for index, code in enumerate(return_codes):
+        print(f"分片 {index + 1}/{workers} 结束，返回码：{code}")
+
+    records, duplicates = merge_outputs(worker_dirs, args.output_dir)
+    print(f"合并完成：{records} 条岗位写入 {args.output_dir}，跨分片重复 {duplicates} 条")
+
+    combined = combine_stats(worker_dirs)
+    combined.update({'workers_count': workers, 'merged_records': records, 'merged_duplicates': duplicates,
+                     'return_codes': return_codes})
+    stats_path = os.path.join(run_dir, 'combined_stats.json')
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump(combined, f, ensure_ascii=False, indent=2)
+    totals = combined['totals']
+    print(f"汇总统计已写入 {stats_path}：请求 {totals.get('downloader/request_count', 0)}，"
+          f"输出岗位 {totals.get('item_scraped_count', 0)}，丢弃重复 {totals.get('item_dropped_count', 0)}")
+
+    return max(return_codes, default=0)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -551,6 +551,7 @@ import numpy as np
 import json
 import os
 import re
+import sys
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
@@ -570,7 +571,27 @@ BASE_DIR_DA = os.path.dirname(data_analysis_dir)
 CRAWLER_ROOT_DIR = os.path.join(BASE_DIR_DA, 'crawler')
 CRAWLER_MODULE_DIR_DA = os.path.join(CRAWLER_ROOT_DIR, 'crawler')
 DATA_DIR_INSIDE_CRAWLER_DA = os.path.join(CRAWLER_MODULE_DIR_DA, 'data')
-JOBS_FILE_DA = os.path.join(DATA_DIR_INSIDE_CRAWLER_DA, 'jobs.json') # 或 jobs.jsonl
+JOBS_PARQUET_DIR_DA = os.path.join(DATA_DIR_INSIDE_CRAWLER_DA, 'jobs_parquet') # Parquet暂存库 (crawler/build_staging.py)
+
+if BASE_DIR_DA not in sys.path:
+    sys.path.insert(0, BASE_DIR_DA)
+from crawler.crawler.feeds import MANIFEST_NAME, iter_job_records
+from crawler.crawler.staging import is_staging_dir, is_staging_fresh, read_jobs
+
+JOBS_SHARDS_DIR_DA = os.path.join(DATA_DIR_INSIDE_CRAWLER_DA, 'jobs_shards') # 爬虫JSONL分片目录
+if os.path.exists(os.path.join(JOBS_SHARDS_DIR_DA, MANIFEST_NAME)):
+    CRAWL_OUTPUT_DA = JOBS_SHARDS_DIR_DA
+else:
+    CRAWL_OUTPUT_DA = os.path.join(DATA_DIR_INSIDE_CRAWLER_DA, 'jobs.json') # 或 jobs.jsonl
+# 优先从 Parquet 暂存库加载（只读建模需要的列）；暂存库早于爬取输出（爬虫写入了新分片但没有重建）时改读爬取输出
+JOBS_FILE_DA = JOBS_PARQUET_DIR_DA if is_staging_fresh(JOBS_PARQUET_DIR_DA, CRAWL_OUTPUT_DA) else CRAWL_OUTPUT_DA
+
+# 建模用到的原始列（从暂存库加载时只读这些列）
+MODEL_COLUMNS = [
+    'job_id', 'job_name', 'job_catory', 'job_industry', 'high_month_pay', 'low_month_pay',
+    'company_name', 'area_code_name', 'company_scale', 'degree_name', 'major_required',
+    'company_property', 'company_tags', 'head_count',
+]
 
 MODELS_DIR = os.path.join(data_analysis_dir, 'models')
 os.makedirs(MODELS_DIR, exist_ok=True)
@@ -590,7 +611,14 @@ def load_and_clean_data(file_path=JOBS_FILE_DA):
         return pd.DataFrame()
     
     try:
-        if file_path.endswith('.jsonl'):
+        if is_staging_dir(file_path):
+            df = read_jobs(file_path, columns=MODEL_COLUMNS)
+        elif os.path.isdir(file_path):
+            # 分片目录：逐条读取，只保留建模需要的列
+            df = pd.DataFrame.from_records(
+                ({col: job.get(col) for col in MODEL_COLUMNS} for job in iter_job_records(file_path)),
+                columns=MODEL_COLUMNS)
+        elif file_path.endswith('.jsonl'):
             df = pd.read_json(file_path, lines=True, encoding='utf-8')
         elif file_path.endswith('.json'):
             df = pd.read_json(file_path, encoding='utf-8')
@@ -4,4 +4,71 @@ CREATE TABLE IF NOT EXISTS tech_heat (
     skill        VARCHAR(40) PRIMARY KEY,
     heat         INT         NOT NULL DEFAULT 0,
     updated_at   DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- 爬虫 MySQLJobPipeline 批量写入的原始岗位表（job_id 去重，重复抓取时更新）
+CREATE TABLE IF NOT EXISTS raw_jobs (
+    job_id               VARCHAR(64)   PRIMARY KEY,
+    job_name             VARCHAR(255),
+    job_catory           VARCHAR(100),
+    job_industry         VARCHAR(100),
+    high_month_pay       DECIMAL(10,2),
+    low_month_pay        DECIMAL(10,2),
+    update_date          BIGINT,
+    publish_date         BIGINT,
+    head_count           VARCHAR(20),
+    member_level         VARCHAR(20),
+    recruit_type         VARCHAR(20),
+    degree_name          VARCHAR(50),
+    company_name         VARCHAR(255),
+    company_logo         VARCHAR(500),
+    area_code_name       VARCHAR(100),
+    prinvce_code_nme     VARCHAR(100),
+    company_scale        VARCHAR(50),
+    sort_priority        VARCHAR(20),
+    sources_name_ch      VARCHAR(100),
+    sources_type         VARCHAR(20),
+    company_tags         TEXT,
+    major_required       TEXT,
+    company_property     VARCHAR(100),
+    user_type            VARCHAR(20),
+    company_id           VARCHAR(64),
+    key_units            VARCHAR(100),
+    sources_name         VARCHAR(100),
+    description          TEXT,
+    search_area_code     VARCHAR(20),
+    search_area_name     VARCHAR(100),
+    search_keyword       VARCHAR(100),
+    search_category_code VARCHAR(20),
+    search_industry_code VARCHAR(20),
+    source_url           TEXT,
+    change_type          VARCHAR(10),
+    crawled_at           DATETIME      NOT NULL,
+    KEY idx_raw_jobs_update_date (update_date),
+    KEY idx_raw_jobs_crawled_at (crawled_at)
+);
+
+-- 数仓ETL（crawler/run_etl.py）加载的ADS层岗位表，ETL运行时也会自动创建
+CREATE TABLE IF NOT EXISTS recruitment_jobs (
+    job_id             VARCHAR(64)   PRIMARY KEY,
+    job_name           VARCHAR(255),
+    job_catory         VARCHAR(100),
+    low_salary_k       DECIMAL(5,1),
+    high_salary_k      DECIMAL(5,1),
+    company_name       VARCHAR(255),
+    company_scale      VARCHAR(50),
+    company_property   VARCHAR(100),
+    company_tags       TEXT,
+    province           VARCHAR(100),
+    city               VARCHAR(100),
+    degree_requirement VARCHAR(50),
+    major_requirement  TEXT,
+    publish_date       DATETIME,
+    update_date        DATETIME      NOT NULL,
+    data_source        VARCHAR(100),
+    recruit_type       VARCHAR(20),
+    member_level       VARCHAR(20),
+    key_units          VARCHAR(20),
+    job_industry       VARCHAR(100),
+    KEY idx_recruitment_jobs_update_date (update_date)
+);
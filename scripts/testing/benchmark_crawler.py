@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+爬虫吞吐基准测试：对本地模拟接口跑完整的 jobs 爬虫，报告 items/s、每条岗位的CPU时间与内存峰值
+位置: scripts/testing/benchmark_crawler.py
+使用方法:
+    python scripts/testing/benchmark_crawler.py
+    python scripts/testing/benchmark_crawler.py --cities 10 --concurrency 32 --latency 50 --rate-429 0.02
+    python scripts/testing/benchmark_crawler.py --output bench.json --baseline bench_main.json
+
+模拟服务在本进程的后台线程中运行，爬虫是独立的 scrapy 子进程，CPU/内存只统计子进程。
+代理池、去重、断点、MySQL 入库全部关闭，输出/统计/遥测写入临时目录，不影响正式数据。
+指定 --baseline 时与上次结果比较，items/s 下降或每条CPU时间上升超过 --tolerance 则返回非零退出码。
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from mock_24365_server import add_server_arguments, server_from_args
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+CRAWLER_ROOT = os.path.join(PROJECT_ROOT, 'crawler')
+OPTIONS_FILE = os.path.join(CRAWLER_ROOT, 'crawler', 'data', 'target_options.json')
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def pick_targets(cities, categories, industries):
+    """从 target_options.json 取前 N 个城市/类别/行业，决定本次压测的查询组合数"""
+    with open(OPTIONS_FILE, 'r', encoding='utf-8') as f:
+        options = json.load(f)
+    return (options.get('citys', [])[:cities],
+            options.get('jobcategoryItems', [])[:categories],
+            options.get('industriesNew', [])[:industries])
+
+
+def crawl_command(base_url, detail_url_template, work_dir, args):
+    city_list, category_list, industry_list = pick_targets(args.cities, args.categories, args.industries)
+    settings = {
+        'PROXY_POOL_ENABLED': 0,
+        'DEDUP_ENABLED': 0,
+        'JOBS_FRONTIER_ENABLED': 0,
+        'MYSQL_PIPELINE_ENABLED': 0,
+        'HTTPCACHE_ENABLED': 0,
+        'DOWNLOAD_DELAY': 0,
+        'CONCURRENT_REQUESTS': args.concurrency,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': args.concurrency,
+        'JOBS_OUTPUT_DIR': os.path.join(work_dir, 'jobs_shards'),
+        'JOBS_STATS_FILE': os.path.join(work_dir, 'stats.json'),
+        'JOBS_WATERMARK_DB': os.path.join(work_dir, 'watermarks.sqlite'),
+        # 压测数据不能进入正式遥测目录，否则会影响按历史产出排序
+        'TELEMETRY_DIR': os.path.join(work_dir, 'telemetry'),
+        'LOG_FILE': os.path.join(work_dir, 'crawl.log'),
+        'LOG_LEVEL': args.log_level,
+    }
+    if args.details:
+        settings.update({
+            'JOBS_DETAIL_ENABLED': 1,
+            'JOBS_DETAIL_URL': detail_url_template,
+            'JOBS_DETAIL_CACHE_DB': os.path.join(work_dir, 'job_details.sqlite'),
+        })
+    settings.update(dict(item.split('=', 1) for item in args.settings))
+
+    cmd = [sys.executable, '-m', 'scrapy', 'crawl', 'jobs',
+           '-a', f'base_url={base_url}',
+           '-a', f'target_cities_json={json.dumps(city_list, ensure_ascii=False)}',
+           '-a', f'target_categories_json={json.dumps(category_list, ensure_ascii=False)}',
+           '-a', f'target_industries_json={json.dumps(industry_list, ensure_ascii=False)}']
+    for arg in args.spider_args:
+        cmd += ['-a', arg]
+    for name, value in settings.items():
+        cmd += ['-s', f'{name}={value}']
+    return cmd
+
+
+def children_cpu_seconds():
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def children_max_rss_mb():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def run_crawl(cmd):
+    """运行爬虫子进程，返回 (返回码, 耗时秒, CPU秒, 内存峰值MB)"""
+    cpu_before = children_cpu_seconds()
+    started = time.perf_counter()
+    process = subprocess.Popen(cmd, cwd=CRAWLER_ROOT)
+
+    # Windows 下 os.times 不含子进程时间、也没有 resource 模块，安装了 psutil 时轮询采样
+    sampled_cpu, sampled_rss = None, None
+    if resource is None and psutil is not None:
+        try:
+            proc = psutil.Process(process.pid)
+            while process.poll() is None:
+                cpu_times = proc.cpu_times()
+                sampled_cpu = cpu_times.user + cpu_times.system
+                sampled_rss = max(sampled_rss or 0, proc.memory_info().rss / (1024 * 1024))
+                time.sleep(0.2)
+        except psutil.Error:
+            pass
+
+    returncode = process.wait()
+    elapsed = time.perf_counter() - started
+    cpu_seconds = children_cpu_seconds() - cpu_before
+    if resource is None:
+        cpu_seconds = sampled_cpu
+    return returncode, elapsed, cpu_seconds, children_max_rss_mb() or sampled_rss
+
+
+def compare_with_baseline(result, baseline, tolerance):
+    """返回回退项列表；吞吐越高越好，每条CPU时间越低越好"""
+    regressions = []
+    if baseline.get('items_per_second') and result['items_per_second'] < baseline['items_per_second'] * (1 - tolerance):
+        regressions.append(f"items/s {baseline['items_per_second']:.1f} -> {result['items_per_second']:.1f}")
+    if baseline.get('cpu_ms_per_item') and result.get('cpu_ms_per_item') \
+            and result['cpu_ms_per_item'] > baseline['cpu_ms_per_item'] * (1 + tolerance):
+        regressions.append(f"CPU/item {baseline['cpu_ms_per_item']:.3f}ms -> {result['cpu_ms_per_item']:.3f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对本地模拟接口运行 jobs 爬虫并报告吞吐、CPU、内存")
+    add_server_arguments(parser)
+    parser.add_argument('--cities', type=int, default=5, help="城市数（取 target_options.json 前 N 个）")
+    parser.add_argument('--categories', type=int, default=4, help="职位类别数")
+    parser.add_argument('--industries', type=int, default=3, help="行业数")
+    parser.add_argument('--concurrency', type=int, default=16, help="CONCURRENT_REQUESTS")
+    parser.add_argument('--details', action='store_true', help="同时启用岗位详情补全（JobDetailPipeline）")
+    parser.add_argument('--log-level', default='INFO', help="爬虫日志级别（日志量本身也计入CPU开销）")
+    parser.add_argument('-a', dest='spider_args', action='append', default=[], help="额外的爬虫参数 NAME=VALUE")
+    parser.add_argument('-s', dest='settings', action='append', default=[], help="额外的Scrapy配置 NAME=VALUE")
+    parser.add_argument('--work-dir', default=None, help="保留输出与日志的目录（默认临时目录，结束后删除）")
+    parser.add_argument('--output', default=None, help="把结果写入JSON文件，可作为之后的 --baseline")
+    parser.add_argument('--baseline', default=None, help="上次的结果JSON，用于判断性能回退")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="允许的相对回退幅度")
+    args = parser.parse_args()
+
+    print("⏱️  爬虫吞吐基准测试")
+    print("-" * 50)
+
+    server = server_from_args(args)
+    server_thread = threading.Thread(target=server.serve_forever, name='mock-24365', daemon=True)
+    server_thread.start()
+    print(f"模拟接口: {server.base_url}")
+    print(f"查询组合: {args.cities} 城市 × {args.categories} 类别 × {args.industries} 行业，并发 {args.concurrency}")
+
+    temp_dir = None
+    work_dir = args.work_dir
+    if work_dir is None:
+        temp_dir = tempfile.TemporaryDirectory(prefix='crawler-bench-')
+        work_dir = temp_dir.name
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        returncode, elapsed, cpu_seconds, max_rss_mb = run_crawl(crawl_command(server.base_url, server.detail_url_template, work_dir, args))
+        stats = {}
+        stats_file = os.path.join(work_dir, 'stats.json')
+        if os.path.exists(stats_file):
+            with open(stats_file, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+    finally:
+        server.shutdown()
+        server.server_close()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    items = stats.get('item_scraped_count', 0)
+    if not max_rss_mb and stats.get('memusage/max'):
+        max_rss_mb = stats['memusage/max'] / (1024 * 1024)  # Scrapy MemoryUsage 扩展的记录
+    result = {
+        'returncode': returncode,
+        'elapsed_seconds': round(elapsed, 3),
+        'items': items,
+        'requests': stats.get('downloader/request_count', 0),
+        'retries': stats.get('retry/count', 0),
+        'server_counters': dict(server.counters),
+        'items_per_second': round(items / elapsed, 2) if elapsed else 0,
+        'cpu_seconds': round(cpu_seconds, 3) if cpu_seconds is not None else None,
+        'cpu_ms_per_item': round(cpu_seconds * 1000 / items, 4) if cpu_seconds is not None and items else None,
+        'max_rss_mb': round(max_rss_mb, 1) if max_rss_mb else None,
+        'config': {name: getattr(args, name) for name in (
+            'cities', 'categories', 'industries', 'concurrency', 'max_results', 'latency', 'jitter',
+            'error_rate', 'rate_429', 'replay', 'details')},
+    }
+
+    print(f"\n返回码: {returncode}")
+    print(f"耗时: {result['elapsed_seconds']} s，请求 {result['requests']}（重试 {result['retries']}），岗位 {items}")
+    print(f"服务端: {result['server_counters']}")
+    print(f"📈 吞吐: {result['items_per_second']} items/s")
+    if result['cpu_ms_per_item'] is not None:
+        print(f"🧮 CPU: {result['cpu_seconds']} s，每条 {result['cpu_ms_per_item']} ms")
+    else:
+        print("🧮 CPU: 当前平台无法统计子进程CPU时间（Windows 下可 pip install psutil）")
+    print(f"💾 内存峰值: {result['max_rss_mb']} MB" if result['max_rss_mb'] else "💾 内存峰值: 无法统计")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if returncode != 0 or not items:
+        print("❌ 爬虫未正常完成或没有产出岗位，日志见 crawl.log（使用 --work-dir 保留）")
+        return 1
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ 相对基线性能回退超过 {args.tolerance:.0%}: " + "；".join(regressions))
+            return 1
+        print(f"✅ 未发现超过 {args.tolerance:.0%} 的性能回退")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
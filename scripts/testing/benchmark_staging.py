@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+暂存库加载基准测试：同一批岗位分别从 JSON 与 Parquet 暂存库加载为 DataFrame，比较耗时与内存峰值
+位置: scripts/testing/benchmark_staging.py
+使用方法:
+    python scripts/testing/benchmark_staging.py
+    python scripts/testing/benchmark_staging.py --records 500000 --source crawler/crawler/data/jobs.json
+
+把样本数据重复到 --records 条（job_id 加序号），写成临时 JSON 文件并构建临时暂存库，不影响正式数据。
+对比四种加载方式：pd.read_json 全量、暂存库全部列、暂存库按看板所需列投影、再加上按省份裁剪分区。
+每种方式在独立子进程中加载，内存峰值为子进程的最大RSS（含 pyarrow 的列式缓冲区）。
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import cycle, islice
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, PROJECT_ROOT)
+
+import pandas as pd
+
+from crawler.crawler.feeds import iter_job_records
+from crawler.crawler.staging import build_staging, read_jobs
+
+DEFAULT_SOURCE = os.path.join(PROJECT_ROOT, 'crawler', 'crawler', 'data', 'sampled_jobs.json')
+
+# 与 streamlit_app/utils.py 的 DASHBOARD_COLUMNS 一致（不导入 streamlit）
+DASHBOARD_COLUMNS = [
+    'job_id', 'job_name', 'job_catory', 'job_industry', 'high_month_pay', 'low_month_pay',
+    'publish_date', 'update_date', 'company_name', 'area_code_name', 'prinvce_code_nme',
+    'search_area_name', 'company_scale', 'degree_name', 'major_required', 'company_property',
+    'company_tags', 'source_url', 'head_count',
+]
+
+
+def synthetic_records(source, count):
+    samples = list(iter_job_records(source))
+    for i, record in enumerate(islice(cycle(samples), count)):
+        yield dict(record, job_id=f"{record.get('job_id')}-{i}")
+
+
+def load(mode, path, province):
+    if mode == 'json':
+        return pd.read_json(path, encoding='utf-8')
+    if mode == 'all':
+        return read_jobs(path)
+    if mode == 'columns':
+        return read_jobs(path, columns=DASHBOARD_COLUMNS)
+    return read_jobs(path, columns=DASHBOARD_COLUMNS, provinces=[province])
+
+
+def measure_in_child(mode, path, province):
+    """子进程入口：加载一次并输出耗时、行列数、最大RSS"""
+    started = time.perf_counter()
+    df = load(mode, path, province)
+    seconds = time.perf_counter() - started
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': seconds, 'rows': len(df), 'columns': len(df.columns),
+                      'rss_mb': max_rss / 1024 if sys.platform != 'darwin' else max_rss / 1024 / 1024,
+                      'frame_mb': df.memory_usage(deep=True).sum() / 1024 / 1024}))
+
+
+def measure(label, mode, path, province):
+    output = subprocess.run([sys.executable, __file__, '--measure', mode, path, '--province', province],
+                            check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(f"  {label}: {result['rows']} 行 × {result['columns']} 列，{result['seconds']:.2f} 秒，"
+          f"内存峰值 {result['rss_mb']:.0f} MB，DataFrame {result['frame_mb']:.0f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较 JSON 与 Parquet 暂存库的加载耗时和内存")
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help="样本数据（JSON数组/JSONL/分片目录）")
+    parser.add_argument('--records', type=int, default=200_000, help="测试数据条数")
+    parser.add_argument('--province', default='北京市', help="分区裁剪测试使用的省份")
+    parser.add_argument('--measure', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure_in_child(*args.measure, args.province)
+        return 0
+
+    print("📦 暂存库加载基准测试")
+    print("-" * 50)
+    with tempfile.TemporaryDirectory(prefix='staging-bench-') as work_dir:
+        json_path = os.path.join(work_dir, 'jobs.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(list(synthetic_records(args.source, args.records)), f, ensure_ascii=False)
+        staging_dir = os.path.join(work_dir, 'jobs_parquet')
+        info = build_staging(iter_job_records(json_path), staging_dir)
+        print(f"  测试数据：{info['records']} 条，JSON {os.path.getsize(json_path) / 1024 / 1024:.1f} MB，"
+              f"{len(info['partitions'])} 个分区，转换 {info['seconds']} 秒\n")
+
+        baseline = measure("JSON（pd.read_json）", 'json', json_path, args.province)
+        results = [
+            ("暂存库全部列", measure("暂存库全部列", 'all', staging_dir, args.province)),
+            ("暂存库看板列", measure("暂存库看板列", 'columns', staging_dir, args.province)),
+            ("看板列+省份裁剪", measure(f"看板列+省份裁剪（{args.province}）", 'province', staging_dir, args.province)),
+        ]
+
+    print(f"\n⏱️ 相对 JSON 的提升")
+    print("-" * 50)
+    for label, result in results:
+        print(f"  {label}: 耗时 {baseline['seconds'] / max(result['seconds'], 1e-9):.1f}x，"
+              f"内存峰值 {baseline['rss_mb'] / max(result['rss_mb'], 1e-9):.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
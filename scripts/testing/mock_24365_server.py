@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+24365 岗位列表接口的本地模拟服务
+位置: scripts/testing/mock_24365_server.py
+使用方法:
+    python scripts/testing/mock_24365_server.py --port 8365
+    python scripts/testing/mock_24365_server.py --latency 200 --jitter 100 --error-rate 0.02 --rate-429 0.05
+    python scripts/testing/mock_24365_server.py --replay crawler/crawler/data/sampled_jobs.json
+
+返回与真实接口相同的结构 {flag, data: {list, pagenation: {total}}}（total 为总页数），
+岗位字段使用接口原生命名（jobId、jobName、recName ...）。数据来源二选一：
+  - 合成数据（默认）：按查询参数确定性生成，同一查询每次返回相同的岗位
+  - 录制数据（--replay）：JSONL 分片目录或 JSON 数组文件（如 sampled_jobs.json），按爬取时的查询参数分组回放
+爬虫指向本服务：scrapy crawl jobs -a base_url=http://127.0.0.1:8365/student/jobs/jobslist/ajax/
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from crawler.crawler.feeds import iter_job_records
+
+API_PATH = '/student/jobs/jobslist/ajax/'
+DETAIL_PATH = re.compile(r'^/student/jobs/(?P<job_id>[^/]+)/detail\.html$')  # 岗位详情页（JobDetailPipeline）
+
+# 接口原生字段 -> 爬虫输出字段（与 JobsSpider.parse_job_list 的映射一致），回放录制数据时反向还原
+API_FIELDS = {
+    'jobId': 'job_id', 'jobName': 'job_name', 'highMonthPay': 'high_month_pay', 'lowMonthPay': 'low_month_pay',
+    'updateDate': 'update_date', 'publishDate': 'publish_date', 'headCount': 'head_count',
+    'memberLevel': 'member_level', 'recruitType': 'recruit_type', 'degreeName': 'degree_name',
+    'recName': 'company_name', 'recLogo': 'company_logo', 'areaCodeName': 'area_code_name',
+    'recScale': 'company_scale', 'sortPriority': 'sort_priority', 'sourcesNameCh': 'sources_name_ch',
+    'sourcesType': 'sources_type', 'recTags': 'company_tags', 'major': 'major_required',
+    'recProperty': 'company_property', 'userType': 'user_type', 'recId': 'company_id',
+    'keyUnits': 'key_units', 'sourcesName': 'sources_name',
+}
+
+JOB_TITLES = ['Java开发工程师', 'Python开发工程师', '前端开发工程师', '数据分析师', '算法工程师', '测试工程师',
+              '运维工程师', '产品经理', '销售代表', '行政专员', '会计', '教师', '机械工程师', '电气工程师']
+DEGREES = ['不限', '大专及以上', '本科及以上', '硕士及以上']
+SCALES = ['50人以下', '50-150人', '150-500人', '500-1000人', '1000-5000人', '5000以上']
+PROPERTIES = ['民营企业', '国有企业', '外资企业', '事业单位']
+SOURCES = ['智联招聘', '前程无忧', '猎聘', '24365校园招聘']
+SKILLS = ['Java', 'Python', 'SQL', 'Linux', 'Vue', 'React', 'Spring Boot', 'MySQL', 'Redis', 'Docker',
+          'Excel', 'CAD', 'PLC', '沟通能力', '团队协作']
+
+
+def detail_html(job_id, description=None):
+    """详情页HTML；没有录制描述时按 job_id 确定性生成任职要求"""
+    if description is None:
+        rng = random.Random(job_id)
+        skills = '、'.join(rng.sample(SKILLS, 4))
+        description = f"岗位职责：参与公司核心业务的开发与维护。\n任职要求：熟悉 {skills}，{rng.choice(DEGREES)}学历。"
+    paragraphs = ''.join(f'<p>{line}</p>' for line in description.split('\n'))
+    return f'<html><body><div class="details">{paragraphs}</div></body></html>'
+
+
+def query_key(params):
+    """与爬虫的查询组合维度一致：地区、关键词、类别、行业"""
+    return (params.get('areaCode', ''), params.get('jobName', ''),
+            params.get('categoryCode', ''), params.get('industrySectors', ''))
+
+
+class SyntheticJobs:
+    """按查询参数确定性生成岗位：结果数由查询key的哈希决定，岗位按发布时间倒序"""
+
+    def __init__(self, max_results=200, empty_ratio=0.2):
+        self.max_results = max_results
+        self.empty_ratio = empty_ratio
+        self.base_time_ms = int(time.time() // 86400 * 86400 * 1000)  # 当天零点，保证同一天内数据不变
+
+    def total_results(self, key):
+        seed = zlib.crc32('|'.join(key).encode('utf-8'))
+        if (seed % 1000) / 1000 < self.empty_ratio:
+            return 0
+        return seed % (self.max_results + 1)
+
+    def make_job(self, key, index):
+        rng = random.Random(f"{'|'.join(key)}#{index}")
+        low_pay = rng.randint(3, 15)
+        publish_ms = self.base_time_ms - index * 3600 * 1000 - rng.randint(0, 3599) * 1000
+        company_id = f"rec{rng.randint(1, 5000):05d}"
+        return {
+            'jobId': f"mock{zlib.crc32('|'.join(key).encode('utf-8')):08x}{index:06d}",
+            'jobName': key[1] or rng.choice(JOB_TITLES),
+            'highMonthPay': float(low_pay + rng.randint(0, 10)),
+            'lowMonthPay': float(low_pay),
+            'updateDate': publish_ms + rng.randint(0, 3600) * 1000,
+            'publishDate': publish_ms,
+            'headCount': rng.randint(1, 20),
+            'memberLevel': '0',
+            'recruitType': str(rng.randint(0, 1)),
+            'degreeName': rng.choice(DEGREES),
+            'recName': f"模拟公司{company_id}",
+            'recLogo': '',
+            'areaCodeName': key[0] or '全国',
+            'recScale': rng.choice(SCALES),
+            'sortPriority': 0,
+            'sourcesNameCh': rng.choice(SOURCES),
+            'sourcesType': '0',
+            'recTags': None,
+            'major': '',
+            'recProperty': rng.choice(PROPERTIES),
+            'userType': '11',
+            'recId': company_id,
+            'keyUnits': '0',
+            'sourcesName': f"src{rng.randint(1, 50)}",
+        }
+
+    def description(self, job_id):
+        return None
+
+    def page(self, key, offset, limit):
+        total = self.total_results(key)
+        start = (offset - 1) * limit
+        jobs = [self.make_job(key, index) for index in range(start, min(start + limit, total))]
+        return jobs, math.ceil(total / limit)
+
+
+class RecordedJobs:
+    """回放录制的岗位数据（爬虫输出格式），按查询参数分组后分页"""
+
+    def __init__(self, path):
+        records = iter_job_records(path)
+        self.groups = {}
+        self.descriptions = {}
+        for record in records:
+            if record.get('description'):
+                self.descriptions[record.get('job_id')] = record['description']
+            key = (record.get('search_area_code') or '', record.get('search_keyword') or '',
+                   record.get('search_category_code') or '', record.get('search_industry_code') or '')
+            job = {api_name: record.get(field) for api_name, field in API_FIELDS.items()}
+            self.groups.setdefault(key, []).append(job)
+        for jobs in self.groups.values():
+            jobs.sort(key=lambda job: job.get('publishDate') or 0, reverse=True)
+
+    def __len__(self):
+        return sum(len(jobs) for jobs in self.groups.values())
+
+    def description(self, job_id):
+        return self.descriptions.get(job_id)
+
+    def page(self, key, offset, limit):
+        jobs = self.groups.get(key, [])
+        start = (offset - 1) * limit
+        return jobs[start:start + limit], math.ceil(len(jobs) / limit)
+
+
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, source, latency=0.0, jitter=0.0, error_rate=0.0, rate_429=0.0, verbose=False):
+        super().__init__(address, MockApiHandler)
+        self.source = source
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'ok': 0, 'errors': 0, 'throttled': 0, 'jobs': 0, 'details': 0}
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    @property
+    def detail_url_template(self):
+        """供 JOBS_DETAIL_URL 使用的详情页地址模板"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/student/jobs/{{job_id}}/detail.html"
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        server.count('requests')
+        parts = urlsplit(self.path)
+        detail_match = DETAIL_PATH.match(parts.path)
+        if parts.path.rstrip('/') != API_PATH.rstrip('/') and detail_match is None:
+            self._send_json(404, {'flag': False, 'errors': 'not found'})
+            return
+
+        delay = server.latency + random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < server.rate_429:
+            server.count('throttled')
+            self._send_json(429, {'flag': False, 'errors': '请求过于频繁'}, headers={'Retry-After': '1'})
+            return
+        if roll < server.rate_429 + server.error_rate:
+            server.count('errors')
+            self._send_json(500, {'flag': False, 'errors': '服务器内部错误'})
+            return
+
+        if detail_match is not None:
+            job_id = detail_match.group('job_id')
+            server.count('details')
+            self._send_html(200, detail_html(job_id, server.source.description(job_id)))
+            return
+
+        params = {name: values[0] for name, values in parse_qs(parts.query, keep_blank_values=True).items()}
+        try:
+            offset = max(1, int(params.get('offset') or 1))
+            limit = max(1, int(params.get('limit') or 20))
+        except ValueError:
+            self._send_json(200, {'flag': False, 'errors': 'offset/limit 参数错误'})
+            return
+
+        jobs, total_pages = server.source.page(query_key(params), offset, limit)
+        server.count('ok')
+        server.count('jobs', len(jobs))
+        self._send_json(200, {
+            'flag': True,
+            'data': {
+                'list': jobs,
+                'pagenation': {'total': total_pages, 'offset': offset, 'limit': limit},
+            },
+        })
+
+    def _send_json(self, status, payload, headers=None):
+        self._send_body(status, json.dumps(payload, ensure_ascii=False), 'application/json;charset=UTF-8', headers)
+
+    def _send_html(self, status, html):
+        self._send_body(status, html, 'text/html;charset=UTF-8')
+
+    def _send_body(self, status, text, content_type, headers=None):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def build_server(host='127.0.0.1', port=0, replay=None, max_results=200, empty_ratio=0.2,
+                 latency_ms=0, jitter_ms=0, error_rate=0.0, rate_429=0.0, verbose=False):
+    """创建模拟服务（port=0 时自动分配端口），调用方负责 serve_forever / shutdown"""
+    source = RecordedJobs(replay) if replay else SyntheticJobs(max_results, empty_ratio)
+    return MockApiServer((host, port), source, latency=latency_ms / 1000, jitter=jitter_ms / 1000,
+                         error_rate=error_rate, rate_429=rate_429, verbose=verbose)
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址")
+    parser.add_argument('--replay', default=None, help="回放录制数据：JSONL分片目录或JSON数组文件")
+    parser.add_argument('--max-results', type=int, default=200, help="合成数据：单个查询的最大结果数")
+    parser.add_argument('--empty-ratio', type=float, default=0.2, help="合成数据：无结果查询的比例")
+    parser.add_argument('--latency', type=float, default=0, help="每个响应的平均延迟（毫秒）")
+    parser.add_argument('--jitter', type=float, default=0, help="延迟的随机浮动范围（毫秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回 HTTP 500 的概率")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="返回 HTTP 429 的概率")
+
+
+def server_from_args(args, port=0, verbose=False):
+    return build_server(args.host, port, args.replay, args.max_results, args.empty_ratio,
+                        args.latency, args.jitter, args.error_rate, args.rate_429, verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="24365 岗位列表接口的本地模拟服务")
+    add_server_arguments(parser)
+    parser.add_argument('--port', type=int, default=8365, help="监听端口")
+    parser.add_argument('--verbose', action='store_true', help="打印每个请求的访问日志")
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.port, args.verbose)
+    if isinstance(server.source, RecordedJobs):
+        print(f"📼 回放 {len(server.source)} 条录制岗位（{len(server.source.groups)} 个查询组合）")
+    print(f"🚀 模拟接口已启动: {server.base_url}")
+    print(f"   延迟 {args.latency}±{args.jitter} ms，500 概率 {args.error_rate}，429 概率 {args.rate_429}")
+    print(f"   爬虫使用: scrapy crawl jobs -a base_url={server.base_url}")
+    print(f"   详情页: -s JOBS_DETAIL_ENABLED=1 -s JOBS_DETAIL_URL={server.detail_url_template}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 请求统计: {server.counters}")
+
+
+if __name__ == '__main__':
+    main()
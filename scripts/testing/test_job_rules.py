@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+职位规则一致性测试与性能对比
+位置: scripts/testing/test_job_rules.py
+使用方法: python scripts/testing/test_job_rules.py [数据文件] [--repeat N]
+
+用 job_rules 中编译后的规则与 filter_it_jobs / import_crawler_data_v2 中逐条判断的函数
+跑同一批职位（样本数据 + 人工构造的边界名称 + 关键词片段随机拼接的名称），结果必须完全一致；再对比两者的耗时。
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# 添加项目根目录与 backend 目录到路径
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'backend'))
+
+import filter_it_jobs
+import import_crawler_data_v2
+from crawler.crawler.feeds import iter_job_records
+import job_rules
+from job_rules import CAREER_CLASSIFIER, FILTER_IT_JOB, IMPORT_IT_JOB, IT_JOB_CLASSIFIER
+
+DEFAULT_DATA_FILE = os.path.join(PROJECT_ROOT, 'crawler', 'crawler', 'data', 'sampled_jobs.json')
+
+# 关键词重叠、大小写、排除词与IT词同时出现等边界情况
+EDGE_NAMES = [
+    'Java开发工程师', 'JAVA后端开发', 'web前端开发（Vue）', 'React Native开发', 'Go语言开发',
+    'Python数据分析师', '大数据工程师', 'AI工程师', 'UI设计师', 'UX交互设计', 'ui', 'PM',
+    '软件测试工程师', 'QA工程师', 'DevOps工程师', 'SRE', 'DBA', '数据库管理员', '系统架构师',
+    '技术支持工程师', '销售工程师', '软件销售', 'IT运维', '网络运维', '嵌入式开发（单片机）',
+    'FPGA工程师', 'PCB设计', '产品经理', '项目专员', '储备干部', '会计', 'HR专员', 'golang',
+    'c#开发', 'C++', 'linux运维', 'Kubernetes', '教育产品经理', '数据录入员', '   ', '',
+]
+EDGE_CATEGORIES = ['', '计算机/互联网', 'IT服务', 'it服务', '电子/半导体', '教育', None]
+FUZZ_COUNT = 5000  # 随机拼接关键词片段生成的名称数（关键词互相重叠、前后缀交错的情况）
+
+
+def fuzz_names(count, seed=0):
+    """把各规则的关键词切成片段随机拼接，覆盖自动机失配跳转的各种路径"""
+    keywords = [keyword for name in dir(job_rules) if name.endswith('_KEYWORDS')
+                for keyword in getattr(job_rules, name)]
+    keywords += [keyword for name in ('CAREER_RULES', 'IT_JOB_RULES', 'IT_JOB_FALLBACK_RULES')
+                 for _, group in getattr(job_rules, name) for keyword in group]
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            keyword = rng.choice(keywords)
+            start = rng.randint(0, len(keyword) - 1)
+            parts.append(keyword[start:rng.randint(start + 1, len(keyword))])
+            if rng.random() < 0.3:
+                parts.append(rng.choice('（）/ -xX岗位'))
+        name = ''.join(parts)
+        names.append(name.upper() if rng.random() < 0.2 else name)
+    return names
+
+
+def load_jobs(data_file):
+    jobs = []
+    for job in iter_job_records(data_file):
+        jobs.append((job.get('job_name', job.get('title', '')) or '',
+                     job.get('job_catory', job.get('job_category', '')) or ''))
+    for name in EDGE_NAMES:
+        for category in EDGE_CATEGORIES:
+            jobs.append((name, category))
+    rng = random.Random(1)
+    for name in fuzz_names(FUZZ_COUNT):
+        jobs.append((name, rng.choice(EDGE_CATEGORIES) or ''))
+    return jobs
+
+
+def check(label, reference, compiled, inputs):
+    mismatches = [(args, reference(*args), compiled(*args)) for args in inputs if reference(*args) != compiled(*args)]
+    if mismatches:
+        print(f"❌ {label}: {len(mismatches)} 处不一致")
+        for args, expected, actual in mismatches[:10]:
+            print(f"   {args}: 原函数={expected!r}, 编译规则={actual!r}")
+        return False
+    print(f"✅ {label}: {len(inputs)} 条结果一致")
+    return True
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="职位规则一致性测试与性能对比")
+    parser.add_argument('data_file', nargs='?', default=DEFAULT_DATA_FILE, help="职位数据（JSON数组/JSONL/分片目录）")
+    parser.add_argument('--repeat', type=int, default=5, help="性能对比重复次数")
+    args = parser.parse_args()
+
+    print("🧪 职位规则一致性测试")
+    print("-" * 50)
+    jobs = load_jobs(args.data_file)
+    names = [(name,) for name, _ in jobs if name]
+    ok = all([
+        check("filter_it_jobs.is_it_job", filter_it_jobs.is_it_job, FILTER_IT_JOB.is_it_job, jobs),
+        check("filter_it_jobs.classify_it_job", filter_it_jobs.classify_it_job, IT_JOB_CLASSIFIER.match,
+              [(name,) for name, _ in jobs]),
+        check("import_crawler_data_v2.is_it_job_simple", import_crawler_data_v2.is_it_job_simple,
+              IMPORT_IT_JOB.is_it_job, jobs),
+        check("import_crawler_data_v2.classify_it_job", import_crawler_data_v2.classify_it_job,
+              CAREER_CLASSIFIER.match, names),
+    ])
+    job_names = [name for name, _ in jobs]
+    categories = [category for _, category in jobs]
+    ok &= check("FILTER_IT_JOB.is_it_job_many（批量）", lambda: [filter_it_jobs.is_it_job(*job) for job in jobs],
+                lambda: FILTER_IT_JOB.is_it_job_many(job_names, categories), [()])
+
+    print(f"\n⏱️ 性能对比（{len(jobs)} 条 × {args.repeat} 次，编译规则每轮清空缓存）")
+    print("-" * 50)
+    cases = [
+        ("IT职位筛选", lambda: [filter_it_jobs.is_it_job(*job) for job in jobs],
+         FILTER_IT_JOB.name_rules, lambda: FILTER_IT_JOB.is_it_job_many(job_names, categories)),
+        ("IT职位分类", lambda: [filter_it_jobs.classify_it_job(name) for name in job_names],
+         IT_JOB_CLASSIFIER, lambda: IT_JOB_CLASSIFIER.match_many(job_names)),
+        ("导入筛选", lambda: [import_crawler_data_v2.is_it_job_simple(*job) for job in jobs],
+         IMPORT_IT_JOB.name_rules, lambda: IMPORT_IT_JOB.is_it_job_many(job_names, categories)),
+        ("导入分类", lambda: [import_crawler_data_v2.classify_it_job(*name) for name in names],
+         CAREER_CLASSIFIER, lambda: CAREER_CLASSIFIER.match_many([name for name, in names])),
+    ]
+    for label, reference, rules, compiled in cases:
+        def compiled_cold():
+            rules.cache.clear()
+            compiled()
+        reference_seconds = timed(reference, args.repeat)
+        cold_seconds = timed(compiled_cold, args.repeat)
+        warm_seconds = timed(compiled, args.repeat)
+        print(f"  {label}: 原函数 {reference_seconds * 1000:.1f}ms，编译规则 {cold_seconds * 1000:.1f}ms"
+              f"（缓存命中 {warm_seconds * 1000:.1f}ms），加速 {reference_seconds / max(cold_seconds, 1e-9):.1f}x")
+
+    print("\n" + ("🎉 全部一致" if ok else "❌ 存在不一致"))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
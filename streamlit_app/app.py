@@ -1,7 +1,5 @@
 import sys
 import os
-import threading # 用于异步爬取
-import subprocess
 import json
 import time
 import pandas as pd
@@ -27,6 +25,7 @@ from streamlit_app.utils import (
     load_scrapy_default_targets,
     extract_skills_from_job_names # 确认这个函数是否仍然需要，或者使用在preprocess_jobs_data中生成的extracted_skills_list
 )
+from streamlit_app.crawl_service import RealtimeCrawl
 import plotly.express as px
 
 # --- 页面配置 ---
@@ -73,10 +72,10 @@ if 'realtime_crawl_message' not in st.session_state:
     st.session_state.realtime_crawl_message = ""
 if 'is_crawling' not in st.session_state:
     st.session_state.is_crawling = False
-if 'crawl_process_info' not in st.session_state:
-    st.session_state.crawl_process_info = None
-if 'crawl_output_file_path_session' not in st.session_state:
-    st.session_state.crawl_output_file_path_session = None
+if 'realtime_crawl' not in st.session_state:
+    st.session_state.realtime_crawl = None  # RealtimeCrawl：进行中的实时爬取
+if 'realtime_crawl_log' not in st.session_state:
+    st.session_state.realtime_crawl_log = ""
 
 # --- 侧边栏 (保持不变) ---
 st.sidebar.title("🧭 导航与状态") # Added Emoji
@@ -99,41 +98,10 @@ st.markdown("""
 """)
 st.divider()
 
-# --- 异步爬取函数 (保持不变) ---
-def run_scrapy_in_thread(scrapy_cmd_args_list, crawler_root_path, output_file_abs_path_for_thread):
-    st.session_state.is_crawling = True
-    st.session_state.crawl_process_info = None
-    st.session_state.crawl_output_file_path_session = output_file_abs_path_for_thread
-    print(f"\n[{datetime.now()}] THREAD: Launching Scrapy command:")
-    print(f"Executing: {' '.join(scrapy_cmd_args_list)}")
-    print(f"In CWD: {crawler_root_path}")
-    print(f"Outputting Scrapy items to: {output_file_abs_path_for_thread}\n")
-    process = None
-    try:
-        process = subprocess.Popen(
-            scrapy_cmd_args_list, cwd=crawler_root_path,
-            stdout=None, stderr=subprocess.PIPE, text=True, encoding='utf-8', creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0 # Hides console window on Windows
-        )
-        try:
-            _, stderr_output = process.communicate(timeout=180) # 3 minutes timeout
-            returncode = process.returncode
-        except subprocess.TimeoutExpired:
-            print(f"[{datetime.now()}] THREAD: Scrapy process timed out. Terminating...")
-            process.terminate()
-            try: process.wait(timeout=10)
-            except subprocess.TimeoutExpired: process.kill()
-            returncode = -99 # Custom code for timeout
-            stderr_output = "爬取操作超时 (超过3分钟)。"
-        st.session_state.crawl_process_info = {'stderr': stderr_output, 'returncode': returncode}
-    except FileNotFoundError:
-        print(f"[{datetime.now()}] THREAD: Scrapy command not found.")
-        st.session_state.crawl_process_info = {'error_type': 'filenotfound', 'stderr': 'Scrapy 命令未找到。请确保 Scrapy 已安装并配置在系统路径中。'}
-    except Exception as e:
-        print(f"[{datetime.now()}] THREAD: Exception during Scrapy Popen/communicate: {e}")
-        st.session_state.crawl_process_info = {'error_type': 'exception', 'stderr': f'执行实时爬取时发生意外错误: {e}'}
-    finally:
-        st.session_state.is_crawling = False
-        st.rerun() # Trigger a rerun to update the UI
+# --- 实时爬取配置 ---
+REALTIME_CRAWL_TIMEOUT = 180  # 爬虫进程最长运行时间（秒），超时强制终止
+REALTIME_CRAWL_BUDGET = 150   # 传给爬虫的时间预算：到时按产出优先抓到的结果正常收尾，留出关闭时间
+REALTIME_REFRESH_SECONDS = 1  # 爬取进行中结果区的刷新间隔（秒）
 
 
 # --- 实时爬取模块 ---
@@ -221,12 +189,12 @@ with st.expander("展开进行实时爬取", expanded=True):
     if rt_submit_button:
         if not st.session_state.is_crawling:
             st.session_state.is_crawling = True
-            st.session_state.realtime_crawl_message = "⏳ 正在启动实时爬取，请稍候... (详细日志请查看终端)"
+            st.session_state.realtime_crawl_message = "⏳ 正在启动实时爬取，请稍候..."
             st.session_state.realtime_crawl_results_df = pd.DataFrame()
-            st.session_state.crawl_process_info = None
 
             # --- 构造 Scrapy 命令参数 ---
             scrapy_cmd_args = ['scrapy', 'crawl', 'jobs', '-a', f'run_type=realtime_app_home_v5'] # 更新 run_type 版本
+            scrapy_cmd_args.extend(['-a', f'time_budget={REALTIME_CRAWL_BUDGET}'])
 
             # 关键词
             if rt_keyword_input.strip(): 
@@ -281,141 +249,148 @@ with st.expander("展开进行实时爬取", expanded=True):
                 if prop_code is not None:
                     scrapy_cmd_args.extend(['-a', f'target_property_code={prop_code}'])
             
-            # --- 输出文件和执行线程 (与之前类似) ---
-            timestamp_str = str(int(time.time()))
-            REALTIME_OUTPUT_FILENAME = f"jobs_realtime_{timestamp_str}.jsonl"
-            REALTIME_OUTPUT_FILE_ABS_PATH = os.path.join(DATA_DIR_INSIDE_CRAWLER, REALTIME_OUTPUT_FILENAME)
-            
-            relative_output_path_for_scrapy_o = os.path.join('crawler', 'data', REALTIME_OUTPUT_FILENAME)
-            scrapy_cmd_args.extend(['-o', relative_output_path_for_scrapy_o, '-L', 'INFO'])
-            os.makedirs(os.path.dirname(REALTIME_OUTPUT_FILE_ABS_PATH), exist_ok=True)
-
-            CRAWLER_PROJECT_ROOT_APP = SCRAPY_PROJECT_ROOT
-
-            thread = threading.Thread(target=run_scrapy_in_thread, args=(scrapy_cmd_args, CRAWLER_PROJECT_ROOT_APP, REALTIME_OUTPUT_FILE_ABS_PATH))
-            thread.start()
+            # --- 启动爬取子进程，结果由下方进度区逐批读取 ---
+            scrapy_cmd_args.extend(['-L', 'INFO'])
+            run_output_dir = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'realtime_runs', str(int(time.time())))
+            crawl = RealtimeCrawl(scrapy_cmd_args, SCRAPY_PROJECT_ROOT, run_output_dir, timeout=REALTIME_CRAWL_TIMEOUT)
+            crawl.start()
+            st.session_state.realtime_crawl = crawl
+            st.session_state.realtime_crawl_log = ""
             st.rerun()
 
-# --- 处理和显示实时爬取线程的结果 ---
-if st.session_state.is_crawling:
-    st.info("⚙️ **实时爬取正在进行中...** 请查看运行 Streamlit 的终端获取详细的 Scrapy 日志。完成后此区域会自动更新。")
-elif st.session_state.get('crawl_process_info') is not None:
-    process_info = st.session_state.crawl_process_info
-    output_file = st.session_state.get('crawl_output_file_path_session')
-    
-    # 统一处理消息
-    current_message = ""
-    success_flag = False
-
-    if process_info.get('error_type') == 'timeout': current_message = "❌ 实时爬取超时 (超过3分钟)。"
-    elif process_info.get('error_type') == 'filenotfound': current_message = "❌ Scrapy 命令未找到。请检查环境配置。"
-    elif process_info.get('error_type'): current_message = f"❌ 执行爬取时发生意外错误: {process_info.get('error_type')}"
-    elif process_info.get('returncode') == 0:
-        if output_file and os.path.exists(output_file):
-            df_rt_raw = load_json_data(output_file) # load_json_data 应该能处理 .jsonl
-            if not df_rt_raw.empty:
-                st.session_state.realtime_crawl_results_df = preprocess_jobs_data(df_rt_raw)
-                current_message = f"✅ 爬取完成！找到 {len(st.session_state.realtime_crawl_results_df)} 条岗位。"
-                success_flag = True
-            else:
-                current_message = f"ℹ️ 爬取执行成功，但未能从临时输出文件 '{os.path.basename(output_file)}' 解析到有效数据。"
-            try: 
-                if os.path.exists(output_file): os.remove(output_file) # 删除临时文件
-            except Exception as e_rm: print(f"Error removing temp file {output_file}: {e_rm}")
-        else:
-            current_message = f"⚠️ 爬取执行成功，但未找到预期的输出文件 '{os.path.basename(output_file if output_file else 'N/A')}'。"
-    else:
-        current_message = f"❌ 爬取失败 (错误代码: {process_info.get('returncode')})。详情请查看下方错误输出。"
-    
-    st.session_state.realtime_crawl_message = current_message
-
-    if process_info.get('stderr') and not success_flag : # 只在有错误且爬取不完全成功时默认展开
-        with st.expander("查看爬虫错误输出 (stderr)", expanded=True): # Expanded if error
-            st.text_area("Scrapy 标准错误:", value=process_info['stderr'], height=150, key="stderr_display_v3")
-            
-    st.session_state.crawl_process_info = None # 清理，避免重复处理
-    st.session_state.crawl_output_file_path_session = None
-    # 不需要 st.rerun() 在这里，因为 run_scrapy_in_thread 的 finally 中已经有了
-
 # --- 显示实时爬取的消息和结果图表 ---
-if st.session_state.realtime_crawl_message and not st.session_state.is_crawling:
-    st.subheader("📡 实时爬取状态与结果")
-    if "✅" in st.session_state.realtime_crawl_message : st.success(st.session_state.realtime_crawl_message)
-    elif "❌" in st.session_state.realtime_crawl_message : st.error(st.session_state.realtime_crawl_message)
-    else: st.info(st.session_state.realtime_crawl_message)
-
-    if not st.session_state.realtime_crawl_results_df.empty:
-        df_rt_display = st.session_state.realtime_crawl_results_df
-        rt_metric_col1, rt_metric_col2 = st.columns(2)
-        with rt_metric_col1:
-            st.metric("📈 找到岗位数", f"{len(df_rt_display):,}")
-        with rt_metric_col2:
-            rt_avg_salary_df = df_rt_display[df_rt_display['avg_month_pay'] > 0]
-            rt_avg_sal = rt_avg_salary_df['avg_month_pay'].mean() if not rt_avg_salary_df.empty else 0
-            st.metric("💰 平均月薪 (K)", f"{rt_avg_sal:,.1f}" if rt_avg_sal > 0 else "N/A")
-
-        rt_chart_col1, rt_chart_col2 = st.columns(2)
-        with rt_chart_col1:
-            st.markdown("###### 🎓 学历要求分布")
-            rt_degrees_df = get_top_n_counts(df_rt_display, 'degree_name_cat', 5) # 使用 degree_name_cat
-            if not rt_degrees_df.empty:
-                plot_pie_chart(rt_degrees_df, 'degree_name_cat', 'count', "实时结果-学历要求", hole=0.4) # Increased hole
-            else: st.caption("无学历数据。")
-        with rt_chart_col2:
-            st.markdown("###### 🏷️ 主要职位类别分布")
-            top_cats_rt = get_top_n_counts(df_rt_display, 'job_catory', 5)
-            if not top_cats_rt.empty:
-                plot_pie_chart(top_cats_rt, 'job_catory', 'count', "实时结果-职位类别", hole=0.4)
-            else: st.caption("无职位类别数据。")
+def render_realtime_results():
+    if st.session_state.realtime_crawl_message:
+        st.subheader("📡 实时爬取状态与结果")
+        if "✅" in st.session_state.realtime_crawl_message : st.success(st.session_state.realtime_crawl_message)
+        elif "❌" in st.session_state.realtime_crawl_message : st.error(st.session_state.realtime_crawl_message)
+        else: st.info(st.session_state.realtime_crawl_message)
+
+        if not st.session_state.realtime_crawl_results_df.empty:
+            df_rt_display = st.session_state.realtime_crawl_results_df
+            rt_metric_col1, rt_metric_col2 = st.columns(2)
+            with rt_metric_col1:
+                st.metric("📈 找到岗位数", f"{len(df_rt_display):,}")
+            with rt_metric_col2:
+                rt_avg_salary_df = df_rt_display[df_rt_display['avg_month_pay'] > 0]
+                rt_avg_sal = rt_avg_salary_df['avg_month_pay'].mean() if not rt_avg_salary_df.empty else 0
+                st.metric("💰 平均月薪 (K)", f"{rt_avg_sal:,.1f}" if rt_avg_sal > 0 else "N/A")
+
+            rt_chart_col1, rt_chart_col2 = st.columns(2)
+            with rt_chart_col1:
+                st.markdown("###### 🎓 学历要求分布")
+                rt_degrees_df = get_top_n_counts(df_rt_display, 'degree_name_cat', 5) # 使用 degree_name_cat
+                if not rt_degrees_df.empty:
+                    plot_pie_chart(rt_degrees_df, 'degree_name_cat', 'count', "实时结果-学历要求", hole=0.4) # Increased hole
+                else: st.caption("无学历数据。")
+            with rt_chart_col2:
+                st.markdown("###### 🏷️ 主要职位类别分布")
+                top_cats_rt = get_top_n_counts(df_rt_display, 'job_catory', 5)
+                if not top_cats_rt.empty:
+                    plot_pie_chart(top_cats_rt, 'job_catory', 'count', "实时结果-职位类别", hole=0.4)
+                else: st.caption("无职位类别数据。")
         
-        # 技能提取，需要确认 df_rt_display 中是否有 'extracted_skills_list'
-        if 'extracted_skills_list' in df_rt_display.columns:
-            from streamlit_app.utils import get_skill_frequency # 确保导入
-            st.markdown("###### 🛠️ 热门技能 (Top 5)")
-            # 假设 get_skill_frequency 可以处理 'extracted_skills_list' 列
-            rt_skills_df = get_skill_frequency(df_rt_display, 'extracted_skills_list', top_n=5)
-            if not rt_skills_df.empty:
-                plot_bar_chart(rt_skills_df, 'skill', 'count', "实时结果-主要技能", "技能", "频次", orientation='h')
-            else: st.caption("无技能数据或未能提取。")
-        else: # Fallback or if 'extract_skills_from_job_names' is preferred for this quick view
-            st.markdown("###### 🛠️ 热门技能 (Top 5 - 基于职位名称)")
-            rt_skills_df_legacy = extract_skills_from_job_names(df_rt_display, top_n=5) # 确认此函数是否仍然适用
-            if not rt_skills_df_legacy.empty:
-                 plot_bar_chart(rt_skills_df_legacy, 'skill' if 'skill' in rt_skills_df_legacy.columns else 'term', 'count', "实时结果-主要技能", "技能", "频次", orientation='h')
-            else: st.caption("无技能数据。")
-
-
-        if not rt_avg_salary_df.empty:
-            st.subheader("实时结果 - 薪资分布直方图")
-            # 增加薪资分箱以获得更细致的视图
-            salary_bins_rt = [0, 5, 10, 15, 20, 25, 30, 40, 50, 200] # Max 200k for display
-            salary_labels_rt = [f"{salary_bins_rt[i]}-{salary_bins_rt[i+1]}K" for i in range(len(salary_bins_rt)-1)]
+            # 技能提取，需要确认 df_rt_display 中是否有 'extracted_skills_list'
+            if 'extracted_skills_list' in df_rt_display.columns:
+                from streamlit_app.utils import get_skill_frequency # 确保导入
+                st.markdown("###### 🛠️ 热门技能 (Top 5)")
+                # 假设 get_skill_frequency 可以处理 'extracted_skills_list' 列
+                rt_skills_df = get_skill_frequency(df_rt_display, 'extracted_skills_list', top_n=5)
+                if not rt_skills_df.empty:
+                    plot_bar_chart(rt_skills_df, 'skill', 'count', "实时结果-主要技能", "技能", "频次", orientation='h')
+                else: st.caption("无技能数据或未能提取。")
+            else: # Fallback or if 'extract_skills_from_job_names' is preferred for this quick view
+                st.markdown("###### 🛠️ 热门技能 (Top 5 - 基于职位名称)")
+                rt_skills_df_legacy = extract_skills_from_job_names(df_rt_display, top_n=5) # 确认此函数是否仍然适用
+                if not rt_skills_df_legacy.empty:
+                     plot_bar_chart(rt_skills_df_legacy, 'skill' if 'skill' in rt_skills_df_legacy.columns else 'term', 'count', "实时结果-主要技能", "技能", "频次", orientation='h')
+                else: st.caption("无技能数据。")
+
+
+            if not rt_avg_salary_df.empty:
+                st.subheader("实时结果 - 薪资分布直方图")
+                # 增加薪资分箱以获得更细致的视图
+                salary_bins_rt = [0, 5, 10, 15, 20, 25, 30, 40, 50, 200] # Max 200k for display
+                salary_labels_rt = [f"{salary_bins_rt[i]}-{salary_bins_rt[i+1]}K" for i in range(len(salary_bins_rt)-1)]
             
-            # 创建一个副本进行分箱，避免修改原始 session_state DataFrame
-            df_rt_display_for_hist = rt_avg_salary_df.copy()
-            df_rt_display_for_hist['salary_group_rt'] = pd.cut(df_rt_display_for_hist['avg_month_pay'], bins=salary_bins_rt, labels=salary_labels_rt, right=False)
+                # 创建一个副本进行分箱，避免修改原始 session_state DataFrame
+                df_rt_display_for_hist = rt_avg_salary_df.copy()
+                df_rt_display_for_hist['salary_group_rt'] = pd.cut(df_rt_display_for_hist['avg_month_pay'], bins=salary_bins_rt, labels=salary_labels_rt, right=False)
             
-            # 统计每个薪资组的数量
-            salary_group_counts_rt = df_rt_display_for_hist['salary_group_rt'].value_counts().reset_index()
-            salary_group_counts_rt.columns = ['salary_group_rt', 'count']
-            # 确保薪资组是Categorical并按定义的顺序排序
-            salary_group_counts_rt['salary_group_rt'] = pd.Categorical(salary_group_counts_rt['salary_group_rt'], categories=salary_labels_rt, ordered=True)
-            salary_group_counts_rt.sort_values('salary_group_rt', inplace=True)
-
-
-            fig_hist_rt = px.bar(salary_group_counts_rt, x="salary_group_rt", y="count", 
-                                 title="实时结果 - 平均月薪分布 (K/月)", 
-                                 labels={'salary_group_rt': '平均月薪范围 (K)', 'count': '岗位数量'},
-                                 text_auto=True)
-            fig_hist_rt.update_layout(bargap=0.2)
-            st.plotly_chart(fig_hist_rt, use_container_width=True)
-
-        with st.expander("📋 查看实时爬取数据样本 (最多100条)", expanded=False):
-            display_cols_rt = ['job_name', 'company_name', 'province_clean', 'city_clean', 'avg_month_pay', 'degree_name_cat', 'work_year_cat']
-            # 确保这些列都存在于 df_rt_display
-            valid_display_cols_rt = [col for col in display_cols_rt if col in df_rt_display.columns]
-            st.dataframe(df_rt_display[valid_display_cols_rt].head(100), use_container_width=True) # Added use_container_width
-    st.divider()
+                # 统计每个薪资组的数量
+                salary_group_counts_rt = df_rt_display_for_hist['salary_group_rt'].value_counts().reset_index()
+                salary_group_counts_rt.columns = ['salary_group_rt', 'count']
+                # 确保薪资组是Categorical并按定义的顺序排序
+                salary_group_counts_rt['salary_group_rt'] = pd.Categorical(salary_group_counts_rt['salary_group_rt'], categories=salary_labels_rt, ordered=True)
+                salary_group_counts_rt.sort_values('salary_group_rt', inplace=True)
+
+
+                fig_hist_rt = px.bar(salary_group_counts_rt, x="salary_group_rt", y="count", 
+                                     title="实时结果 - 平均月薪分布 (K/月)", 
+                                     labels={'salary_group_rt': '平均月薪范围 (K)', 'count': '岗位数量'},
+                                     text_auto=True)
+                fig_hist_rt.update_layout(bargap=0.2)
+                st.plotly_chart(fig_hist_rt, use_container_width=True)
+
+            with st.expander("📋 查看实时爬取数据样本 (最多100条)", expanded=False):
+                display_cols_rt = ['job_name', 'company_name', 'province_clean', 'city_clean', 'avg_month_pay', 'degree_name_cat', 'work_year_cat']
+                # 确保这些列都存在于 df_rt_display
+                valid_display_cols_rt = [col for col in display_cols_rt if col in df_rt_display.columns]
+                st.dataframe(df_rt_display[valid_display_cols_rt].head(100), use_container_width=True) # Added use_container_width
+        st.divider()
+
+
+# --- 实时爬取进度：定时读取子进程新写出的岗位，逐批追加到结果表 ---
+def finish_realtime_crawl(crawl):
+    """爬取进程结束后生成状态消息"""
+    total = len(st.session_state.realtime_crawl_results_df)
+    if crawl.error:
+        st.session_state.realtime_crawl_message = f"❌ {crawl.error}"
+    elif crawl.timed_out:
+        st.session_state.realtime_crawl_message = f"❌ 实时爬取超时 (超过{REALTIME_CRAWL_TIMEOUT // 60}分钟)，已展示超时前获取的 {total} 条岗位。"
+    elif crawl.returncode == 0:
+        if total:
+            st.session_state.realtime_crawl_message = f"✅ 爬取完成！找到 {total} 条岗位。"
+        else:
+            st.session_state.realtime_crawl_message = "ℹ️ 爬取执行成功，但未获取到岗位数据。"
+    else:
+        st.session_state.realtime_crawl_message = f"❌ 爬取失败 (错误代码: {crawl.returncode})。详情请查看下方错误输出。"
+        st.session_state.realtime_crawl_log = crawl.log_tail()
+
+
+@st.fragment(run_every=REALTIME_REFRESH_SECONDS if st.session_state.is_crawling else None)
+def realtime_crawl_panel():
+    crawl = st.session_state.realtime_crawl
+    if crawl is not None:
+        new_records = crawl.poll_records()
+        if new_records:
+            batch_df = preprocess_jobs_data(pd.DataFrame(new_records))
+            st.session_state.realtime_crawl_results_df = pd.concat(
+                [st.session_state.realtime_crawl_results_df, batch_df], ignore_index=True)
+        if crawl.is_running():
+            st.session_state.realtime_crawl_message = (
+                f"⚙️ 实时爬取进行中... 已用 {crawl.elapsed():.0f} 秒，已获取 "
+                f"{len(st.session_state.realtime_crawl_results_df)} 条岗位（结果随爬取逐批更新）")
+        else:
+            # 进程已结束：再读一次，拿到关闭前最后刷盘的数据
+            final_records = crawl.poll_records()
+            if final_records:
+                st.session_state.realtime_crawl_results_df = pd.concat(
+                    [st.session_state.realtime_crawl_results_df, preprocess_jobs_data(pd.DataFrame(final_records))],
+                    ignore_index=True)
+            finish_realtime_crawl(crawl)
+            crawl.cleanup()
+            st.session_state.realtime_crawl = None
+            st.session_state.is_crawling = False
+            st.rerun()  # 整页重跑：恢复表单按钮并停止定时刷新
+
+    render_realtime_results()
+    if st.session_state.realtime_crawl_log and not st.session_state.is_crawling:
+        with st.expander("查看爬虫错误输出 (stderr)", expanded=True):
+            st.text_area("Scrapy 标准错误:", value=st.session_state.realtime_crawl_log, height=150, key="stderr_display_v3")
+
+
+realtime_crawl_panel()
 
 
 # --- 主数据概览部分 ---
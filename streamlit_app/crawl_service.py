@@ -0,0 +1,142 @@
+# streamlit_app/crawl_service.py
+# 实时爬取服务：托管一个 scrapy 子进程，边爬边读取其JSONL分片（含写入中的 .part 文件），按小批次交给界面
+import glob
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from crawler.crawler.feeds import PART_SUFFIX
+
+# 实时爬取的输出配置：小批次、快速刷盘、不压缩；不做跨运行去重（要展示本次找到的全部岗位），不记录断点
+REALTIME_CRAWL_SETTINGS = {
+    'JOBS_OUTPUT_COMPRESSION': '',
+    'JOBS_OUTPUT_BATCH_SIZE': 20,
+    'JOBS_OUTPUT_FLUSH_SECONDS': 1,
+    'DEDUP_ENABLED': 0,
+    'JOBS_FRONTIER_ENABLED': 0,
+}
+REALTIME_RUNS_KEEP = 5  # realtime_runs/ 下保留最近几次爬取的目录（结束后只剩日志，分片已读入界面后删除）
+
+
+def prune_runs(runs_dir, keep=REALTIME_RUNS_KEEP):
+    """删除较早的实时爬取目录，只保留最近 keep 个"""
+    if not os.path.isdir(runs_dir):
+        return
+    run_dirs = sorted((path for path in glob.glob(os.path.join(runs_dir, '*')) if os.path.isdir(path)),
+                      key=os.path.getmtime)
+    for path in run_dirs[:max(0, len(run_dirs) - keep)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class ShardTailer:
+    """增量读取分片目录中的新记录：按文件记录已读字节数，只解析以换行结尾的完整行"""
+
+    def __init__(self, shards_dir):
+        self.shards_dir = shards_dir
+        self.offsets = {}  # 分片名（不含 .part）-> 已读字节数
+
+    def read_new(self):
+        records = []
+        for path in sorted(glob.glob(os.path.join(self.shards_dir, '*.jsonl*'))):
+            # 分片写完后会从 .part 改名，按去掉后缀的名字记录进度即可接着读
+            name = os.path.basename(path)
+            name = name[:-len(PART_SUFFIX)] if name.endswith(PART_SUFFIX) else name
+            offset = self.offsets.get(name, 0)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except FileNotFoundError:
+                continue  # 恰好在改名，下次再读
+            complete = chunk[:chunk.rfind(b'\n') + 1]
+            self.offsets[name] = offset + len(complete)
+            for line in complete.decode('utf-8').splitlines():
+                if line.strip():
+                    records.append(json.loads(line))
+        return records
+
+
+class RealtimeCrawl:
+    """一次实时爬取：后台子进程 + 分片跟读，超时后终止进程"""
+
+    def __init__(self, scrapy_cmd_args, crawler_root, output_dir, timeout):
+        self.scrapy_cmd_args = list(scrapy_cmd_args)
+        self.crawler_root = crawler_root
+        self.output_dir = output_dir
+        self.shards_dir = os.path.join(output_dir, 'jobs_shards')
+        self.log_path = os.path.join(output_dir, 'crawl.log')
+        self.timeout = timeout
+        self.tailer = ShardTailer(self.shards_dir)
+        self.seen_job_ids = set()
+        self.process = None
+        self.started_at = None
+        self.timed_out = False
+        self.error = None
+
+    def start(self):
+        prune_runs(os.path.dirname(self.output_dir), REALTIME_RUNS_KEEP - 1)
+        os.makedirs(self.output_dir, exist_ok=True)
+        cmd = list(self.scrapy_cmd_args)
+        for name, value in dict(REALTIME_CRAWL_SETTINGS, JOBS_OUTPUT_DIR=self.shards_dir).items():
+            cmd += ['-s', f'{name}={value}']
+        print(f"Executing: {' '.join(cmd)}")
+        self.started_at = time.time()
+        try:
+            # 日志写文件而不是管道：无人读取的管道写满后会卡住子进程
+            with open(self.log_path, 'w', encoding='utf-8') as log_file:
+                self.process = subprocess.Popen(
+                    cmd, cwd=self.crawler_root, stdout=subprocess.DEVNULL, stderr=log_file,
+                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+        except FileNotFoundError:
+            self.error = 'Scrapy 命令未找到。请确保 Scrapy 已安装并配置在系统路径中。'
+        except Exception as e:
+            self.error = f'执行实时爬取时发生意外错误: {e}'
+
+    def elapsed(self):
+        return time.time() - self.started_at if self.started_at else 0
+
+    def is_running(self):
+        if self.process is None or self.process.poll() is not None:
+            return False
+        if self.elapsed() > self.timeout:
+            self.stop()
+            self.timed_out = True
+            return False
+        return True
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    @property
+    def returncode(self):
+        return self.process.returncode if self.process is not None else None
+
+    def poll_records(self):
+        """本次调用新增的岗位（按 job_id 去重）"""
+        new_records = []
+        for record in self.tailer.read_new():
+            job_id = record.get('job_id')
+            if job_id in self.seen_job_ids:
+                continue
+            if job_id:
+                self.seen_job_ids.add(job_id)
+            new_records.append(record)
+        return new_records
+
+    def cleanup(self):
+        """进程结束且记录已全部读出后删除分片（数据已在界面的 DataFrame 中），日志留待排查"""
+        if self.process is None or self.process.poll() is not None:
+            shutil.rmtree(self.shards_dir, ignore_errors=True)
+
+    def log_tail(self, max_chars=3000):
+        if not os.path.exists(self.log_path):
+            return ''
+        with open(self.log_path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()[-max_chars:]
@@ -12,6 +12,8 @@ from itertools import combinations # 用于共现分析
 from collections import Counter
 import pandas as pd
 import numpy as np
+from crawler.crawler.feeds import MANIFEST_NAME, iter_shard_records, open_shard
+from crawler.crawler.staging import is_staging_dir, is_staging_fresh, read_jobs
 
 
 # --- 路径定义 ---
@@ -24,7 +26,15 @@ PROJECT_ROOT = os.path.dirname(streamlit_app_dir)
 CRAWLER_MODULE_DIR = os.path.join(PROJECT_ROOT, 'crawler', 'crawler')
 DATA_DIR_INSIDE_CRAWLER = os.path.join(CRAWLER_MODULE_DIR, 'data')
 
-JOBS_FILE = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'jobs.json') # 或 jobs.jsonl
+JOBS_SHARDS_DIR = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'jobs_shards') # 爬虫JSONL分片目录 (JsonlShardPipeline)
+JOBS_PARQUET_DIR = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'jobs_parquet') # Parquet暂存库 (crawler/build_staging.py)
+# 爬取输出：分片目录（有清单即可读取，爬取进行中也能加载已落盘的分片），否则回退到旧的 jobs.json
+if os.path.exists(os.path.join(JOBS_SHARDS_DIR, MANIFEST_NAME)):
+    CRAWL_OUTPUT = JOBS_SHARDS_DIR
+else:
+    CRAWL_OUTPUT = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'jobs.json') # 或 jobs.jsonl
+# Parquet 暂存库按列读取、不解析JSON，但只在它不早于爬取输出时使用，否则直接读爬取输出，避免看板显示过期数据
+JOBS_FILE = JOBS_PARQUET_DIR if is_staging_fresh(JOBS_PARQUET_DIR, CRAWL_OUTPUT) else CRAWL_OUTPUT
 CITIES_FILE = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'cities.json') # Not actively used in provided snippets, but path is defined
 CATEGORIES_FILE = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'positions.json') # Used in Skills/Majors page
 DEFAULT_OPTIONS_FILE_PATH = os.path.join(DATA_DIR_INSIDE_CRAWLER, 'target_options.json') # Path to target_options.json
@@ -849,17 +859,32 @@ def get_skill_cooccurrence_optimized(
 """
 
 
+# 看板用到的原始列（preprocess_jobs_data 的输入），从 Parquet 暂存库加载时只读这些列
+DASHBOARD_COLUMNS = [
+    'job_id', 'job_name', 'job_catory', 'job_industry', 'high_month_pay', 'low_month_pay',
+    'publish_date', 'update_date', 'company_name', 'area_code_name', 'prinvce_code_nme',
+    'search_area_name', 'company_scale', 'degree_name', 'major_required', 'company_property',
+    'company_tags', 'source_url', 'head_count', 'level', 'work_year', 'description', 'job_description',
+]
+
+
 @st.cache_data(ttl=3600) 
-def load_json_data(file_path):
+def load_json_data(file_path, columns=tuple(DASHBOARD_COLUMNS), months=None, provinces=None):
+    # columns/months/provinces 只对 Parquet 暂存库生效：按列读取、按发布月份/省份裁剪分区（columns=None 读全部列）
     actual_path_to_load = os.path.abspath(file_path)
     if not os.path.exists(actual_path_to_load):
         if streamlit_app_dir: st.error(f"Data file not found: {actual_path_to_load}")
         else: print(f"ERROR: Data file not found: {actual_path_to_load}")
         return pd.DataFrame()
     try:
-        if actual_path_to_load.endswith('.jsonl'):
+        if is_staging_dir(actual_path_to_load):
+            df = read_jobs(actual_path_to_load, columns=columns, months=months, provinces=provinces)
+        elif os.path.isdir(actual_path_to_load):
+            # 爬虫分片目录：按清单读取已落盘的分片
+            df = pd.DataFrame(list(iter_shard_records(actual_path_to_load)))
+        elif actual_path_to_load.endswith(('.jsonl', '.jsonl.gz', '.jsonl.zst')):
             records = []
-            with open(actual_path_to_load, 'r', encoding='utf-8') as f:
+            with open_shard(actual_path_to_load) as f:
                 for line in f:
                     try:
                         records.append(json.loads(line))
@@ -15,14 +15,28 @@ echo ======================================== >> logs\sync.log
 :: 3. 执行同步并记录所有输出
 echo 执行数据同步... >> logs\sync.log
 python scripts\first_sync.py >> logs\sync.log 2>&1
+set SYNC_ERRORLEVEL=%errorlevel%
+
+:: 3.1 增量爬取岗位数据（按查询组合水位线提前结束翻页）
+echo 执行增量岗位爬取... >> logs\sync.log
+pushd crawler
+scrapy crawl jobs -a run_type=incremental >> ..\logs\sync.log 2>&1
+if errorlevel 1 set SYNC_ERRORLEVEL=%errorlevel%
+:: 3.2 已启用 Parquet 暂存库时随爬取输出重建，看板/训练不会读到过期的暂存库
+if exist "crawler\data\jobs_parquet" (
+    echo 重建Parquet暂存库... >> ..\logs\sync.log
+    python build_staging.py >> ..\logs\sync.log 2>&1
+    if errorlevel 1 set SYNC_ERRORLEVEL=1
+)
+popd
 
 :: 4. 检查是否成功
-if %errorlevel% equ 0 (
+if %SYNC_ERRORLEVEL% equ 0 (
     echo [SUCCESS] 同步完成: %date% %time% >> logs\sync.log
     echo 状态: 成功 >> logs\sync.log
 ) else (
     echo [ERROR] 同步失败: %date% %time% >> logs\sync.log
-    echo 错误代码: %errorlevel% >> logs\sync.log
+    echo 错误代码: %SYNC_ERRORLEVEL% >> logs\sync.log
 )
 
 :: 5. 添加空行分隔